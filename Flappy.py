@@ -2,17 +2,62 @@ import pygame
 import random
 import os
 import json
-import paho.mqtt.client as mqtt
 import time
+from wire import WireCodec
+from render_cache import PipeSpriteCache, TextCache, HudText
+from dirty_rects import FullScreenRenderer, DirtyRectRenderer
+from simulation import (World, WIDTH, HEIGHT, BIRD_X, BIRD_WIDTH, BIRD_HEIGHT, PIPE_WIDTH, PIPE_GAP,
+                        SPAWN_INTERVAL, EVENT_GAME_OVER)
+from sprites import Bird, Pipe
+from timestep import FixedTimestep, lerp
+from lockstep import LockstepSession, MAX_ROLLBACK_TICKS
+from inbox import Inbox
+from jitter_buffer import JitterBuffer
+from state_sender import StateSender
+import gamelog
+import topics
+import transport
+from netstats import NetStats, MetricsExporter, format_peer
+from profiler import FrameProfiler, CAPTURE_FRAMES
+from replay import ReplayWriter, replay_path
 
 pygame.init()
 
 # --- Configurações MQTT ---
-broker = "192.168.23.83"
+# (FLAPPY_BROKER troca o broker; FLAPPY_TRANSPORT=loopback joga sem rede, ver transport.py)
+broker = os.environ.get("FLAPPY_BROKER", "192.168.23.83")
 port = 1883
-mqtt_topic = "flappybird2player/game"
+# FLAPPY_MATCH=<id> põe a partida em tópicos próprios (flappybird/<id>/...), para
+# várias partidas dividirem o mesmo broker; sem ele, o tópico único de sempre
+MATCH_ID = os.environ.get("FLAPPY_MATCH")
+mqtt_topic = topics.match_topic(MATCH_ID, topics.GAME) if MATCH_ID else topics.LEGACY_TOPIC
 client_id = f'player-{random.randint(0, 100000)}'
 
+# Log: INFO no console, DEBUG (amostrado) só no buffer em memória, gravado em
+# logs/ ao fim de cada partida ou se o jogo quebrar (ver gamelog.py)
+gamelog.setup(client_id)
+net_log = gamelog.get_logger('net')
+game_log = gamelog.get_logger('game')
+# Formato do estado dos jogadores: binário (padrão) ou JSON (FLAPPY_WIRE=json).
+# Se algum cliente antigo publicar estado em JSON, o envio cai para JSON sozinho.
+wire_codec = WireCodec(binary=os.environ.get("FLAPPY_WIRE", "binary") != "json")
+# Envio do estado no modo 'state': nos pulos, mortes e pontos, mais keyframes
+# (padrão, ver state_sender.py), ou a cada 50 ms com FLAPPY_SEND=fixed. Se o formato
+# cair para JSON (cliente antigo, que não projeta o y), volta para os 50 ms.
+EVENT_SENDS = os.environ.get("FLAPPY_SEND", "events") != "fixed"
+# Sincronização: 'state' (padrão, cada jogador envia o próprio estado),
+# 'lockstep' (só os pulos, carimbados com o tick; ver lockstep.py) ou 'server'
+# (a partida roda no server.py; o cliente manda pulos e desenha o que o servidor
+# decide). Todos na partida precisam usar o mesmo modo.
+SYNC_MODE = os.environ.get("FLAPPY_SYNC", "state")
+LOCKSTEP = SYNC_MODE == "lockstep"
+SERVER_MODE = SYNC_MODE == "server"
+if SERVER_MODE:
+    MATCH_ID = MATCH_ID or "default"
+    input_topic = topics.input_topic(MATCH_ID)
+# pings vão para quem responde: o servidor (canal de entrada) ou os outros pares
+ping_topic = input_topic if SERVER_MODE else mqtt_topic
+
 # --- Escolha do jogador local ---
 # Ao iniciar, escolha se este processo será o player 1 (vermelho) ou player 2 (azul).
 # Digite '1' para P1 (vermelho) ou '2' para P2 (azul).
@@ -20,229 +65,406 @@ choice = input("Escolha seu player (1 = vermelho, 2 = azul, 3 = plateia/espectad
 is_player1 = (choice == '1')
 is_player2 = (choice == '2') 
 is_spectator = (choice == '3')
-
-# estado remoto armazenado (por cor)
+# y, vida e pontuação dos dois pássaros vêm da rede (espectador, ou todos no modo servidor)
+all_birds_remote = is_spectator or SERVER_MODE
+# FLAPPY_RELAY=1: o espectador recebe só os quadros agregados do relay.py, não o
+# tráfego dos jogadores
+RELAY_SPECTATOR = is_spectator and os.environ.get("FLAPPY_RELAY") == "1"
+# seed da partida mostrada pelos quadros do relay
+relay_seed = None
+
+# Dois jogadores, por cor: o formato binário (FLAG_BLUE), os quadros do relay, o
+# lockstep, o servidor e os replays contam com as duas vagas fixas. Partidas com mais
+# pássaros usam a tabela de jogadores do battle.py (flock.py), não este arquivo.
+# estado remoto armazenado (por cor); só a thread do jogo escreve aqui (ver process_network)
 remote_states = {
     'red': None,
     'blue': None
 }
+# y remoto de cada cor, carimbado com o tick do remetente e desenhado com um pequeno
+# atraso, interpolado entre os estados recebidos (ver jitter_buffer.py)
+remote_buffers = {
+    'red': JitterBuffer(),
+    'blue': JitterBuffer()
+}
 
 # estado global do jogo
 game_state = 'start_screen'
+# lockstep: a partida acabou porque as simulações divergiram (ver lockstep.py)
+desynced = False
+
+# mensagens recebidas pela thread do MQTT, esvaziadas pelo loop principal a cada frame
+inbox = Inbox()
+
+# Medidas da rede por par (RTT, jitter, perda; ver netstats.py). F3 (ou
+# FLAPPY_NETSTATS=1) mostra o overlay; FLAPPY_METRICS=<arquivo> grava as medidas
+# a cada 10 s, uma linha JSON por vez.
+netstats = NetStats(client_id)
+metrics_exporter = MetricsExporter(os.environ["FLAPPY_METRICS"]) if os.environ.get("FLAPPY_METRICS") else None
+show_netstats = os.environ.get("FLAPPY_NETSTATS") == "1"
+NETSTATS_REFRESH_MS = 500
+
+# Replays: cada partida dos jogadores nos modos 'state' e 'lockstep' é gravada em
+# FLAPPY_REPLAY_DIR (padrão replays/; vazio desliga). No modo servidor quem grava é
+# o server.py (--record). Ver replay.py.
+REPLAY_DIR = os.environ.get("FLAPPY_REPLAY_DIR", "replays")
+RECORD_REPLAYS = bool(REPLAY_DIR) and not is_spectator and not SERVER_MODE
+recorder = None
+
+# espectador com a pista fora do tick dos jogadores por mais que isso (ex.: entrou
+# atrasado) pula direto para o tick deles em vez de continuar dessincronizado
+SPECTATOR_RESYNC_TICKS = SPAWN_INTERVAL // 4
+
+# Modo servidor: o pedido de entrada vai em QoS 0 e pode se perder (ou chegar antes
+# do servidor assinar o canal), então é repetido a cada JOIN_RETRY_MS até o servidor
+# responder; sem resposta em JOIN_TIMEOUT_MS, a tela inicial avisa.
+JOIN_RETRY_MS = 1000
+JOIN_TIMEOUT_MS = 10000
+# (sem acentos: a fonte SuperMario não tem)
+JOIN_MESSAGES = {
+    'joining': "Entrando na partida...",
+    'rejected': "Partida sem vaga: tecla tenta de novo",
+    'timeout': "O servidor nao respondeu: tecla tenta de novo",
+}
+# 'joining', 'joined', 'rejected' ou 'timeout' (None: não pede entrada)
+join_status = 'joining' if SERVER_MODE and not is_spectator else None
+join_started = None
+last_join_sent = None
+
+
+def send_join():
+    client.publish(input_topic, json.dumps({"type": "join", "player_id": client_id, "bird": local_index}))
+
 
 # Callback MQTT
 
-def on_connect(client, userdata, flags, reasonCode, properties=None):
-    if reasonCode == 0:
-        print("MQTT conectado!")
-        client.subscribe(mqtt_topic)
+def on_connect(ok, reason):
+    # as assinaturas são refeitas pelo transporte a cada (re)conexão
+    if ok:
+        net_log.info("MQTT conectado!")
+        if SERVER_MODE and not is_spectator:
+            send_join()
     else:
-        print(f"Falha de conexão MQTT: {reasonCode}")
+        net_log.error("Falha de conexão MQTT: %s", reason)
 
 
-def on_message(client, userdata, msg):
+def on_message(msg):
+    # Roda na thread de rede: só decodifica e enfileira, sem tocar no estado do jogo.
+    global opponent_id
     try:
-        data = json.loads(msg.payload.decode())
-        # debug
-        print("Recebido MQTT:", data)
+        data = wire_codec.decode(msg.payload)
 
         # ignora minhas próprias mensagens SE não for espectador
-        if not is_spectator and data.get("player_id") == client_id:
+        # (no modo servidor, o estado do meu pássaro vem do servidor com o meu id)
+        if not all_birds_remote and data.get("player_id") == client_id:
             return
 
+        # ping/pong: respondidos e medidos aqui mesmo, na chegada, fora do inbox
+        kind = data.get("type")
+        if kind == "ping":
+            # só jogadores respondem, e só aos pings endereçados a eles: no tópico
+            # compartilhado, responder a todos faria N·(N-1) pongs por segundo
+            if not is_spectator and data.get("to") == client_id:
+                client.publish(ping_topic, json.dumps(netstats.pong(data)))
+            return
+        if kind == "pong":
+            netstats.on_pong(data)
+            return
+        # no modo ponto a ponto só os jogadores publicam no tópico: quem não sou eu é o oponente
+        if not all_birds_remote and data.get("player_id"):
+            opponent_id = data["player_id"]
+
         color = data.get("color")
         if color in ('red', 'blue'):
-            # grava o estado remoto para ser usado no loop principal (interpolação segura)
-            # Para o espectador, ambos são "remotos"
-            # Para o jogador, apenas o oponente é "remoto"
-            remote_states[color] = data
-            
+            # estado contínuo: só o mais recente de cada cor é aplicado
+            netstats.on_state(data)
+            gamelog.sampled(net_log, 'net.state', "Recebido MQTT: %s", data)
+            inbox.put_state(color, data)
+        elif data.get("type") == "frame":
+            # quadro do relay: também só o mais recente interessa
+            gamelog.sampled(net_log, 'net.state', "Recebido MQTT: %s", data)
+            inbox.put_state('frame', data)
+        else:
+            # seed, game_over e entradas do lockstep: todas, na ordem de chegada
+            gamelog.sampled(net_log, 'net.input' if data.get("type") == "input" else 'net.event', "Recebido MQTT: %s", data)
+            inbox.put_event(data)
+
+    except Exception:
+        net_log.exception("Erro processando mensagem MQTT")
+
+
+def process_network():
+    # Aplica o que chegou da rede desde o último frame, na thread do jogo.
+    global game_state, desynced, join_status
+    for color, data in inbox.drain_states().items():
+        if color == 'frame':
+            apply_relay_frame(data)
+            continue
+        # grava o estado remoto para ser usado no loop principal (interpolação segura)
+        # Para o espectador, ambos são "remotos"
+        # Para o jogador, apenas o oponente é "remoto"
+        remote_states[color] = data
+        # (clientes antigos sem tick: o estado vale para o tick da chegada)
+        remote_buffers[color].push(data.get("tick", world.tick), data["y"], world.tick, data.get("velocity"))
+        if data.get("game_state") == 'game_over':
+            game_state = 'game_over'
+
+    for data in inbox.drain_events():
+        if SERVER_MODE and data.get("to") == client_id:
+            # resposta do servidor ao pedido de entrada na partida
+            if data.get("type") == "joined":
+                if join_status != 'joined':
+                    net_log.info("Entrou na partida %s com o pássaro %s", MATCH_ID, data.get("bird"))
+                join_status = 'joined'
+            elif data.get("type") == "rejected":
+                net_log.warning("Partida %s sem vaga para o pássaro %s", MATCH_ID, local_index)
+                join_status = 'rejected'
+
         if "seed" in data:
-            # P2 e Espectador precisam aplicar o seed do P1
-            if not is_player1: 
+            # P2 e Espectador precisam aplicar o seed do P1 (no modo servidor, todos)
+            if not is_player1 or SERVER_MODE:
                 seed_value = data["seed"]
-                random.seed(seed_value)
-                print(f"P2/Espectador aplicou seed: {seed_value}")
-                
+                if SERVER_MODE:
+                    # a partida começou no servidor: recomeça a pista com o seed dele
+                    start_remote_match(seed_value)
+                elif LOCKSTEP:
+                    # a partida começa no tick em que o P1 está agora: o do seed mais
+                    # o atraso da rede até aqui
+                    start_lockstep(seed_value, data.get("tick", 0) + latency_ticks(data.get("player_id")))
+                else:
+                    # refaz os canos já na tela se o seed chegou depois do reset
+                    world.set_seed(seed_value)
+                    if recorder is not None:
+                        recorder.seed(world.tick, seed_value)
+                game_log.info("P2/Espectador aplicou seed: %s", seed_value)
+
+        # lockstep: pulo remoto carimbado com o tick
+        if data.get("type") == "input" and LOCKSTEP:
+            lockstep.receive(data["tick"], data["bird"])
+        # lockstep: o pássaro remoto morreu, não virão mais pulos dele
+        if data.get("type") == "done" and LOCKSTEP:
+            lockstep.finish(data["bird"], data["tick"])
+
         # sincroniza estado do jogo (se alguém mandar game_over)
         if data.get("game_state") == 'game_over':
-            global game_state
             game_state = 'game_over'
+            if data.get("reason") == 'desync':
+                desynced = True
 
-    except Exception as e:
-        print("Erro processando mensagem MQTT:", e)
+
+def latency_ticks(peer_id):
+    # atraso de ida até o par (metade do RTT medido pelo ping), em ticks; 0 se ainda não medido
+    latency = netstats.summary().get(peer_id, {}).get("latency")
+    if latency is None:
+        return 0
+    return min(round(latency * timestep.tick_rate / 1000), MAX_ROLLBACK_TICKS // 2)
 
 
 # --- Configurações do jogo ---
-WIDTH, HEIGHT = 1200, 700
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
+# (dimensões e física ficam em simulation.py)
+# A simulação roda em passo fixo (timestep.TICK_RATE); a renderização pode ir além:
+# FLAPPY_FPS=0 desliga o limite de quadros, FLAPPY_VSYNC=1 sincroniza com o monitor e
+# FLAPPY_INTERPOLATE=1 interpola pássaros e canos entre dois ticks.
+RENDER_FPS = int(os.environ.get("FLAPPY_FPS", "60"))
+VSYNC = os.environ.get("FLAPPY_VSYNC") == "1"
+RENDER_INTERPOLATION = os.environ.get("FLAPPY_INTERPOLATE") == "1"
+if VSYNC:
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync=1)
+else:
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+# Perfil do loop por fase (opt-in): FLAPPY_PROFILE=perfil.csv (frame a frame) ou
+# perfil.json (resumo, histogramas e piores frames), gravado ao sair.
+# F4 grava um cProfile dos próximos FLAPPY_PROFILE_FRAMES frames (ver profiler.py).
+PROFILE_PATH = os.environ.get("FLAPPY_PROFILE")
+PROFILE_FRAMES = int(os.environ.get("FLAPPY_PROFILE_FRAMES", CAPTURE_FRAMES))
+profiler = FrameProfiler(enabled=bool(PROFILE_PATH))
+
 # Note: Certifique-se de que 'SuperMario.ttf' esteja no mesmo diretório
 try:
     message_font = pygame.font.Font('SuperMario.ttf', 60) 
     text_font = pygame.font.Font('SuperMario.ttf', 40) 
     score_font = pygame.font.Font('SuperMario.ttf', 20)
 except:
-    print("ATENÇÃO: Fonte 'SuperMario.ttf' não encontrada. Usando fonte padrão.")
+    game_log.warning("ATENÇÃO: Fonte 'SuperMario.ttf' não encontrada. Usando fonte padrão.")
     message_font = pygame.font.Font(None, 60) 
     text_font = pygame.font.Font(None, 40) 
     score_font = pygame.font.Font(None, 20)
+# com o perfil ligado, conta as chamadas de font.render por frame
+message_font = profiler.wrap_font(message_font)
+text_font = profiler.wrap_font(text_font)
+score_font = profiler.wrap_font(score_font)
+
+# Cache de textos renderizados (menus, avisos e game over)
+text_cache = TextCache()
 
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 BLUE = (0, 0, 255)
+SKY_BLUE = (135, 206, 235)
 
-BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT = 45, 30 
-PIPE_WIDTH = 50 
+# Renderização por retângulos sujos (opt-in): FLAPPY_DIRTY_RECTS=1
+# FLAPPY_DIRTY_DEBUG=1 (ou F2 durante o jogo) mostra a área repintada por frame
+DIRTY_RECTS = os.environ.get("FLAPPY_DIRTY_RECTS") == "1"
+DIRTY_DEBUG = os.environ.get("FLAPPY_DIRTY_DEBUG") == "1"
 
 try:
     bird_img_red = pygame.image.load(os.path.join('.', 'RedBird.png')).convert_alpha()
     bird_img_blue = pygame.image.load(os.path.join('.', 'Yellow_bird.png')).convert_alpha() 
-    bird_img_red = pygame.transform.scale(bird_img_red, (BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT))
-    bird_img_blue = pygame.transform.scale(bird_img_blue, (BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT))
+    bird_img_red = pygame.transform.scale(bird_img_red, (BIRD_WIDTH, BIRD_HEIGHT))
+    bird_img_blue = pygame.transform.scale(bird_img_blue, (BIRD_WIDTH, BIRD_HEIGHT))
     pipe_img = pygame.image.load(os.path.join('.', 'Pipe.png')).convert_alpha()
-    BIRD_WIDTH, BIRD_HEIGHT = BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT
+    bird_size = (BIRD_WIDTH, BIRD_HEIGHT)
 except pygame.error as e:
-    print(f"ATENÇÃO: Erro ao carregar imagens! Usando formas simples. Erro: {e}")
+    game_log.warning("ATENÇÃO: Erro ao carregar imagens! Usando formas simples. Erro: %s", e)
     bird_img_red, bird_img_blue, pipe_img = None, None, None
-    BIRD_WIDTH, BIRD_HEIGHT = 30, 30
-
-PIPE_GAP = 200
-GRAVITY = 0.5
-JUMP_STRENGTH = -10
-PIPE_SPEED = 3
+    bird_size = (30, 30)
 
 last_mqtt_send = 0 
-INTERPOLATION_SPEED = 0.2 
-
-class Bird:
-    def __init__(self, x, y, image, color):
-        self.x, self.initial_y = x, y
-        self.y = y
-        self.image = image
-        self.color = color
-        self.width = BIRD_WIDTH
-        self.height = BIRD_HEIGHT
-        self.reset()
-    
-    def reset(self):
-        self.y = self.initial_y
-        self.velocity = 0
-        self.score = 0
-        self.is_alive = True
-    
-    def jump(self):
-        if self.is_alive:
-            self.velocity = JUMP_STRENGTH
-    
-    def move(self):
-        if self.is_alive:
-            self.velocity += GRAVITY
-            self.y += self.velocity
-    
-    def draw(self, screen):
-        if self.is_alive and self.image:
-            screen.blit(self.image, (self.x - self.width // 2, int(self.y) - self.height // 2))
-        elif self.is_alive:
-            pygame.draw.circle(screen, self.color, (self.x, int(self.y)), self.width // 2)
-    
-    def get_rect(self):
-        margin_x = int(self.width * 0.45)
-        margin_y = int(self.height * 0.10)
-        return pygame.Rect(
-            self.x - self.width // 2 + margin_x,
-            self.y - self.height // 2 + margin_y,
-            self.width - 2 * margin_x,
-            self.height - 2 * margin_y
-        )
-
-class Pipe:
-    def __init__(self, x, y_top_end):
-        self.x = x
-        self.y_top_end = y_top_end
-        self.passed = False
-        self.width = PIPE_WIDTH
-        if pipe_img:
-            self.image_top = pygame.transform.scale(pipe_img, (PIPE_WIDTH, self.y_top_end))
-            bottom_height = HEIGHT - (self.y_top_end + PIPE_GAP)
-            bottom_pipe = pygame.transform.scale(pipe_img, (PIPE_WIDTH, bottom_height))
-            self.image_bottom = pygame.transform.flip(bottom_pipe, False, True)
-        else:
-            self.image_top = None
-            self.image_bottom = None
-    
-    def move(self):
-        self.x -= PIPE_SPEED
-    
-    def draw(self, screen):
-        if self.image_top and self.image_bottom:
-            screen.blit(self.image_top, (self.x, self.y_top_end - self.image_top.get_height()))
-            screen.blit(self.image_bottom, (self.x, self.y_top_end + PIPE_GAP))
-        else:
-            pygame.draw.rect(screen, BLACK, (self.x, 0, self.width, self.y_top_end))
-            pygame.draw.rect(screen, BLACK, (self.x, self.y_top_end + PIPE_GAP, self.width, HEIGHT - (self.y_top_end + PIPE_GAP)))
+# quando mandar o estado local (FLAPPY_SEND) e se o pássaro local pulou desde o último envio
+state_sender = StateSender()
+local_jumped = False
+
+# Cache das imagens dos canos por altura (evita scale/flip a cada Pipe criado)
+if pipe_img:
+    Pipe.sprite_cache = PipeSpriteCache(pipe_img, PIPE_WIDTH, HEIGHT, PIPE_GAP)
+if profiler.enabled:
+    profiler.count_calls(Pipe, '__init__', 'Pipe.__init__')
+
+
+def start_lockstep(seed_value, start_tick=0):
+    # Lockstep: todos partem do mesmo seed e do tick combinado (o P1 no 0, quem
+    # recebe o seed no tick em que o P1 já deve estar)
+    global game_state, prev_bird_y, prev_track_offset, desynced
+    # fecha o replay da partida anterior antes de zerar o mundo
+    stop_recording()
+    world.reset(seed_value)
+    clear_remote_buffers()
+    lockstep.start()
+    desynced = False
+    # o replay começa no tick 0; os ticks pulados entram nele como os outros
+    start_recording()
+    lockstep.fast_forward(start_tick)
+    prev_bird_y = [bird.y for bird in world.birds]
+    prev_track_offset = pipe_track.offset
+    game_state = 'playing'
 
 
-def check_collision(bird, pipes):
-    # Apenas verifica colisão se o processo for um jogador (não espectador)
-    if is_spectator or not bird.is_alive:
-        return False
+def start_recording():
+    global recorder
+    stop_recording()
+    if RECORD_REPLAYS:
+        try:
+            recorder = ReplayWriter(replay_path(REPLAY_DIR, MATCH_ID or client_id), world)
+        except OSError as e:
+            game_log.warning("não foi possível gravar o replay em %s: %s", REPLAY_DIR, e)
 
-    bird_rect = bird.get_rect()
-    COLLISION_MARGIN = 5
 
-    for pipe in pipes:
-        pipe_rect_top = pygame.Rect(pipe.x + COLLISION_MARGIN, 0, pipe.width - 2 * COLLISION_MARGIN, pipe.y_top_end)
-        pipe_rect_bottom = pygame.Rect(pipe.x + COLLISION_MARGIN, pipe.y_top_end + PIPE_GAP, pipe.width - 2 * COLLISION_MARGIN, HEIGHT - (pipe.y_top_end + PIPE_GAP))
-        if bird_rect.colliderect(pipe_rect_top) or bird_rect.colliderect(pipe_rect_bottom):
-            bird.is_alive = False
-            return True
-        if not pipe.passed and bird.x > pipe.x + PIPE_WIDTH:
-            pipe.passed = True
-            bird.score += 1
-    return False
+def stop_recording():
+    global recorder
+    if recorder is None:
+        return
+    if LOCKSTEP:
+        # os últimos ticks ainda estavam na janela de rollback
+        lockstep.flush()
+    recorder.close()
+    game_log.info("replay gravado em %s", recorder.path)
+    recorder = None
+
+
+def record_final_tick(tick, inputs, state):
+    # lockstep: só ticks que não sofrem mais rollback vão para o replay
+    if recorder is not None:
+        recorder.record(tick, inputs, state)
+
+
+def start_remote_match(seed_value):
+    # Modo servidor e espectador do relay: a pista é simulada aqui a partir do
+    # seed recebido; os pássaros seguem o estado publicado
+    global game_state, prev_bird_y, prev_track_offset
+    world.reset(seed_value)
+    clear_remote_buffers()
+    prev_bird_y = [bird.y for bird in world.birds]
+    prev_track_offset = pipe_track.offset
+    game_state = 'playing'
+
+
+def clear_remote_buffers():
+    # o tick local recomeçou (ou pulou): os estados e o relógio dos buffers não valem mais
+    for buffer in remote_buffers.values():
+        buffer.clear()
+
+
+def apply_relay_frame(frame):
+    # Quadro agregado do relay: seed, estado do jogo e os dois pássaros de uma vez.
+    # O primeiro quadro (retido) já põe quem entrou atrasado na partida atual.
+    global game_state, relay_seed
+    if frame["seed"] is not None and (frame["seed"] != relay_seed or
+                                      (game_state != 'playing' and frame["game_state"] == 'playing')):
+        relay_seed = frame["seed"]
+        start_remote_match(relay_seed)
+    if frame["game_state"] == 'game_over':
+        game_state = 'game_over'
+    for bird_state in frame["birds"]:
+        remote_states[bird_state["color"]] = bird_state
+        remote_buffers[bird_state["color"]].push(frame["tick"], bird_state["y"], world.tick, bird_state["velocity"])
 
 
 def reset_game():
-    global pipes1, pipes2, spawn_pipe_timer, game_state
-    player1.reset()
-    player2.reset()
-    pipes1 = []
-    pipes2 = []
-    spawn_pipe_timer = 0
-    game_state = 'playing'
+    global game_state, prev_bird_y, prev_track_offset, join_status, join_started
+    if RELAY_SPECTATOR:
+        # a partida mostrada é a dos quadros do relay
+        return
+
+    if SERVER_MODE:
+        if join_status in ('timeout', 'rejected'):
+            # o servidor não respondeu (ou não tinha vaga): tenta entrar de novo
+            join_status = 'joining'
+            join_started = None
+            return
+        # o servidor inicia a partida e responde com o seed para todos
+        if not is_spectator:
+            client.publish(input_topic, json.dumps({"type": "start", "player_id": client_id}))
+        return
+
+    if LOCKSTEP:
+        # só o P1 inicia a partida; P2/Espectador começam ao receber o seed
+        if is_player1:
+            seed_value = random.randrange(100000)
+            start_lockstep(seed_value)
+            client.publish(mqtt_topic, json.dumps({"player_id": client_id, "seed": seed_value, "sync": SYNC_MODE,
+                                                   "tick": world.tick}))
+            game_log.info("P1 enviou seed: %s", seed_value)
+        return
 
     # Se for P1, gera um seed e envia.
     if is_player1:
-           # Gera um seed aleatório e inicializa o gerador local
+           # Gera um seed aleatório; as alturas dos canos saem só dele (world.schedule)
            seed_value = random.randrange(100000)
-           random.seed(seed_value)
-           # Publica o seed para o P2 e Espectadores
-           client.publish(mqtt_topic, json.dumps({"player_id": client_id, "seed": seed_value}))
-           print(f"P1 enviou seed: {seed_value}")
-    # P2 e Espectador irão receber o seed e aplicá-lo na função on_message
-
-# Verifica se algum pássaro saiu dos limites verticais
-def check_out_of_bounds(player1, player2):
-    global game_state
-    # Apenas verifica colisão se o processo for um jogador (não espectador)
-    if is_spectator:
-        return
-    
-    for bird in (player1, player2):
-        if bird.y - bird.height // 2 < 0 or bird.y + bird.height // 2 > HEIGHT:
-            bird.is_alive = False
-    if not player1.is_alive and not player2.is_alive:
-        game_state = 'game_over'
+           world.reset(seed_value)
+           # Publica o seed para o P2 e Espectadores (retido: quem entrar depois também recebe)
+           client.publish(mqtt_topic, json.dumps({"player_id": client_id, "seed": seed_value}), retain=True)
+           game_log.info("P1 enviou seed: %s", seed_value)
+    else:
+        world.reset()
+    clear_remote_buffers()
+    # nova partida: o primeiro estado vai na hora
+    state_sender.reset()
+    # P2 e Espectador irão receber o seed e aplicá-lo no loop principal (world.set_seed)
+    prev_bird_y = [bird.y for bird in world.birds]
+    prev_track_offset = pipe_track.offset
+    game_state = 'playing'
+    start_recording()
 
-# Inicializa jogadores e pipes
-player1 = Bird(100, HEIGHT // 2, bird_img_red, RED)
-player2 = Bird(100, HEIGHT // 2, bird_img_blue, BLUE)
+# Inicializa jogadores e o mundo da simulação (pista única de canos, compartilhada pelos dois pássaros)
+player1 = Bird(BIRD_X, HEIGHT // 2, bird_img_red, RED, *bird_size)
+player2 = Bird(BIRD_X, HEIGHT // 2, bird_img_blue, BLUE, *bird_size)
 
-pipes1 = []
-pipes2 = []
-spawn_pipe_timer = 0
+# Espectadores não julgam colisões: vida e pontuação vêm dos jogadores (ou do servidor)
+# (no lockstep todos simulam tudo a partir das entradas, inclusive o espectador)
+world = World(birds=[player1, player2], pipe_factory=Pipe, judge_collisions=LOCKSTEP or not all_birds_remote)
+pipe_track = world.track
 
 game_state = 'start_screen'
 
@@ -254,38 +476,153 @@ if is_spectator:
     player_remote = None
     local_color = None
     remote_color = None
+    local_index = None
+    # o y dos dois vem da rede
+    player1.simulated = LOCKSTEP
+    player2.simulated = LOCKSTEP
 else:
     player_local = player1 if is_player1 else player2
     player_remote = player2 if is_player1 else player1
     local_color = 'red' if is_player1 else 'blue'
     remote_color = 'blue' if is_player1 else 'red'
+    local_index = 0 if is_player1 else 1
+    # o y do oponente vem da rede (interpolado no loop principal)
+    player_remote.simulated = LOCKSTEP
+    if SERVER_MODE:
+        # o meu também: quem simula é o servidor
+        player_local.simulated = False
+
+# Sessão lockstep: entradas carimbadas por tick + rollback
+lockstep = LockstepSession(world, local_index)
+lockstep.on_final = record_final_tick
+
+# Placar do HUD: só é renderizado de novo quando a pontuação muda
+score_text_p1 = HudText(score_font, "P1: {}", RED)
+score_text_p2 = HudText(score_font, "P2: {}", BLUE)
 
 # Teclas
 jump_keys = {pygame.K_w: player1, pygame.K_UP: player2}
 clock = pygame.time.Clock()
+timestep = FixedTimestep()
+
+# posições do tick anterior, usadas na interpolação da renderização
+prev_bird_y = [bird.y for bird in world.birds]
+prev_track_offset = pipe_track.offset
+
+if DIRTY_RECTS:
+    renderer = DirtyRectRenderer(screen, SKY_BLUE, debug=DIRTY_DEBUG, debug_font=score_font)
+else:
+    renderer = FullScreenRenderer(screen, SKY_BLUE)
+last_rendered_state = None
 
 # MQTT Client
-client = mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv311)
+client = transport.create(client_id, broker, port)
 client.on_connect = on_connect
 client.on_message = on_message
-client.connect(broker, port)
-client.loop_start()
+if RELAY_SPECTATOR:
+    client.subscribe(topics.spectate_topic(MATCH_ID))
+elif SERVER_MODE:
+    client.subscribe(topics.match_topic(MATCH_ID, topics.STATE))
+    client.subscribe(topics.match_topic(MATCH_ID, topics.CONTROL))
+else:
+    client.subscribe(mqtt_topic)
+client.connect()
+
+game_log.info("Cliente MQTT id=%s | Você é %s", client_id, 'P1 (vermelho)' if is_player1 else ('P2 (azul)' if is_player2 else 'Espectador (plateia)'))
+
+# id do outro jogador (modo ponto a ponto), visto na primeira mensagem dele; destino dos pings
+opponent_id = None
+
+# pulos ainda não entregues à simulação (índices dos pássaros)
+jump_inputs = []
+
+# linhas do overlay de rede, refeitas a cada NETSTATS_REFRESH_MS
+netstats_lines = []
+last_netstats_refresh = 0
+
+
+def draw_netstats():
+    global netstats_lines, last_netstats_refresh
+    now = pygame.time.get_ticks()
+    if now - last_netstats_refresh >= NETSTATS_REFRESH_MS:
+        last_netstats_refresh = now
+        lines = [format_peer(peer_id, stats) for peer_id, stats in sorted(netstats.summary().items())]
+        for color, buffer in remote_buffers.items():
+            if buffer.delay is not None:
+                # (sem acentos: a fonte SuperMario não tem)
+                lines.append(f'{color}: buffer {buffer.delay * 1000 / timestep.tick_rate:.0f} ms'
+                             f'  atrasados {buffer.late}  descartados {buffer.dropped}')
+        if inbox.overflowed:
+            lines.append(f'caixa de entrada cheia: {inbox.overflowed} mensagens descartadas')
+        if EVENT_SENDS and not all_birds_remote and not LOCKSTEP:
+            lines.append(f'envio: {state_sender.events} eventos  {state_sender.keyframes} keyframes'
+                         f'  keyframe a cada {state_sender.interval * 1000 / timestep.tick_rate:.0f} ms')
+        netstats_lines = [score_font.render(line, True, BLACK) for line in lines or ["rede: sem pares"]]
+    y = HEIGHT - 10 - 22 * len(netstats_lines)
+    for surface in netstats_lines:
+        renderer.add(screen.blit(surface, (10, y)))
+        y += 22
 
-print(f"Cliente MQTT id={client_id} | Você é {'P1 (vermelho)' if is_player1 else ('P2 (azul)' if is_player2 else 'Espectador (plateia)')}")
 
 while True:
+    profiler.begin_frame()
+    client.poll()
+    process_network()
+
+    if join_status == 'joining':
+        now = pygame.time.get_ticks()
+        if join_started is None:
+            join_started = now
+        if now - join_started >= JOIN_TIMEOUT_MS:
+            join_status = 'timeout'
+            net_log.warning("o servidor não respondeu ao pedido de entrada na partida %s", MATCH_ID)
+        elif last_join_sent is None or now - last_join_sent >= JOIN_RETRY_MS:
+            last_join_sent = now
+            send_join()
+
+    # ping periódico para medir o RTT: só jogadores, endereçado ao servidor (que só
+    # recebe o canal de entrada) ou ao oponente, assim que se sabe o id dele
+    if not is_spectator:
+        if SERVER_MODE:
+            ping = netstats.ping()
+        else:
+            ping = netstats.ping(to=opponent_id) if opponent_id else None
+        if ping is not None:
+            client.publish(ping_topic, json.dumps(ping))
+    if metrics_exporter is not None:
+        metrics_exporter.maybe_export(netstats, {"game_state": game_state, "tick": world.tick})
+    profiler.mark('network')
+
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            if SERVER_MODE and not is_spectator:
+                client.publish(input_topic, json.dumps({"type": "leave", "player_id": client_id}))
+            if PROFILE_PATH:
+                game_log.info("perfil gravado em %s", profiler.dump(PROFILE_PATH))
+            stop_recording()
             pygame.quit()
-            client.loop_stop()
-            client.disconnect()
+            client.close()
             exit()
+
+        if DIRTY_RECTS and event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+            renderer.debug = not renderer.debug
+            continue
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            show_netstats = not show_netstats
+            last_netstats_refresh = 0
+            continue
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+            if profiler.capture(PROFILE_FRAMES):
+                game_log.info("cProfile dos próximos %d frames -> %s", PROFILE_FRAMES, profiler.capture_path)
+            continue
         
         # Apenas jogadores e espectadores podem resetar o jogo ao receber um start
         if game_state in ('start_screen', 'game_over') and event.type == pygame.KEYDOWN:
             # Apenas P1 deve mandar o seed para evitar conflitos de sincronização.
             # No entanto, todos podem chamar reset_game para limpar as variáveis locais.
-            # O P1 que envia o seed é o único que o random.seed(seed_value) executa ANTES da geração de pipes.
+            # O P1 que envia o seed é o único que o aplica ANTES da geração de pipes.
             # P2/Espectador confia no seed que receberá via MQTT.
             # Como a lógica de Pipes é determinística a partir do seed,
             # os pipes aparecerão na mesma posição para todos após o P1 enviar o seed.
@@ -296,147 +633,215 @@ while True:
             # permite controlar seu pássaro usando a tecla correta (W para vermelho, UP para azul)
             # Verifica se o jogador local está vivo e controla o pássaro correto
             if (is_player1 and event.key == pygame.K_w) or (is_player2 and event.key == pygame.K_UP):
-                player_local.jump()
+                if LOCKSTEP:
+                    tick = lockstep.local_jump()
+                    client.publish(mqtt_topic, wire_codec.encode_input(client_id, tick, local_index))
+                elif SERVER_MODE:
+                    # o pulo vale quando chega ao servidor
+                    client.publish(input_topic, wire_codec.encode_input(client_id, world.tick, local_index))
+                else:
+                    jump_inputs.append(local_index)
+
+    profiler.mark('events')
+
+    # Simulação em passo fixo: roda quantos ticks couberem no tempo real decorrido,
+    # então a velocidade do jogo é a mesma em qualquer máquina, a qualquer FPS.
+    ticks = timestep.advance()
 
     if game_state == 'playing':
         
-        # --- Lógica de JOGADOR ---
-        if not is_spectator:
-            # movimento local
-            player_local.move()
-            check_out_of_bounds(player1, player2)
-
-            # geração e movimento de pipes (só P1 e P2 processam, mas a geração é determinística)
-            # P1 e P2 usam a mesma lógica de geração (determinística via seed)
-            spawn_pipe_timer += 1
-            if spawn_pipe_timer >= 120:
-                pipe_height = random.randint(100, HEIGHT - PIPE_GAP - 100)
-                pipes1.append(Pipe(WIDTH, pipe_height))
-                pipes2.append(Pipe(WIDTH, pipe_height))
-                spawn_pipe_timer = 0
-
-            # Movimento dos pipes (comum a todos, mas só jogadores calculam colisão)
-            for pipe in pipes1:
-                pipe.move()
-            for pipe in pipes2:
-                pipe.move()
-
-            pipes1 = [pipe for pipe in pipes1 if pipe.x + PIPE_WIDTH > 0]
-            pipes2 = [pipe for pipe in pipes2 if pipe.x + PIPE_WIDTH > 0]
-
-            # Verificação de colisão (apenas o jogador local é responsável pela colisão)
-            check_collision(player1, pipes1)
-            check_collision(player2, pipes2)
-
-            if not player1.is_alive and not player2.is_alive:
-                game_state = 'game_over'
-                # Envia game_over para sincronizar
-                client.publish(mqtt_topic, json.dumps({"player_id": client_id, "game_state": 'game_over'}))
-
-
-            # -------- MQTT: envio do estado local (Apenas jogadores enviam) --------
+        for _ in range(ticks):
+            prev_bird_y = [bird.y for bird in world.birds]
+            prev_track_offset = pipe_track.offset
+
+            # Simulação: física do pássaro local, geração/movimento dos pipes (determinística via seed),
+            # limites, colisão e pontuação ficam em simulation.World.
+            # O espectador só gera e move os pipes; vida e pontuação vêm dos jogadores.
+            if LOCKSTEP:
+                # no lockstep os dois pássaros são simulados localmente a partir das entradas
+                lockstep.advance()
+                profiler.mark('simulation')
+                if not is_spectator and local_index not in lockstep.finished and not player_local.is_alive:
+                    # o pássaro local morreu: não há mais pulos dele, o outro lado pode fechar a partida
+                    lockstep.finish(local_index, world.tick)
+                    client.publish(mqtt_topic, json.dumps({"player_id": client_id, "type": "done",
+                                                           "bird": local_index, "tick": world.tick}))
+                if lockstep.desynced and not desynced:
+                    # pulo remoto mais velho que a janela de rollback: as simulações já
+                    # divergiram, então a partida acaba aqui e do outro lado também
+                    desynced = True
+                    game_log.warning("entrada remota fora da janela de rollback no tick %d: partida encerrada",
+                                     world.tick)
+                    client.publish(mqtt_topic, json.dumps({"player_id": client_id, "game_state": 'game_over',
+                                                           "reason": 'desync'}))
+                    game_state = 'game_over'
+                    break
+                # game over só com as entradas remotas confirmadas; até lá segue com rollback
+                if lockstep.settled():
+                    game_state = 'game_over'
+                    break
+                continue
+            tick_jumps = jump_inputs
+            if tick_jumps:
+                local_jumped = True
+            events = world.step(tick_jumps)
+            jump_inputs = []
+            profiler.mark('simulation')
+
+            if events:
+                game_log.debug("tick %d: %s", world.tick, events)
+
+            # --- Lógica de JOGADOR ---
+            if not all_birds_remote:
+                for sim_event in events:
+                    if sim_event[0] == EVENT_GAME_OVER:
+                        game_state = 'game_over'
+                        # Envia game_over para sincronizar
+                        client.publish(mqtt_topic, json.dumps({"player_id": client_id, "game_state": 'game_over'}))
+
+            # -------- Aplicar estado remoto (interpolação) - Comum a todos (jogador e espectador) --------
+            
+            # Lista de pássaros para interpolar (espectador interpola ambos, jogador interpola apenas o remoto)
+            birds_to_interpolate = [player1, player2] if all_birds_remote else [player_remote]
+            colors_to_interpolate = ['red', 'blue'] if all_birds_remote else [remote_color]
+
+            for bird, color in zip(birds_to_interpolate, colors_to_interpolate):
+                remote = remote_states.get(color)
+                if remote is not None:
+                    # Evita tentar interpolar o próprio pássaro no modo jogador, se por acaso receber.
+                    if not all_birds_remote and color == local_color:
+                        continue
+
+                    # espectador fora de sincronia (entrou atrasado): monta a pista no tick dos jogadores
+                    remote_tick = remote.get('tick')
+                    if all_birds_remote and remote_tick is not None and abs(remote_tick - world.tick) > SPECTATOR_RESYNC_TICKS:
+                        world.fast_forward(remote_tick)
+                        clear_remote_buffers()
+                        remote_buffers[color].push(remote_tick, remote['y'], world.tick, remote.get('velocity'))
+
+                    # y no tick mostrado (um pouco atrás do remetente), interpolado entre os estados recebidos
+                    target_y = remote_buffers[color].sample(world.tick)
+                    if target_y is not None:
+                        bird.y = target_y
+                    bird.score = remote.get('score', bird.score)
+                    bird.is_alive = remote.get('alive', bird.is_alive)
+                    if remote.get('game_state') == 'game_over':
+                        game_state = 'game_over'
+            profiler.mark('interpolation')
+
+            if recorder is not None:
+                recorder.record(world.tick - 1, tick_jumps, world.save_state())
+
+            if game_state != 'playing':
+                break
+
+        # -------- MQTT: envio do estado local (Apenas jogadores enviam) --------
+        if not all_birds_remote and not LOCKSTEP:
             current_time = pygame.time.get_ticks()
-            if current_time - last_mqtt_send > 50:
+            if EVENT_SENDS and wire_codec.binary:
+                # keyframes mais frequentes quando os outros medem perda nos nossos estados
+                state_sender.adapt(netstats.reported_loss())
+                send = state_sender.should_send(world.tick, local_jumped, player_local.is_alive,
+                                                player_local.score, game_state)
+            else:
+                send = current_time - last_mqtt_send > 50
+            if send:
                 my_state = {
                     "player_id": client_id,
                     "color": local_color,
                     "y": player_local.y,
+                    # velocidade: o receptor projeta o y até o próximo estado (morto não cai)
+                    "velocity": player_local.velocity if player_local.is_alive else None,
                     "score": player_local.score,
                     "alive": player_local.is_alive,
-                    "game_state": game_state
+                    "game_state": game_state,
+                    "tick": world.tick
                 }
-                client.publish(mqtt_topic, json.dumps(my_state))
+                # sequência e carimbo de envio, para o outro lado medir perda e jitter
+                netstats.stamp(my_state)
+                client.publish(mqtt_topic, wire_codec.encode_state(my_state))
                 last_mqtt_send = current_time
-
-        # --- Lógica de Pipes para ESPECTADOR ---
-        # Espectadores precisam que a lógica de pipe ocorra de forma idêntica (determinística)
-        # para que possam renderizar o cenário corretamente.
-        elif is_spectator:
-            # Geração de pipes (idêntica à de P1/P2 após o seed)
-            spawn_pipe_timer += 1
-            if spawn_pipe_timer >= 120:
-                # O random.seed(seed_value) garante que esta altura seja a mesma para todos
-                pipe_height = random.randint(100, HEIGHT - PIPE_GAP - 100)
-                pipes1.append(Pipe(WIDTH, pipe_height))
-                pipes2.append(Pipe(WIDTH, pipe_height))
-                spawn_pipe_timer = 0
-
-            # Movimento dos pipes
-            for pipe in pipes1:
-                pipe.move()
-            for pipe in pipes2:
-                pipe.move()
-
-            pipes1 = [pipe for pipe in pipes1 if pipe.x + PIPE_WIDTH > 0]
-            pipes2 = [pipe for pipe in pipes2 if pipe.x + PIPE_WIDTH > 0]
-
-
-        # -------- Aplicar estado remoto (interpolação) - Comum a todos (jogador e espectador) --------
-        
-        # Lista de pássaros para interpolar (espectador interpola ambos, jogador interpola apenas o remoto)
-        birds_to_interpolate = [player1, player2] if is_spectator else [player_remote]
-        colors_to_interpolate = ['red', 'blue'] if is_spectator else [remote_color]
-
-        for bird, color in zip(birds_to_interpolate, colors_to_interpolate):
-            remote = remote_states.get(color)
-            if remote is not None:
-                # Evita tentar interpolar o próprio pássaro no modo jogador, se por acaso receber.
-                if not is_spectator and color == local_color:
-                    continue
-
-                target_y = remote.get('y', bird.y)
-                # interpolação suave
-                bird.y += (target_y - bird.y) * INTERPOLATION_SPEED
-                bird.score = remote.get('score', bird.score)
-                bird.is_alive = remote.get('alive', bird.is_alive)
-                if remote.get('game_state') == 'game_over':
-                    game_state = 'game_over'
+                local_jumped = False
+        profiler.mark('publish')
 
 
     # ---------- Renderização ----------
-    screen.fill((135, 206, 235)) 
+    # troca de tela exige redesenho completo no modo de retângulos sujos
+    if game_state != last_rendered_state:
+        renderer.invalidate()
+        last_rendered_state = game_state
+        if game_state == 'game_over':
+            # fim de partida: grava o buffer de log em memória (fora do caminho quente)
+            game_log.info("game over no tick %d: P1 %d x %d P2", world.tick, player1.score, player2.score)
+            game_log.debug("rede: %s", netstats.summary())
+            stop_recording()
+            gamelog.dump('game_over')
+    renderer.begin_frame()
 
     if game_state == 'start_screen':
         start_y = HEIGHT // 2 - 140
         line_spacing = 60
-        title_text = message_font.render("Flappy Bird 2-Player!", True, BLACK)
-        screen.blit(title_text, title_text.get_rect(center=(WIDTH // 2, start_y)))
+        renderer.add(screen.blit(*text_cache.centered(message_font, "Flappy Bird 2-Player!", BLACK, (WIDTH // 2, start_y))))
 
-        screen.blit(text_font.render("P1 (Vermelho): W", True, RED), text_font.render("P1 (Vermelho): W", True, RED).get_rect(center=(WIDTH // 2, start_y + line_spacing)))
-        screen.blit(text_font.render("P2 (Azul): Seta para Cima", True, BLUE), text_font.render("P2 (Azul): Seta para Cima", True, BLUE).get_rect(center=(WIDTH // 2, start_y + 2 * line_spacing)))
-        screen.blit(text_font.render("Pressione qualquer tecla para começar", True, BLACK), text_font.render("Pressione qualquer tecla para começar", True, BLACK).get_rect(center=(WIDTH // 2, start_y + 3 * line_spacing)))
+        renderer.add(screen.blit(*text_cache.centered(text_font, "P1 (Vermelho): W", RED, (WIDTH // 2, start_y + line_spacing))))
+        renderer.add(screen.blit(*text_cache.centered(text_font, "P2 (Azul): Seta para Cima", BLUE, (WIDTH // 2, start_y + 2 * line_spacing))))
+        renderer.add(screen.blit(*text_cache.centered(text_font, "Pressione qualquer tecla para começar", BLACK, (WIDTH // 2, start_y + 3 * line_spacing))))
         if is_spectator:
-             screen.blit(text_font.render("(MODO ESPECTADOR)", True, BLACK), text_font.render("(MODO ESPECTADOR)", True, BLACK).get_rect(center=(WIDTH // 2, start_y + 4 * line_spacing)))
+             renderer.add(screen.blit(*text_cache.centered(text_font, "(MODO ESPECTADOR)", BLACK, (WIDTH // 2, start_y + 4 * line_spacing))))
+        elif join_status in JOIN_MESSAGES:
+            renderer.add(screen.blit(*text_cache.centered(score_font, JOIN_MESSAGES[join_status], BLACK, (WIDTH // 2, start_y + 4 * line_spacing))))
 
 
     elif game_state == 'playing':
-        for pipe in pipes1: pipe.draw(screen)
-        for pipe in pipes2: pipe.draw(screen)
-        player1.draw(screen)
-        player2.draw(screen)
-        screen.blit(score_font.render(f"P1: {player1.score}", True, RED), (10, 10))
-        screen.blit(score_font.render(f"P2: {player2.score}", True, BLUE), (10, 40))
+        if RENDER_INTERPOLATION:
+            # desenha entre o tick anterior e o atual
+            alpha = timestep.alpha
+            render_offset = lerp(prev_track_offset, pipe_track.offset, alpha)
+            for pipe in pipe_track: renderer.add(pipe.draw(screen, int(pipe.world_x - render_offset)))
+            renderer.add(player1.draw(screen, lerp(prev_bird_y[0], player1.y, alpha)))
+            renderer.add(player2.draw(screen, lerp(prev_bird_y[1], player2.y, alpha)))
+        else:
+            for pipe in pipe_track: renderer.add(pipe.draw(screen))
+            renderer.add(player1.draw(screen))
+            renderer.add(player2.draw(screen))
+        renderer.add(screen.blit(score_text_p1.surface(player1.score), (10, 10)))
+        renderer.add(screen.blit(score_text_p2.surface(player2.score), (10, 40)))
         if not player1.is_alive:
-            screen.blit(text_font.render("P1 Fora!", True, RED), (WIDTH // 2 - 100, HEIGHT // 4))
+            renderer.add(screen.blit(text_cache.render(text_font, "P1 Fora!", RED), (WIDTH // 2 - 100, HEIGHT // 4)))
         if not player2.is_alive:
-            screen.blit(text_font.render("P2 Fora!", True, BLUE), (WIDTH // 2 + 30, HEIGHT // 4))
+            renderer.add(screen.blit(text_cache.render(text_font, "P2 Fora!", BLUE), (WIDTH // 2 + 30, HEIGHT // 4)))
         
         if is_spectator:
-            screen.blit(text_font.render("ESPECTADOR", True, BLACK), (WIDTH - 250, 10))
+            renderer.add(screen.blit(text_cache.render(text_font, "ESPECTADOR", BLACK), (WIDTH - 250, 10)))
 
 
     else:  # game_over
         winner_text = "Empate!"
         if player1.score > player2.score: winner_text = "O Jogador 1 VENCEU!"
         elif player2.score > player1.score: winner_text = "O Jogador 2 VENCEU!"
-        screen.blit(text_font.render(f"P1 Pontos: {player1.score}", True, RED), text_font.render(f"P1 Pontos: {player1.score}", True, RED).get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100)))
-        screen.blit(text_font.render(f"P2 Pontos: {player2.score}", True, BLUE), text_font.render(f"P2 Pontos: {player2.score}", True, BLUE).get_rect(center=(WIDTH // 2, HEIGHT // 2 - 50)))
-        screen.blit(message_font.render(winner_text, True, BLACK), message_font.render(winner_text, True, BLACK).get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50)))
-        screen.blit(text_font.render("Pressione qualquer tecla para jogar de novo", True, BLACK), text_font.render("Pressione qualquer tecla para jogar de novo", True, BLACK).get_rect(center=(WIDTH // 2, HEIGHT // 2 + 120)))
+        renderer.add(screen.blit(*text_cache.centered(text_font, f"P1 Pontos: {player1.score}", RED, (WIDTH // 2, HEIGHT // 2 - 100))))
+        renderer.add(screen.blit(*text_cache.centered(text_font, f"P2 Pontos: {player2.score}", BLUE, (WIDTH // 2, HEIGHT // 2 - 50))))
+        renderer.add(screen.blit(*text_cache.centered(message_font, winner_text, BLACK, (WIDTH // 2, HEIGHT // 2 + 50))))
+        renderer.add(screen.blit(*text_cache.centered(text_font, "Pressione qualquer tecla para jogar de novo", BLACK, (WIDTH // 2, HEIGHT // 2 + 120))))
+        if desynced:
+            renderer.add(screen.blit(*text_cache.centered(text_font, "Partida dessincronizada", BLACK, (WIDTH // 2, HEIGHT // 2 - 150))))
         
         if is_spectator:
-            screen.blit(text_font.render("ESPECTADOR", True, BLACK), (WIDTH - 250, 10))
+            renderer.add(screen.blit(text_cache.render(text_font, "ESPECTADOR", BLACK), (WIDTH - 250, 10)))
 
 
-    pygame.display.flip()
-    clock.tick(60)
\ No newline at end of file
+    if show_netstats:
+        draw_netstats()
+    profiler.mark('render')
+
+    renderer.end_frame()
+    profiler.mark('present')
+    if RENDER_FPS > 0:
+        clock.tick(RENDER_FPS)
+    else:
+        clock.tick()
+    profiler.mark('wait')
+    profiler.end_frame()
+    if profiler.last_capture_report:
+        game_log.info("cProfile gravado em %s\n%s", profiler.capture_path, profiler.last_capture_report)
+        profiler.last_capture_report = None
\ No newline at end of file
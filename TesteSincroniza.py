@@ -4,6 +4,14 @@ import os
 import json
 import paho.mqtt.client as mqtt
 import time
+from wire import WireCodec
+from snapshots import SnapshotSender, SnapshotReceiver, capture, receive_snapshot
+from render_cache import PipeSpriteCache, TextCache, HudText
+from simulation import (World, WIDTH, HEIGHT, BIRD_X, BIRD_WIDTH, BIRD_HEIGHT, PIPE_WIDTH, PIPE_GAP,
+                        EVENT_GAME_OVER)
+from sprites import Bird, Pipe
+from inbox import Inbox
+from jitter_buffer import JitterBuffer
 
 pygame.init()
 
@@ -12,6 +20,9 @@ broker = "broker.emqx.io"
 port = 1883
 mqtt_topic = "flappybird2player/game"
 client_id = f'player-{random.randint(0, 100000)}'
+# Formato do estado dos jogadores: binário (padrão) ou JSON (FLAPPY_WIRE=json).
+# Se algum cliente antigo publicar estado em JSON, o envio cai para JSON sozinho.
+wire_codec = WireCodec(binary=os.environ.get("FLAPPY_WIRE", "binary") != "json")
 
 # --- Escolha do jogador local ---
 # Ao iniciar, escolha se este processo será o player 1 (vermelho) ou player 2 (azul).
@@ -21,15 +32,23 @@ is_player1 = (choice == '1')
 is_player2 = (choice == '2') 
 is_spectator = (choice == '3')
 
-# estado remoto armazenado (por cor)
+# estado remoto armazenado (por cor); só a thread do jogo escreve aqui (ver process_network)
 remote_states = {
     'red': None,
     'blue': None
 }
+# y remoto de cada cor por tick do remetente, desenhado com atraso e interpolado (ver jitter_buffer.py)
+remote_buffers = {
+    'red': JitterBuffer(),
+    'blue': JitterBuffer()
+}
 
 # estado global do jogo
 game_state = 'start_screen'
 
+# mensagens recebidas pela thread do MQTT, esvaziadas pelo loop principal a cada frame
+inbox = Inbox()
+
 # Callback MQTT
 
 def on_connect(client, userdata, flags, reasonCode, properties=None):
@@ -41,10 +60,9 @@ def on_connect(client, userdata, flags, reasonCode, properties=None):
 
 
 def on_message(client, userdata, msg):
+    # Roda na thread do paho: só decodifica e enfileira, sem tocar no estado do jogo.
     try:
-        data = json.loads(msg.payload.decode())
-        # debug
-        print("Recebido MQTT:", data)
+        data = wire_codec.decode(msg.payload)
 
         # ignora minhas próprias mensagens SE não for espectador
         if not is_spectator and data.get("player_id") == client_id:
@@ -52,48 +70,62 @@ def on_message(client, userdata, msg):
 
         color = data.get("color")
         if color in ('red', 'blue'):
-            # grava o estado remoto para ser usado no loop principal (interpolação segura)
-            # Para o espectador, ambos são "remotos"
-            # Para o jogador, apenas o oponente é "remoto"
-            remote_states[color] = data
-            
+            # estado contínuo: só o mais recente de cada cor é aplicado
+            inbox.put_state(color, data)
+        else:
+            # seed, snapshots e confirmações: todas, na ordem de chegada
+            inbox.put_event(data)
+
+    except Exception as e:
+        print("Erro processando mensagem MQTT:", e)
+
+
+def process_network():
+    # Aplica o que chegou da rede desde o último frame, na thread do jogo
+    # (é ela que itera sobre os canos e pássaros).
+    global game_state
+    for color, data in inbox.drain_states().items():
+        # grava o estado remoto para ser usado no loop principal (interpolação segura)
+        # Para o espectador, ambos são "remotos"
+        # Para o jogador, apenas o oponente é "remoto"
+        remote_states[color] = data
+        remote_buffers[color].push(data.get("tick", world.tick), data["y"], world.tick, data.get("velocity"))
+
+    for data in inbox.drain_events():
         if "seed" in data:
             # P2 e Espectador precisam aplicar o seed do P1
             if not is_player1: 
                 seed_value = data["seed"]
-                random.seed(seed_value)
+                world.set_seed(seed_value)
                 print(f"P2/Espectador aplicou seed: {seed_value}")
                 
+        # confirmações de snapshot dos receptores (base para os próximos deltas)
+        if data.get("type") == "snapshot_ack":
+            if is_player1:
+                snapshot_sender.ack(data.get("player_id"), data.get("seq"), data.get("need_keyframe", False))
+
         # sincroniza estado do jogo (se alguém mandar game_over)
         if data.get("type") == "snapshot":
     # Apenas aplica snapshot se este processo NÃO for P1 (pois P1 já é "autoridade")
             if not is_player1:
-                global pipes1, pipes2
-                pipes1.clear()
-                pipes2.clear()
-                for p in data["pipes"]:
-                    pipes1.append(Pipe(p["x"], p["y_top_end"]))
-                    pipes2.append(Pipe(p["x"], p["y_top_end"]))
-                
-                # Atualiza pontuação
-                player1.score = data["scores"].get("red", player1.score)
-                player2.score = data["scores"].get("blue", player2.score)
-                
-                # Atualiza estado de vida se enviado
-                if "alive" in data:
-                    player1.is_alive = data["alive"].get("red", player1.is_alive)
-                    player2.is_alive = data["alive"].get("blue", player2.is_alive)
-                
-                # Atualiza estado global do jogo
-                game_state = data.get("state", game_state)
+                snapshot, reply = receive_snapshot(snapshot_receiver, data, pipe_track, (player1, player2), Pipe, client_id)
+                if snapshot is None:
+                    # delta sobre uma base que não temos: pede um keyframe
+                    if reply is not None:
+                        client.publish(mqtt_topic, json.dumps(reply))
+                    continue
 
+                # Atualiza estado global do jogo
+                game_state = snapshot.get("state", game_state)
 
-    except Exception as e:
-        print("Erro processando mensagem MQTT:", e)
+                # só o P2 confirma: a base do delta é o menor ack, então um espectador
+                # (ou vários) confirmando no tópico compartilhado prenderia a base de todos
+                if is_player2:
+                    client.publish(mqtt_topic, json.dumps(reply))
 
 
 # --- Configurações do jogo ---
-WIDTH, HEIGHT = 1200, 700
+# (dimensões e física ficam em simulation.py)
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
 # Note: Certifique-se de que 'SuperMario.ttf' esteja no mesmo diretório
 try:
@@ -106,165 +138,60 @@ except:
     text_font = pygame.font.Font(None, 40) 
     score_font = pygame.font.Font(None, 20)
 
+# Cache de textos renderizados (menus, avisos e game over)
+text_cache = TextCache()
+
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 
-BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT = 45, 30 
-PIPE_WIDTH = 50 
-
 try:
     bird_img_red = pygame.image.load(os.path.join('.', 'RedBird.png')).convert_alpha()
     bird_img_blue = pygame.image.load(os.path.join('.', 'Yellow_bird.png')).convert_alpha() 
-    bird_img_red = pygame.transform.scale(bird_img_red, (BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT))
-    bird_img_blue = pygame.transform.scale(bird_img_blue, (BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT))
+    bird_img_red = pygame.transform.scale(bird_img_red, (BIRD_WIDTH, BIRD_HEIGHT))
+    bird_img_blue = pygame.transform.scale(bird_img_blue, (BIRD_WIDTH, BIRD_HEIGHT))
     pipe_img = pygame.image.load(os.path.join('.', 'Pipe.png')).convert_alpha()
-    BIRD_WIDTH, BIRD_HEIGHT = BIRD_DEFAULT_WIDTH, BIRD_DEFAULT_HEIGHT
+    bird_size = (BIRD_WIDTH, BIRD_HEIGHT)
 except pygame.error as e:
     print(f"ATENÇÃO: Erro ao carregar imagens! Usando formas simples. Erro: {e}")
     bird_img_red, bird_img_blue, pipe_img = None, None, None
-    BIRD_WIDTH, BIRD_HEIGHT = 30, 30
-
-PIPE_GAP = 200
-GRAVITY = 0.5
-JUMP_STRENGTH = -10
-PIPE_SPEED = 3
+    bird_size = (30, 30)
 
 last_mqtt_send = 0 
-INTERPOLATION_SPEED = 0.2 
-
-class Bird:
-    def __init__(self, x, y, image, color):
-        self.x, self.initial_y = x, y
-        self.y = y
-        self.image = image
-        self.color = color
-        self.width = BIRD_WIDTH
-        self.height = BIRD_HEIGHT
-        self.reset()
-    
-    def reset(self):
-        self.y = self.initial_y
-        self.velocity = 0
-        self.score = 0
-        self.is_alive = True
-    
-    def jump(self):
-        if self.is_alive:
-            self.velocity = JUMP_STRENGTH
-    
-    def move(self):
-        if self.is_alive:
-            self.velocity += GRAVITY
-            self.y += self.velocity
-    
-    def draw(self, screen):
-        if self.is_alive and self.image:
-            screen.blit(self.image, (self.x - self.width // 2, int(self.y) - self.height // 2))
-        elif self.is_alive:
-            pygame.draw.circle(screen, self.color, (self.x, int(self.y)), self.width // 2)
-    
-    def get_rect(self):
-        margin_x = int(self.width * 0.45)
-        margin_y = int(self.height * 0.10)
-        return pygame.Rect(
-            self.x - self.width // 2 + margin_x,
-            self.y - self.height // 2 + margin_y,
-            self.width - 2 * margin_x,
-            self.height - 2 * margin_y
-        )
-
-class Pipe:
-    def __init__(self, x, y_top_end):
-        self.x = x
-        self.y_top_end = y_top_end
-        self.passed = False
-        self.width = PIPE_WIDTH
-        if pipe_img:
-            self.image_top = pygame.transform.scale(pipe_img, (PIPE_WIDTH, self.y_top_end))
-            bottom_height = HEIGHT - (self.y_top_end + PIPE_GAP)
-            bottom_pipe = pygame.transform.scale(pipe_img, (PIPE_WIDTH, bottom_height))
-            self.image_bottom = pygame.transform.flip(bottom_pipe, False, True)
-        else:
-            self.image_top = None
-            self.image_bottom = None
-    
-    def move(self):
-        self.x -= PIPE_SPEED
-    
-    def draw(self, screen):
-        if self.image_top and self.image_bottom:
-            screen.blit(self.image_top, (self.x, self.y_top_end - self.image_top.get_height()))
-            screen.blit(self.image_bottom, (self.x, self.y_top_end + PIPE_GAP))
-        else:
-            pygame.draw.rect(screen, BLACK, (self.x, 0, self.width, self.y_top_end))
-            pygame.draw.rect(screen, BLACK, (self.x, self.y_top_end + PIPE_GAP, self.width, HEIGHT - (self.y_top_end + PIPE_GAP)))
-
+last_snapshot_send = 0
+SNAPSHOT_INTERVAL = 1000  # ms
 
-def check_collision(bird, pipes):
-    # Apenas verifica colisão se o processo for um jogador (não espectador)
-    if is_spectator or not bird.is_alive:
-        return False
+# Snapshots keyframe + delta (P1 envia, P2/Espectador recebem)
+snapshot_sender = SnapshotSender()
+snapshot_receiver = SnapshotReceiver()
 
-    bird_rect = bird.get_rect()
-    COLLISION_MARGIN = 5
-
-    for pipe in pipes:
-        pipe_rect_top = pygame.Rect(pipe.x + COLLISION_MARGIN, 0, pipe.width - 2 * COLLISION_MARGIN, pipe.y_top_end)
-        pipe_rect_bottom = pygame.Rect(pipe.x + COLLISION_MARGIN, pipe.y_top_end + PIPE_GAP, pipe.width - 2 * COLLISION_MARGIN, HEIGHT - (pipe.y_top_end + PIPE_GAP))
-        if bird_rect.colliderect(pipe_rect_top) or bird_rect.colliderect(pipe_rect_bottom):
-            bird.is_alive = False
-            return True
-        if not pipe.passed and bird.x > pipe.x + PIPE_WIDTH:
-            pipe.passed = True
-            bird.score += 1
-    return False
+# Cache das imagens dos canos por altura (evita scale/flip a cada Pipe criado)
+if pipe_img:
+    Pipe.sprite_cache = PipeSpriteCache(pipe_img, PIPE_WIDTH, HEIGHT, PIPE_GAP)
 
 
 def reset_game():
-    global pipes1, pipes2, spawn_pipe_timer, game_state
-    player1.reset()
-    player2.reset()
-    pipes1 = []
-    pipes2 = []
-    spawn_pipe_timer = 0
+    global game_state
+    world.reset()
+    for buffer in remote_buffers.values():
+        buffer.clear()
     game_state = 'playing'
 
-    # Se for P1, gera um seed e envia.
-    # Apenas P1 envia snapshots para manter sincronização
+    # Apenas P1 envia snapshots para manter sincronização (ver loop principal).
+    # Nova partida: a pista recomeça, então o próximo snapshot é um keyframe.
     if is_player1:
-        if current_time - last_snapshot_send > 1000:  # a cada 1s
-            snapshot = {
-                "type": "snapshot",
-                "pipes": [{"x": p.x, "y_top_end": p.y_top_end} for p in pipes1],
-                "scores": {"red": player1.score, "blue": player2.score},
-                "state": game_state
-            }
-            client.publish(mqtt_topic, json.dumps(snapshot))
-            last_snapshot_send = current_time
-
-
-def check_out_of_bounds(player1, player2):
-    global game_state
-    # Apenas verifica colisão se o processo for um jogador (não espectador)
-    if is_spectator:
-        return
-    
-    for bird in (player1, player2):
-        if bird.y - bird.height // 2 < 0 or bird.y + bird.height // 2 > HEIGHT:
-            bird.is_alive = False
-    if not player1.is_alive and not player2.is_alive:
-        game_state = 'game_over'
-
-# Inicializa jogadores e pipes
-player1 = Bird(100, HEIGHT // 2, bird_img_red, RED)
-player2 = Bird(100, HEIGHT // 2, bird_img_blue, BLUE)
-
-pipes1 = []
-pipes2 = []
-spawn_pipe_timer = 0
+        snapshot_sender.force_keyframe = True
+
+
+# Inicializa jogadores e o mundo da simulação (pista única de canos, compartilhada pelos dois pássaros)
+player1 = Bird(BIRD_X, HEIGHT // 2, bird_img_red, RED, *bird_size)
+player2 = Bird(BIRD_X, HEIGHT // 2, bird_img_blue, BLUE, *bird_size)
+
+# Espectadores não julgam colisões: vida e pontuação vêm dos jogadores
+world = World(birds=[player1, player2], pipe_factory=Pipe, judge_collisions=not is_spectator)
+pipe_track = world.track
 
 game_state = 'start_screen'
 
@@ -276,11 +203,22 @@ if is_spectator:
     player_remote = None
     local_color = None
     remote_color = None
+    local_index = None
+    # o y dos dois vem da rede
+    player1.simulated = False
+    player2.simulated = False
 else:
     player_local = player1 if is_player1 else player2
     player_remote = player2 if is_player1 else player1
     local_color = 'red' if is_player1 else 'blue'
     remote_color = 'blue' if is_player1 else 'red'
+    local_index = 0 if is_player1 else 1
+    # o y do oponente vem da rede (interpolado no loop principal)
+    player_remote.simulated = False
+
+# Placar do HUD: só é renderizado de novo quando a pontuação muda
+score_text_p1 = HudText(score_font, "P1: {}", RED)
+score_text_p2 = HudText(score_font, "P2: {}", BLUE)
 
 # Teclas
 jump_keys = {pygame.K_w: player1, pygame.K_UP: player2}
@@ -296,6 +234,10 @@ client.loop_start()
 print(f"Cliente MQTT id={client_id} | Você é {'P1 (vermelho)' if is_player1 else ('P2 (azul)' if is_player2 else 'Espectador (plateia)')}")
 
 while True:
+    process_network()
+
+    # pulos deste frame, entregues à simulação (índices dos pássaros)
+    jump_inputs = []
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             pygame.quit()
@@ -307,7 +249,7 @@ while True:
         if game_state in ('start_screen', 'game_over') and event.type == pygame.KEYDOWN:
             # Apenas P1 deve mandar o seed para evitar conflitos de sincronização.
             # No entanto, todos podem chamar reset_game para limpar as variáveis locais.
-            # O P1 que envia o seed é o único que o random.seed(seed_value) executa ANTES da geração de pipes.
+            # O P1 que envia o seed é o único que o aplica ANTES da geração de pipes.
             # P2/Espectador confia no seed que receberá via MQTT.
             # Como a lógica de Pipes é determinística a partir do seed,
             # os pipes aparecerão na mesma posição para todos após o P1 enviar o seed.
@@ -318,42 +260,22 @@ while True:
             # permite controlar seu pássaro usando a tecla correta (W para vermelho, UP para azul)
             # Verifica se o jogador local está vivo e controla o pássaro correto
             if (is_player1 and event.key == pygame.K_w) or (is_player2 and event.key == pygame.K_UP):
-                player_local.jump()
+                jump_inputs.append(local_index)
 
     if game_state == 'playing':
         
+        # Simulação: física do pássaro local, geração/movimento dos pipes (determinística via seed),
+        # limites, colisão e pontuação ficam em simulation.World.
+        # O espectador só gera e move os pipes; vida e pontuação vêm dos jogadores.
+        events = world.step(jump_inputs)
+
         # --- Lógica de JOGADOR ---
         if not is_spectator:
-            # movimento local
-            player_local.move()
-            check_out_of_bounds(player1, player2)
-
-            # geração e movimento de pipes (só P1 e P2 processam, mas a geração é determinística)
-            # P1 e P2 usam a mesma lógica de geração (determinística via seed)
-            spawn_pipe_timer += 1
-            if spawn_pipe_timer >= 120:
-                pipe_height = random.randint(100, HEIGHT - PIPE_GAP - 100)
-                pipes1.append(Pipe(WIDTH, pipe_height))
-                pipes2.append(Pipe(WIDTH, pipe_height))
-                spawn_pipe_timer = 0
-
-            # Movimento dos pipes (comum a todos, mas só jogadores calculam colisão)
-            for pipe in pipes1:
-                pipe.move()
-            for pipe in pipes2:
-                pipe.move()
-
-            pipes1 = [pipe for pipe in pipes1 if pipe.x + PIPE_WIDTH > 0]
-            pipes2 = [pipe for pipe in pipes2 if pipe.x + PIPE_WIDTH > 0]
-
-            # Verificação de colisão (apenas o jogador local é responsável pela colisão)
-            check_collision(player1, pipes1)
-            check_collision(player2, pipes2)
-
-            if not player1.is_alive and not player2.is_alive:
-                game_state = 'game_over'
-                # Envia game_over para sincronizar
-                client.publish(mqtt_topic, json.dumps({"player_id": client_id, "game_state": 'game_over'}))
+            for sim_event in events:
+                if sim_event[0] == EVENT_GAME_OVER:
+                    game_state = 'game_over'
+                    # Envia game_over para sincronizar
+                    client.publish(mqtt_topic, json.dumps({"player_id": client_id, "game_state": 'game_over'}))
 
 
             # -------- MQTT: envio do estado local (Apenas jogadores enviam) --------
@@ -363,34 +285,24 @@ while True:
                     "player_id": client_id,
                     "color": local_color,
                     "y": player_local.y,
+                    "velocity": player_local.velocity if player_local.is_alive else None,
                     "score": player_local.score,
                     "alive": player_local.is_alive,
-                    "game_state": game_state
+                    "game_state": game_state,
+                    "tick": world.tick
                 }
-                client.publish(mqtt_topic, json.dumps(my_state))
+                client.publish(mqtt_topic, wire_codec.encode_state(my_state))
                 last_mqtt_send = current_time
 
-        # --- Lógica de Pipes para ESPECTADOR ---
-        # Espectadores precisam que a lógica de pipe ocorra de forma idêntica (determinística)
-        # para que possam renderizar o cenário corretamente.
-        elif is_spectator:
-            # Geração de pipes (idêntica à de P1/P2 após o seed)
-            spawn_pipe_timer += 1
-            if spawn_pipe_timer >= 120:
-                # O random.seed(seed_value) garante que esta altura seja a mesma para todos
-                pipe_height = random.randint(100, HEIGHT - PIPE_GAP - 100)
-                pipes1.append(Pipe(WIDTH, pipe_height))
-                pipes2.append(Pipe(WIDTH, pipe_height))
-                spawn_pipe_timer = 0
-
-            # Movimento dos pipes
-            for pipe in pipes1:
-                pipe.move()
-            for pipe in pipes2:
-                pipe.move()
-
-            pipes1 = [pipe for pipe in pipes1 if pipe.x + PIPE_WIDTH > 0]
-            pipes2 = [pipe for pipe in pipes2 if pipe.x + PIPE_WIDTH > 0]
+            # Apenas P1 envia snapshots para manter sincronização
+            if is_player1 and current_time - last_snapshot_send > SNAPSHOT_INTERVAL:
+                snapshot = capture(pipe_track, {
+                    "scores": {"red": player1.score, "blue": player2.score},
+                    "alive": {"red": player1.is_alive, "blue": player2.is_alive},
+                    "state": game_state
+                })
+                client.publish(mqtt_topic, json.dumps(snapshot_sender.make(snapshot)))
+                last_snapshot_send = current_time
 
 
         # -------- Aplicar estado remoto (interpolação) - Comum a todos (jogador e espectador) --------
@@ -406,9 +318,10 @@ while True:
                 if not is_spectator and color == local_color:
                     continue
 
-                target_y = remote.get('y', bird.y)
-                # interpolação suave
-                bird.y += (target_y - bird.y) * INTERPOLATION_SPEED
+                # y no tick mostrado (um pouco atrás do remetente), interpolado entre os estados recebidos
+                target_y = remote_buffers[color].sample(world.tick)
+                if target_y is not None:
+                    bird.y = target_y
                 bird.score = remote.get('score', bird.score)
                 bird.is_alive = remote.get('alive', bird.is_alive)
                 if remote.get('game_state') == 'game_over':
@@ -421,43 +334,41 @@ while True:
     if game_state == 'start_screen':
         start_y = HEIGHT // 2 - 140
         line_spacing = 60
-        title_text = message_font.render("Flappy Bird 2-Player!", True, BLACK)
-        screen.blit(title_text, title_text.get_rect(center=(WIDTH // 2, start_y)))
+        screen.blit(*text_cache.centered(message_font, "Flappy Bird 2-Player!", BLACK, (WIDTH // 2, start_y)))
 
-        screen.blit(text_font.render("P1 (Vermelho): W", True, RED), text_font.render("P1 (Vermelho): W", True, RED).get_rect(center=(WIDTH // 2, start_y + line_spacing)))
-        screen.blit(text_font.render("P2 (Azul): Seta para Cima", True, BLUE), text_font.render("P2 (Azul): Seta para Cima", True, BLUE).get_rect(center=(WIDTH // 2, start_y + 2 * line_spacing)))
-        screen.blit(text_font.render("Pressione qualquer tecla para começar", True, BLACK), text_font.render("Pressione qualquer tecla para começar", True, BLACK).get_rect(center=(WIDTH // 2, start_y + 3 * line_spacing)))
+        screen.blit(*text_cache.centered(text_font, "P1 (Vermelho): W", RED, (WIDTH // 2, start_y + line_spacing)))
+        screen.blit(*text_cache.centered(text_font, "P2 (Azul): Seta para Cima", BLUE, (WIDTH // 2, start_y + 2 * line_spacing)))
+        screen.blit(*text_cache.centered(text_font, "Pressione qualquer tecla para começar", BLACK, (WIDTH // 2, start_y + 3 * line_spacing)))
         if is_spectator:
-             screen.blit(text_font.render("(MODO ESPECTADOR)", True, BLACK), text_font.render("(MODO ESPECTADOR)", True, BLACK).get_rect(center=(WIDTH // 2, start_y + 4 * line_spacing)))
+             screen.blit(*text_cache.centered(text_font, "(MODO ESPECTADOR)", BLACK, (WIDTH // 2, start_y + 4 * line_spacing)))
 
 
     elif game_state == 'playing':
-        for pipe in pipes1: pipe.draw(screen)
-        for pipe in pipes2: pipe.draw(screen)
+        for pipe in pipe_track: pipe.draw(screen)
         player1.draw(screen)
         player2.draw(screen)
-        screen.blit(score_font.render(f"P1: {player1.score}", True, RED), (10, 10))
-        screen.blit(score_font.render(f"P2: {player2.score}", True, BLUE), (10, 40))
+        screen.blit(score_text_p1.surface(player1.score), (10, 10))
+        screen.blit(score_text_p2.surface(player2.score), (10, 40))
         if not player1.is_alive:
-            screen.blit(text_font.render("P1 Fora!", True, RED), (WIDTH // 2 - 100, HEIGHT // 4))
+            screen.blit(text_cache.render(text_font, "P1 Fora!", RED), (WIDTH // 2 - 100, HEIGHT // 4))
         if not player2.is_alive:
-            screen.blit(text_font.render("P2 Fora!", True, BLUE), (WIDTH // 2 + 30, HEIGHT // 4))
+            screen.blit(text_cache.render(text_font, "P2 Fora!", BLUE), (WIDTH // 2 + 30, HEIGHT // 4))
         
         if is_spectator:
-            screen.blit(text_font.render("ESPECTADOR", True, BLACK), (WIDTH - 250, 10))
+            screen.blit(text_cache.render(text_font, "ESPECTADOR", BLACK), (WIDTH - 250, 10))
 
 
     else:  # game_over
         winner_text = "Empate!"
         if player1.score > player2.score: winner_text = "O Jogador 1 VENCEU!"
         elif player2.score > player1.score: winner_text = "O Jogador 2 VENCEU!"
-        screen.blit(text_font.render(f"P1 Pontos: {player1.score}", True, RED), text_font.render(f"P1 Pontos: {player1.score}", True, RED).get_rect(center=(WIDTH // 2, HEIGHT // 2 - 100)))
-        screen.blit(text_font.render(f"P2 Pontos: {player2.score}", True, BLUE), text_font.render(f"P2 Pontos: {player2.score}", True, BLUE).get_rect(center=(WIDTH // 2, HEIGHT // 2 - 50)))
-        screen.blit(message_font.render(winner_text, True, BLACK), message_font.render(winner_text, True, BLACK).get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50)))
-        screen.blit(text_font.render("Pressione qualquer tecla para jogar de novo", True, BLACK), text_font.render("Pressione qualquer tecla para jogar de novo", True, BLACK).get_rect(center=(WIDTH // 2, HEIGHT // 2 + 120)))
+        screen.blit(*text_cache.centered(text_font, f"P1 Pontos: {player1.score}", RED, (WIDTH // 2, HEIGHT // 2 - 100)))
+        screen.blit(*text_cache.centered(text_font, f"P2 Pontos: {player2.score}", BLUE, (WIDTH // 2, HEIGHT // 2 - 50)))
+        screen.blit(*text_cache.centered(message_font, winner_text, BLACK, (WIDTH // 2, HEIGHT // 2 + 50)))
+        screen.blit(*text_cache.centered(text_font, "Pressione qualquer tecla para jogar de novo", BLACK, (WIDTH // 2, HEIGHT // 2 + 120)))
         
         if is_spectator:
-            screen.blit(text_font.render("ESPECTADOR", True, BLACK), (WIDTH - 250, 10))
+            screen.blit(text_cache.render(text_font, "ESPECTADOR", BLACK), (WIDTH - 250, 10))
 
 
     pygame.display.flip()
@@ -0,0 +1,394 @@
+import argparse
+import json
+import os
+import random
+import time
+
+import numpy as np
+
+import gamelog
+import topics
+import transport
+import wire
+from flock import Flock, BattleWorld, JitterTable, should_jump, MAX_BIRDS
+from inbox import Inbox
+from netstats import now_ms
+from simulation import WIDTH, HEIGHT, BIRD_WIDTH, BIRD_HEIGHT, PIPE_WIDTH, PIPE_GAP, SPAWN_INTERVAL
+from timestep import FixedTimestep
+
+# Modo batalha: de 16 a 64 pássaros na mesma partida, o último vivo vence.
+# Cada processo simula o próprio pássaro e os seus bots (--bots) e publica o estado
+# binário de cada um (wire.encode_state, como o Flappy.py no modo 'state') em
+# flappybird/<partida>/battle nos pulos, mortes e pontos e num keyframe a cada 500 ms:
+# entre eles os outros projetam o y pela velocidade (ver state_sender.py). Os pássaros dos outros processos entram
+# numa tabela de jogadores por player_id, sem cores nem vagas fixas, e seguem o y
+# recebido, projetado por um JitterBuffer por jogador (jitter_buffer.py), amostrados todos
+# juntos a cada tick (flock.JitterTable). Os pássaros ficam num Flock (flock.py): física,
+# limites e colisão de todos rodam vetorizados, uma vez por tick.
+#
+# Rodadas: quem aperta uma tecla fora de partida publica (retido) o seed da rodada
+# seguinte, {"type": "round", "round": n, "seed": ...}, e todos recomeçam com ele.
+# Se dois começarem a mesma rodada ao mesmo tempo, vale a do menor player_id.
+# Quem entra atrasado recebe o seed retido e pula para o tick dos outros.
+#
+# Uso: python battle.py --bots 15 --broker localhost [--match sala1]
+#      FLAPPY_TRANSPORT=loopback python battle.py --bots 63   (sozinho com bots, sem broker)
+
+# sem pings no modo batalha, não há medida de perda para adaptar o intervalo
+# (state_sender.py): fica num meio-termo fixo
+KEYFRAME_TICKS = 30                # 500 ms
+REMOTE_TIMEOUT_MS = 3000           # pássaro remoto sem estado por 3 s sai da tabela
+RESYNC_TICKS = SPAWN_INTERVAL // 4  # atraso máximo em relação aos outros antes de pular para o tick deles
+MISTAKE_RATE = 0.002               # chance por tick de um bot errar o pulo (ver loadgen.py)
+RANKING_LINES = 5
+
+SKY_BLUE = (135, 206, 235)
+BLACK = (0, 0, 0)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+# transparência dos outros pássaros, para o próprio se destacar no meio do bando
+OTHERS_ALPHA = 110
+
+log = gamelog.get_logger('battle')
+
+
+class Battle:
+    # Estado da partida e rede, sem pygame (o loop da janela fica em run()).
+    def __init__(self, link, match_id, player_id, bots=0, capacity=MAX_BIRDS, pipe_factory=None, rng=None):
+        self.link = link
+        self.topic = topics.match_topic(match_id, topics.BATTLE)
+        self.rng = rng or random.Random()
+        self.player_id = player_id
+        self.flock = Flock(capacity)
+        self.world = BattleWorld(self.flock, pipe_factory=pipe_factory)
+        # linhas locais: o jogador (linha 0) e os bots logo depois. Remoções trocam a
+        # linha removida pela última, e as locais nunca saem, então ficam sempre no começo.
+        numbers = {wire.player_number(player_id)}
+        while len(numbers) < 1 + min(bots, capacity - 1):
+            numbers.add(self.rng.randrange(100000))
+        numbers.discard(wire.player_number(player_id))
+        self.local_ids = [player_id] + [f'player-{number}' for number in sorted(numbers)]
+        for local_id in self.local_ids:
+            self.flock.add(local_id, simulated=True)
+        self.local_row = 0
+        self.local_count = len(self.local_ids)
+        self.bot_rng = np.random.default_rng(self.rng.randrange(2 ** 32))
+        self.state = 'start_screen'
+        # rodada atual: (número, -número do jogador que a começou), a maior vence
+        self.round = (0, 0)
+        self.inbox = Inbox()
+        # y recebido de cada pássaro remoto, por tick do remetente (uma linha por linha do bando)
+        self.remote = JitterTable(capacity)
+        self.jumps = []
+        # último estado enviado de cada linha local (ver rows_to_send)
+        self.sent_tick = np.full(self.local_count, -KEYFRAME_TICKS, dtype=np.int64)
+        self.sent_alive = np.zeros(self.local_count, dtype=bool)
+        self.sent_score = np.zeros(self.local_count, dtype=np.int64)
+        self.unsent_jumps = np.zeros(self.local_count, dtype=bool)
+        self.idle_ticks = 0
+        self.seq = 0
+        self.full_warned = False
+        link.on_message = self._on_message
+        link.subscribe(self.topic)
+
+    # --- rede ---
+
+    def _on_message(self, msg):
+        # Roda na thread de rede: só decodifica e enfileira (ver inbox.py).
+        try:
+            data = wire.decode(msg.payload)
+        except (ValueError, UnicodeDecodeError):
+            gamelog.sampled(log, 'battle.bad_message', "mensagem inválida em %s", msg.topic)
+            return
+        player_id = data.get("player_id")
+        if player_id in self.local_ids:
+            return
+        if "color" in data:
+            gamelog.sampled(log, 'net.state', "Recebido MQTT: %s", data)
+            self.inbox.put_state(player_id, data)
+        else:
+            self.inbox.put_event(data)
+
+    def process_network(self):
+        flock = self.flock
+        now = int(time.monotonic() * 1000)
+        for player_id, data in self.inbox.drain_states().items():
+            row = flock.add(player_id, simulated=False)
+            if row is None:
+                if not self.full_warned:
+                    log.warning("partida cheia (%d pássaros): ignorando %s", flock.capacity, player_id)
+                    self.full_warned = True
+                continue
+            playing = data.get("game_state") == 'playing'
+            flock.set_remote(row, data["y"], data.get("score", 0), bool(data.get("alive")) and playing, now)
+            # entrou atrasado (ou travou): a pista pula para o tick de quem está na frente
+            tick = data.get("tick")
+            if self.state == 'playing' and playing and tick is not None and tick - self.world.tick > RESYNC_TICKS:
+                log.info("pulando do tick %d para o tick %d de %s", self.world.tick, tick, player_id)
+                self.world.fast_forward(tick)
+                self.clear_buffers()
+            self.remote.push(row, self.world.tick if tick is None else tick, data["y"], self.world.tick,
+                             data.get("velocity"))
+
+        for data in self.inbox.drain_events():
+            kind = data.get("type")
+            if kind == "round":
+                try:
+                    key = (int(data["round"]), -wire.player_number(data["player_id"]))
+                    seed = int(data["seed"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if key > self.round:
+                    self.start_round(seed, key)
+            elif kind == "leave":
+                self.remove(data.get("player_id"))
+
+        # quem parou de mandar estado saiu sem avisar
+        count = len(flock)
+        stale = ~flock.simulated[:count] & (now - flock.last_seen[:count] > REMOTE_TIMEOUT_MS)
+        for row in sorted(np.flatnonzero(stale), reverse=True):
+            self.remove(flock.players[row])
+
+    def remove(self, player_id):
+        flock = self.flock
+        row = flock.rows.get(player_id)
+        if row is None:
+            return
+        last = len(flock) - 1
+        flock.remove(player_id)
+        self.remote.move(last, row)
+
+    def clear_buffers(self):
+        self.remote.clear()
+
+    def start(self):
+        # Começa a rodada seguinte e avisa a todos (retido: quem entrar depois também recebe).
+        number = self.round[0] + 1
+        seed = self.rng.randrange(100000)
+        self.start_round(seed, (number, -wire.player_number(self.player_id)))
+        self.link.publish(self.topic, json.dumps({"type": "round", "player_id": self.player_id,
+                                                  "round": number, "seed": seed}), retain=True)
+
+    def start_round(self, seed, key):
+        self.round = key
+        self.world.reset(seed)
+        self.clear_buffers()
+        self.jumps = []
+        self.state = 'playing'
+        log.info("rodada %d (seed %s) com %d pássaros", key[0], seed, len(self.flock))
+
+    def leave(self):
+        for local_id in self.local_ids:
+            self.link.publish(self.topic, json.dumps({"type": "leave", "player_id": local_id}))
+
+    def jump(self):
+        if self.state == 'playing':
+            self.jumps.append(self.local_row)
+
+    # --- simulação ---
+
+    def tick(self):
+        if self.state != 'playing':
+            # fora de rodada o estado continua indo, devagar: sem ele, os outros tiram
+            # da tabela (REMOTE_TIMEOUT_MS) quem está na tela de resultado ou de início
+            self.idle_ticks += 1
+            if self.idle_ticks % KEYFRAME_TICKS == 0:
+                self.publish_states()
+            return []
+        flock = self.flock
+        count = len(flock)
+        world = self.world
+        # bots: a heurística do simulation.should_jump, com erros de propósito
+        bots = np.zeros(count, dtype=bool)
+        bots[self.local_row + 1:self.local_count] = True
+        jumped = should_jump(flock, world.track) & bots
+        jumped ^= bots & (self.bot_rng.random(count) < MISTAKE_RATE)
+        jumped[self.jumps] = True
+        self.jumps = []
+        events = world.step(jumped)
+        self.unsent_jumps |= jumped[:self.local_count]
+        # remotos: y no tick mostrado, projetado a partir dos estados recebidos
+        self.remote.sample(world.tick, self.local_count, count, flock.target_y)
+        flock.follow_remote()
+        if world.game_over:
+            self.state = 'game_over'
+            log.info("fim da rodada %d no tick %d", self.round[0], world.tick)
+        self.publish_states(None if self.state != 'playing' else self.rows_to_send())
+        return events
+
+    def rows_to_send(self):
+        # linhas locais que pularam, morreram ou pontuaram desde o último envio, ou
+        # com o keyframe vencido (ou de uma rodada anterior: tick menor que o enviado)
+        flock = self.flock
+        count = self.local_count
+        tick = self.world.tick
+        due = self.unsent_jumps.copy()
+        due |= flock.alive[:count] != self.sent_alive
+        due |= flock.score[:count] != self.sent_score
+        due |= (tick - self.sent_tick >= KEYFRAME_TICKS) | (tick < self.sent_tick)
+        return np.flatnonzero(due)
+
+    def publish_states(self, rows=None):
+        # rows: linhas locais a enviar (None = todas)
+        flock = self.flock
+        if rows is None:
+            rows = np.arange(self.local_count)
+        if not len(rows):
+            return
+        self.seq = (self.seq + 1) & 0xFFFF
+        sent = now_ms()
+        for row in rows.tolist():
+            alive = bool(flock.alive[row])
+            self.link.publish(self.topic, wire.encode_state({
+                "player_id": self.local_ids[row],
+                "color": 'red',
+                "y": float(flock.y[row]),
+                "velocity": float(flock.velocity[row]) if alive else None,
+                "score": int(flock.score[row]),
+                "alive": alive,
+                "game_state": self.state,
+                "tick": self.world.tick,
+                "seq": self.seq,
+                "sent": sent
+            }))
+        self.sent_tick[rows] = self.world.tick
+        self.sent_alive[rows] = flock.alive[rows]
+        self.sent_score[rows] = flock.score[rows]
+        self.unsent_jumps[rows] = False
+
+    def placement(self, row):
+        # posição (1 = primeiro) do pássaro 'row' no ranking
+        return self.flock.ranking().index(row) + 1
+
+
+def run(args):
+    import pygame
+    from render_cache import PipeSpriteCache, TextCache, HudText
+    from sprites import Pipe
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Flappy Bird Batalha")
+    # (a fonte do jogo não tem acentos: os textos da tela vão sem eles)
+    try:
+        message_font = pygame.font.Font('SuperMario.ttf', 60)
+        text_font = pygame.font.Font('SuperMario.ttf', 40)
+        score_font = pygame.font.Font('SuperMario.ttf', 20)
+    except (pygame.error, FileNotFoundError):
+        message_font = pygame.font.Font(None, 60)
+        text_font = pygame.font.Font(None, 40)
+        score_font = pygame.font.Font(None, 24)
+    try:
+        own_img = pygame.transform.scale(pygame.image.load('RedBird.png').convert_alpha(), (BIRD_WIDTH, BIRD_HEIGHT))
+        other_img = pygame.transform.scale(pygame.image.load('Yellow_bird.png').convert_alpha(), (BIRD_WIDTH, BIRD_HEIGHT))
+        other_img.set_alpha(OTHERS_ALPHA)
+        Pipe.sprite_cache = PipeSpriteCache(pygame.image.load('Pipe.png').convert_alpha(), PIPE_WIDTH, HEIGHT, PIPE_GAP)
+    except (pygame.error, FileNotFoundError) as e:
+        log.warning("ATENÇÃO: Erro ao carregar imagens! Usando formas simples. Erro: %s", e)
+        own_img = other_img = None
+
+    player_id = f'player-{random.randint(0, 100000)}'
+    link = transport.create(player_id, args.broker, args.port)
+
+    def on_connect(ok, reason):
+        if ok:
+            log.info("MQTT conectado!")
+        else:
+            log.error("Falha de conexão MQTT: %s", reason)
+    link.on_connect = on_connect
+    battle = Battle(link, args.match, player_id, bots=args.bots, pipe_factory=Pipe)
+    link.connect()
+    log.info("Cliente MQTT id=%s | partida %s | %d bots", player_id, args.match, battle.local_count - 1)
+
+    flock = battle.flock
+    world = battle.world
+    text_cache = TextCache()
+    alive_text = HudText(score_font, "Vivos: {}", BLACK)
+    score_text = HudText(score_font, "Voce: {}", RED)
+    timestep = FixedTimestep()
+    clock = pygame.time.Clock()
+    x = flock.x - flock.width // 2
+    half_height = flock.height // 2
+    jump_keys = (pygame.K_SPACE, pygame.K_w, pygame.K_UP)
+
+    while True:
+        link.poll()
+        battle.process_network()
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                battle.leave()
+                pygame.quit()
+                link.close()
+                return
+            if event.type != pygame.KEYDOWN:
+                continue
+            if battle.state in ('start_screen', 'game_over'):
+                battle.start()
+            elif event.key in jump_keys:
+                battle.jump()
+
+        for _ in range(timestep.advance()):
+            battle.tick()
+
+        screen.fill(SKY_BLUE)
+        count = len(flock)
+        if battle.state == 'start_screen':
+            start_y = HEIGHT // 2 - 140
+            screen.blit(*text_cache.centered(message_font, "Flappy Bird Batalha!", BLACK, (WIDTH // 2, start_y)))
+            screen.blit(*text_cache.centered(text_font, "Pular: Espaco, W ou Seta para Cima", RED, (WIDTH // 2, start_y + 60)))
+            screen.blit(*text_cache.centered(text_font, f"{count} passaros na sala", BLACK, (WIDTH // 2, start_y + 120)))
+            screen.blit(*text_cache.centered(text_font, "Pressione qualquer tecla para comecar", BLACK, (WIDTH // 2, start_y + 180)))
+        else:
+            for pipe in world.track:
+                pipe.draw(screen)
+            # os outros pássaros de uma vez (blits), o próprio por cima
+            alive = flock.alive[:count]
+            others = np.flatnonzero(alive)
+            others = others[others != battle.local_row]
+            if other_img is not None:
+                screen.blits([(other_img, (x, int(y) - half_height)) for y in flock.y[others]], doreturn=False)
+            else:
+                for y in flock.y[others]:
+                    pygame.draw.circle(screen, BLUE, (flock.x, int(y)), flock.width // 2, 2)
+            if alive[battle.local_row]:
+                y = int(flock.y[battle.local_row])
+                if own_img is not None:
+                    screen.blit(own_img, (x, y - half_height))
+                else:
+                    pygame.draw.circle(screen, RED, (flock.x, y), flock.width // 2)
+
+            screen.blit(alive_text.surface(f'{flock.alive_count()}/{count}'), (10, 10))
+            screen.blit(score_text.surface(int(flock.score[battle.local_row])), (10, 40))
+            for line, row in enumerate(flock.ranking(RANKING_LINES)):
+                name = "voce" if row == battle.local_row else flock.players[row]
+                color = RED if row == battle.local_row else (BLACK if flock.alive[row] else BLUE)
+                text = f"{line + 1}. {name} {flock.score[row]}"
+                screen.blit(text_cache.render(score_font, text, color), (WIDTH - 260, 10 + 26 * line))
+
+            if battle.state == 'game_over':
+                winner = flock.ranking(1)[0]
+                winner_name = "Voce" if winner == battle.local_row else flock.players[winner]
+                screen.blit(*text_cache.centered(message_font, f"{winner_name} venceu!", BLACK, (WIDTH // 2, HEIGHT // 2 - 60)))
+                place = battle.placement(battle.local_row)
+                screen.blit(*text_cache.centered(text_font, f"Voce ficou em {place} de {count}", RED, (WIDTH // 2, HEIGHT // 2)))
+                screen.blit(*text_cache.centered(text_font, "Pressione qualquer tecla para jogar de novo", BLACK, (WIDTH // 2, HEIGHT // 2 + 70)))
+            elif not alive[battle.local_row]:
+                screen.blit(text_cache.render(text_font, "Voce esta fora!", RED), (WIDTH // 2 - 120, HEIGHT // 4))
+        pygame.display.flip()
+        clock.tick(60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modo batalha do Flappy Bird (16 a 64 pássaros)")
+    parser.add_argument("--broker", default=os.environ.get("FLAPPY_BROKER", "localhost"))
+    parser.add_argument("--port", type=int, default=transport.DEFAULT_PORT)
+    parser.add_argument("--match", default=os.environ.get("FLAPPY_MATCH", "battle"), help="id da partida")
+    parser.add_argument("--bots", type=int, default=0, help="bots simulados neste processo")
+    args = parser.parse_args()
+    gamelog.setup('battle')
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
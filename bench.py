@@ -0,0 +1,382 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+# sem janela: o pygame desenha num display falso (também em máquinas sem monitor)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import wire
+from dirty_rects import FullScreenRenderer, DirtyRectRenderer
+from render_cache import PipeSpriteCache, HudText
+from simulation import (World, WIDTH, HEIGHT, BIRD_X, BIRD_WIDTH, BIRD_HEIGHT, PIPE_WIDTH, PIPE_GAP,
+                        PIPE_MIN_Y, PIPE_MAX_Y, should_jump)
+from snapshots import SnapshotSender, SnapshotReceiver, capture, receive_snapshot
+from sprites import Bird, Pipe
+
+try:
+    import flock
+except ImportError:
+    # sem NumPy não há modo batalha (flock.py) para medir
+    flock = None
+
+# Benchmarks sem janela (driver de vídeo 'dummy' do SDL).
+# Mede a simulação pura (ticks/s), a renderização completa com N canos e pássaros
+# (frames/s), o custo de codificar/decodificar cada mensagem MQTT e o de aplicar um
+# snapshot como o handler 'snapshot' do TesteSincroniza.py, além do tick do modo
+# batalha (flock.py) com 16 e 64 pássaros, só simulados e com os remotos seguindo
+# a rede (flock.JitterTable). Cada medida é a melhor
+# de algumas rodadas de duração fixa, em operações por segundo (maior é melhor).
+#
+# Uso: python bench.py                       roda tudo e compara com bench_baseline.json
+#      python bench.py --only wire --json resultado.json
+#      python bench.py --save-baseline --repeat 4   grava a base desta máquina
+# Com uma base, sai com código 1 se alguma medida cair mais que o limite dela
+# ("thresholds" no arquivo da base, fração da taxa da base), e sem base também.
+# --repeat N roda tudo N vezes e usa a mediana; ao gravar a base, o limite de cada
+# medida cresce até cobrir a variação vista entre essas execuções (ver spread).
+
+BASELINE_PATH = 'bench_baseline.json'
+DURATION = 0.5          # s por rodada
+ROUNDS = 3
+DEFAULT_THRESHOLD = 0.15
+# renderização varia mais entre execuções (driver, cache do processador)
+THRESHOLDS = {'render.': 0.25}
+# folga sobre a variação medida com --repeat
+SPREAD_MARGIN = 0.05
+
+RENDER_PIPES = 8
+RENDER_BIRDS = 2
+SNAPSHOT_TICKS = 3      # ticks entre snapshots (50 ms, como no TesteSincroniza)
+SNAPSHOT_COUNT = 600
+BATTLE_BIRDS = (16, 64)
+BATTLE_KEYFRAME_TICKS = 30   # estados dos remotos (battle.KEYFRAME_TICKS)
+
+SKY_BLUE = (135, 206, 235)
+COLORS = ((255, 0, 0), (0, 0, 255))
+
+
+def measure(run_batch, batch_size, duration=DURATION, rounds=ROUNDS):
+    # Melhor taxa (operações/s) entre 'rounds' rodadas de pelo menos 'duration' s.
+    best = 0.0
+    for _ in range(rounds):
+        done = 0
+        started = time.perf_counter()
+        while True:
+            run_batch()
+            done += batch_size
+            elapsed = time.perf_counter() - started
+            if elapsed >= duration:
+                break
+        best = max(best, done / elapsed)
+    return best
+
+
+_screen = None
+
+
+def display():
+    # janela (falsa) e imagens dos canos, criadas uma vez para todos os benchmarks
+    global _screen
+    if _screen is None:
+        pygame.init()
+        _screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        try:
+            Pipe.sprite_cache = PipeSpriteCache(pygame.image.load('Pipe.png').convert_alpha(), PIPE_WIDTH, HEIGHT, PIPE_GAP)
+        except (pygame.error, FileNotFoundError):
+            Pipe.sprite_cache = None
+    return _screen
+
+
+# --- simulação ---
+
+def bench_simulation(options):
+    world = World(seed=1)
+    track = world.track
+    birds = world.birds
+
+    def run():
+        for _ in range(1000):
+            world.step([index for index, bird in enumerate(birds) if should_jump(bird, track)])
+            if world.game_over:
+                world.reset()
+    return {'simulation.ticks': (measure(run, 1000, options.duration, options.rounds), 'ticks/s')}
+
+
+def bench_battle(options):
+    # o custo por tick deve crescer bem menos que o número de pássaros
+    results = {}
+    for count in BATTLE_BIRDS:
+        birds = flock.Flock(count)
+        for index in range(count):
+            birds.add(index, simulated=True)
+        world = flock.BattleWorld(birds, seed=1)
+
+        def run():
+            for _ in range(1000):
+                world.step(flock.should_jump(birds, world.track))
+                if world.game_over:
+                    world.reset()
+        results[f'battle.ticks.{count}'] = (measure(run, 1000, options.duration, options.rounds), 'ticks/s')
+
+    # o tick do battle.py: um pássaro local e o resto remoto, com estado a cada
+    # KEYFRAME_TICKS e o y de todos os remotos amostrado pela JitterTable
+    for count in BATTLE_BIRDS:
+        birds = flock.Flock(count)
+        birds.add(0, simulated=True)
+        for index in range(1, count):
+            birds.add(index, simulated=False)
+        world = flock.BattleWorld(birds, seed=1)
+        remote = flock.JitterTable(count)
+
+        def run():
+            for _ in range(1000):
+                tick = world.tick
+                if tick % BATTLE_KEYFRAME_TICKS == 0:
+                    for row in range(1, count):
+                        remote.push(row, tick, 300.0, tick + 3, -5.0)
+                world.step(flock.should_jump(birds, world.track) & birds.simulated)
+                remote.sample(world.tick, 1, count, birds.target_y)
+                birds.follow_remote()
+                if world.game_over:
+                    world.reset()
+                    remote.clear()
+        results[f'battle.remote.{count}'] = (measure(run, 1000, options.duration, options.rounds), 'ticks/s')
+    return results
+
+
+# --- renderização ---
+
+def bench_render(options):
+    screen = display()
+    results = {}
+    spacing = (WIDTH + PIPE_WIDTH) / max(options.pipes, 1)
+    span = PIPE_MAX_Y - PIPE_MIN_Y
+    pipes = [Pipe(0, PIPE_MIN_Y + (index * 97) % span) for index in range(options.pipes)]
+    images = [None, None]
+    try:
+        images = [pygame.image.load(name).convert_alpha() for name in ('RedBird.png', 'Yellow_bird.png')]
+        images = [pygame.transform.scale(image, (BIRD_WIDTH, BIRD_HEIGHT)) for image in images]
+    except (pygame.error, FileNotFoundError):
+        pass
+    birds = [Bird(BIRD_X + 40 * (index // 2), HEIGHT // 2, images[index % 2], COLORS[index % 2])
+             for index in range(options.birds)]
+    font = pygame.font.Font(None, 20)
+    hud = [HudText(font, "P1: {}", COLORS[0]), HudText(font, "P2: {}", COLORS[1])]
+
+    for name, renderer in (('render.full', FullScreenRenderer(screen, SKY_BLUE)),
+                           ('render.dirty', DirtyRectRenderer(screen, SKY_BLUE))):
+        frame = [0]
+
+        def run():
+            # um frame do loop do jogo: canos andando, pássaros subindo e descendo, placar
+            frame[0] += 1
+            offset = frame[0] * 3
+            renderer.begin_frame()
+            for index, pipe in enumerate(pipes):
+                x = (index * spacing - offset) % (WIDTH + PIPE_WIDTH) - PIPE_WIDTH
+                renderer.add(pipe.draw(screen, int(x)))
+            for index, bird in enumerate(birds):
+                renderer.add(bird.draw(screen, HEIGHT // 2 + ((frame[0] * 4 + index * 50) % 200) - 100))
+            for line, text in enumerate(hud):
+                renderer.add(screen.blit(text.surface(frame[0] // 120), (10, 10 + 30 * line)))
+            renderer.end_frame()
+        results[name] = (measure(run, 1, options.duration, options.rounds), 'frames/s')
+    return results
+
+
+# --- mensagens MQTT ---
+
+def bench_wire(options):
+    state = {"player_id": "player-12345", "color": "blue", "y": 321.5, "score": 7, "alive": True,
+             "game_state": "playing", "tick": 4321, "seq": 99, "sent": 123456}
+    frame = {"tick": 4321, "seed": 777, "game_state": "playing",
+             "birds": [dict(state, color='red'), state]}
+    state_binary = wire.encode_state(state)
+    state_json = json.dumps(state)
+    input_binary = wire.encode_input("player-12345", 4321, 1)
+    frame_binary = wire.encode_frame(frame)
+    cases = {
+        'wire.state.binary.encode': lambda: wire.encode_state(state),
+        'wire.state.binary.decode': lambda: wire.decode(state_binary),
+        'wire.state.json.encode': lambda: json.dumps(state),
+        'wire.state.json.decode': lambda: wire.decode(state_json.encode()),
+        'wire.input.encode': lambda: wire.encode_input("player-12345", 4321, 1),
+        'wire.input.decode': lambda: wire.decode(input_binary),
+        'wire.frame.encode': lambda: wire.encode_frame(frame),
+        'wire.frame.decode': lambda: wire.decode(frame_binary),
+    }
+    results = {}
+    for name, operation in cases.items():
+        def run(operation=operation):
+            for _ in range(1000):
+                operation()
+        results[name] = (measure(run, 1000, options.duration, options.rounds), 'msgs/s')
+    return results
+
+
+# --- snapshots (TesteSincroniza.py) ---
+
+def snapshot_messages(keyframes_only):
+    # Partida gravada do lado do P1: um snapshot a cada SNAPSHOT_TICKS ticks, com o
+    # receptor confirmando cada um (deltas sobre o anterior), já em JSON.
+    world = World(seed=1)
+    sender = SnapshotSender()
+    messages = []
+    while len(messages) < SNAPSHOT_COUNT:
+        world.step([index for index, bird in enumerate(world.birds) if should_jump(bird, world.track)])
+        if world.tick % SNAPSHOT_TICKS:
+            continue
+        red, blue = world.birds
+        snapshot = capture(world.track, {
+            "scores": {"red": red.score, "blue": blue.score},
+            "alive": {"red": red.is_alive, "blue": blue.is_alive},
+            "state": 'playing'
+        })
+        if keyframes_only:
+            sender.force_keyframe = True
+        message = sender.make(snapshot)
+        messages.append(json.dumps(message).encode())
+        sender.ack('player-2', message["seq"])
+    return messages
+
+
+def bench_snapshot(options):
+    display()
+    results = {}
+    for name, keyframes_only in (('snapshot.apply.delta', False), ('snapshot.apply.keyframe', True)):
+        messages = snapshot_messages(keyframes_only)
+        world = World(birds=[Bird(BIRD_X, HEIGHT // 2, None, COLORS[0]), Bird(BIRD_X, HEIGHT // 2, None, COLORS[1])],
+                      pipe_factory=Pipe)
+
+        def run():
+            # o mesmo handler do TesteSincroniza: decodifica, aplica e responde com o ack
+            # (receptor novo a cada lote: senão, da segunda vez, todo delta seria antigo)
+            receiver = SnapshotReceiver()
+            for payload in messages:
+                snapshot, reply = receive_snapshot(receiver, json.loads(payload), world.track, world.birds,
+                                                   Pipe, "player-2")
+                if snapshot is None:
+                    continue
+                snapshot.get("state")
+                json.dumps(reply)
+        results[name] = (measure(run, len(messages), options.duration, options.rounds), 'snapshots/s')
+    return results
+
+
+BENCHMARKS = {
+    'simulation': bench_simulation,
+    'render': bench_render,
+    'wire': bench_wire,
+    'snapshot': bench_snapshot,
+}
+if flock is not None:
+    BENCHMARKS['battle'] = bench_battle
+
+
+def threshold(name, thresholds=None):
+    if thresholds and name in thresholds:
+        return thresholds[name]
+    for prefix, value in THRESHOLDS.items():
+        if name.startswith(prefix):
+            return value
+    return DEFAULT_THRESHOLD
+
+
+def spread(rates):
+    # Queda da pior execução em relação à mediana (0.3 = a pior foi 30% mais lenta).
+    rates = sorted(rates)
+    median = rates[len(rates) // 2]
+    return median, 1.0 - rates[0] / median
+
+
+def compare(results, baseline):
+    # Devolve [(nome, taxa, taxa da base, variação)] das medidas que caíram além do limite.
+    regressions = []
+    base_results = baseline.get("results", {})
+    thresholds = baseline.get("thresholds", {})
+    for name, result in results.items():
+        base = base_results.get(name)
+        if base is None:
+            continue
+        change = result["rate"] / base["rate"] - 1.0
+        if change < -threshold(name, thresholds):
+            regressions.append((name, result["rate"], base["rate"], change))
+    return regressions
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do Flappy Bird (sem janela)")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="roda só este grupo (repetível)")
+    parser.add_argument("--duration", type=float, default=DURATION, help="s por rodada")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--pipes", type=int, default=RENDER_PIPES, help="canos na tela (render)")
+    parser.add_argument("--birds", type=int, default=RENDER_BIRDS, help="pássaros na tela (render)")
+    parser.add_argument("--json", metavar="ARQUIVO", help="grava os resultados em JSON ('-' = saída padrão)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="base para comparação")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como a nova base")
+    parser.add_argument("--repeat", type=int, default=1, help="execuções completas (usa a mediana)")
+    options = parser.parse_args()
+
+    rates = {}
+    units = {}
+    for _ in range(options.repeat):
+        for group in options.only or BENCHMARKS:
+            for name, (rate, unit) in BENCHMARKS[group](options).items():
+                rates.setdefault(name, []).append(rate)
+                units[name] = unit
+                print(f"{name:28s} {rate:14,.0f} {unit}", file=sys.stderr)
+    results = {}
+    thresholds = {}
+    for name, measured in rates.items():
+        median, variation = spread(measured)
+        results[name] = {"rate": median, "unit": units[name]}
+        thresholds[name] = round(max(threshold(name), variation + SPREAD_MARGIN), 2)
+
+    report = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "machine": machine(),
+              "options": {"duration": options.duration, "rounds": options.rounds,
+                          "pipes": options.pipes, "birds": options.birds, "repeat": options.repeat},
+              "results": results}
+    if options.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if options.save_baseline:
+        baseline = dict(report, thresholds=thresholds)
+        with open(options.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"base gravada em {options.baseline}", file=sys.stderr)
+        return
+
+    if not os.path.exists(options.baseline):
+        # sem base não há com o que comparar: falha em vez de passar em silêncio
+        print(f"ERRO: base {options.baseline} não encontrada; grave uma com --save-baseline", file=sys.stderr)
+        sys.exit(1)
+    with open(options.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline)
+    for name, rate, base_rate, change in regressions:
+        print(f"REGRESSÃO {name}: {rate:,.0f} contra {base_rate:,.0f} na base ({change:+.0%})", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+    print(f"sem regressões em relação a {options.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import pygame
+
+
+# Renderização padrão: limpa a tela inteira e faz flip a cada frame.
+# Tem a mesma interface do DirtyRectRenderer para o loop principal não precisar
+# saber qual dos dois está em uso.
+class FullScreenRenderer:
+    def __init__(self, screen, background_color):
+        self.screen = screen
+        self.background_color = background_color
+
+    def invalidate(self):
+        pass
+
+    def begin_frame(self):
+        self.screen.fill(self.background_color)
+
+    def add(self, rect):
+        pass
+
+    def end_frame(self):
+        pygame.display.flip()
+
+
+# Renderização por retângulos sujos (opt-in).
+# Só as regiões desenhadas no frame anterior são restauradas a partir de um fundo
+# pré-renderizado, e só elas (mais as do frame atual) são enviadas ao display com
+# pygame.display.update(rects). Em displays SDL sem aceleração isso evita preencher
+# e copiar a janela inteira quando só os pássaros, canos e placar se movem.
+class DirtyRectRenderer:
+    def __init__(self, screen, background_color, debug=False, debug_font=None):
+        self.screen = screen
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self.background.fill(background_color)
+        self.screen_rect = screen.get_rect()
+        self.debug = debug
+        self.debug_font = debug_font
+        # área (em pixels) repintada no último frame, para o overlay de debug
+        self.repainted_area = 0
+        self._previous = []
+        self._current = []
+        self._full_redraw = True
+
+    def invalidate(self):
+        # força um redesenho completo (ex.: troca de tela)
+        self._full_redraw = True
+
+    def begin_frame(self):
+        if self._full_redraw:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            for rect in self._previous:
+                self.screen.blit(self.background, rect, rect)
+
+    def add(self, rect):
+        # aceita o retorno de blit/draw: um Rect, uma sequência de Rects ou None
+        if rect is None:
+            return
+        if isinstance(rect, pygame.Rect):
+            rect = rect.clip(self.screen_rect)
+            if rect.width and rect.height:
+                self._current.append(rect)
+        else:
+            for r in rect:
+                self.add(r)
+
+    def end_frame(self):
+        if self._full_redraw:
+            dirty = None
+            self.repainted_area = self.screen_rect.width * self.screen_rect.height
+        else:
+            dirty = _merge_rects(self._previous + self._current)
+            self.repainted_area = sum(r.width * r.height for r in dirty)
+
+        if self.debug:
+            # o overlay também é apagado no próximo frame, por isso entra nos retângulos atuais
+            overlay = self._draw_debug_overlay(dirty)
+            self._current.extend(overlay)
+            if dirty is not None:
+                dirty.extend(overlay)
+
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+
+        self._previous = self._current
+        self._current = []
+        self._full_redraw = False
+
+    def _draw_debug_overlay(self, dirty):
+        rects = []
+        if dirty is not None:
+            for rect in dirty:
+                rects.append(pygame.draw.rect(self.screen, (255, 0, 255), rect, 1))
+        if self.debug_font is not None:
+            total = self.screen_rect.width * self.screen_rect.height
+            percent = 100.0 * self.repainted_area / total
+            label = self.debug_font.render(f"repintado: {self.repainted_area} px ({percent:.1f}%)", True, (255, 0, 255))
+            rects.append(self.screen.blit(label, (10, self.screen_rect.height - label.get_height() - 10)))
+        return rects
+
+
+def _merge_rects(rects):
+    # junta retângulos que se sobrepõem (ex.: posição antiga e nova do mesmo pássaro)
+    # para não repintar/enviar a mesma área duas vezes
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        i = 0
+        while i < len(merged):
+            if rect.colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
@@ -0,0 +1,371 @@
+import numpy as np
+
+from jitter_buffer import JitterBuffer, DELAY_SLEW
+from simulation import (World, Bird, BIRD_X, BIRD_WIDTH, BIRD_HEIGHT, HEIGHT, PIPE_GAP, GRAVITY, JUMP_STRENGTH,
+                        PIPE_SPEED, SPAWN_INTERVAL, EVENT_SPAWN, EVENT_SCORE, EVENT_DEATH, EVENT_GAME_OVER)
+
+# Bando de pássaros do modo batalha (battle.py), de 16 a 64 numa partida.
+# Em vez de um objeto Bird por pássaro, o estado fica em arrays NumPy, uma coluna
+# por campo (y, velocidade, vida, pontuação...), e a física, os limites da tela, a
+# colisão e a pontuação de todos rodam como poucas operações vetorizadas por tick:
+# o custo por tick quase não cresce com o número de pássaros. Todos os pássaros
+# estão no mesmo x (BIRD_X), então a busca dos canos que cruzam esse x é feita uma
+# vez por tick, para o bando inteiro.
+#
+# Os números saem idênticos aos de simulation.World com os mesmos pulos (mesmas
+# operações em float64, na mesma ordem).
+#
+# A tabela de jogadores liga cada linha dos arrays a um player_id; as linhas
+# simuladas aqui (o jogador local e os bots) seguem a física, as outras seguem o
+# estado recebido da rede (target_y, amostrado pela JitterTable no tick mostrado).
+
+MAX_BIRDS = 64
+
+
+class Flock:
+    def __init__(self, capacity=MAX_BIRDS, x=BIRD_X, y=HEIGHT // 2, width=BIRD_WIDTH, height=BIRD_HEIGHT):
+        self.capacity = capacity
+        self.x, self.initial_y = x, y
+        self.width = width
+        self.height = height
+        # mesma caixa de colisão do simulation.Bird (o x é o mesmo para todos)
+        template = Bird(x, y, width, height)
+        self.hit_x = int(x + template._hit_dx)
+        self.hit_dy = template._hit_dy
+        self.hit_width = template.hit_width
+        self.hit_height = template.hit_height
+        # tabela de jogadores: linha -> player_id e player_id -> linha
+        self.players = []
+        self.rows = {}
+        self.y = np.zeros(capacity)
+        self.velocity = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.score = np.zeros(capacity, dtype=np.int64)
+        self.simulated = np.zeros(capacity, dtype=bool)
+        # y recebido da rede, para as linhas não simuladas
+        self.target_y = np.zeros(capacity)
+        # índice de spawn do próximo cano que cada pássaro ainda não passou
+        # (o mesmo cursor da PipeTrack.count_passed, um por linha)
+        self.next_to_pass = np.zeros(capacity, dtype=np.int64)
+        # quando chegou o último estado (ms de time.monotonic, linhas remotas)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.players)
+
+    def add(self, player_id, simulated):
+        # Devolve a linha do jogador (nova ou a que ele já tinha); None se o bando está cheio.
+        row = self.rows.get(player_id)
+        if row is not None:
+            return row
+        row = len(self.players)
+        if row >= self.capacity:
+            return None
+        self.players.append(player_id)
+        self.rows[player_id] = row
+        self.simulated[row] = simulated
+        self._reset_rows(slice(row, row + 1))
+        self.target_y[row] = self.initial_y
+        self.last_seen[row] = 0
+        return row
+
+    def remove(self, player_id):
+        # A última linha ocupa o lugar da removida: as linhas continuam contíguas.
+        row = self.rows.pop(player_id, None)
+        if row is None:
+            return
+        last = len(self.players) - 1
+        if row != last:
+            moved = self.players[last]
+            self.players[row] = moved
+            self.rows[moved] = row
+            for column in self._columns():
+                column[row] = column[last]
+        self.players.pop()
+
+    def _columns(self):
+        return (self.y, self.velocity, self.alive, self.score, self.simulated, self.target_y,
+                self.next_to_pass, self.last_seen)
+
+    def _reset_rows(self, rows):
+        self.y[rows] = self.initial_y
+        self.velocity[rows] = 0
+        self.score[rows] = 0
+        self.alive[rows] = True
+        self.next_to_pass[rows] = 0
+
+    def reset(self):
+        self._reset_rows(slice(0, len(self.players)))
+        self.target_y[:len(self.players)] = self.initial_y
+
+    def view(self, column):
+        # só as linhas ocupadas
+        return column[:len(self.players)]
+
+    def alive_count(self):
+        return int(np.count_nonzero(self.view(self.alive)))
+
+    def ranking(self, limit=None):
+        # Linhas por pontuação (maior primeiro); em caso de empate, quem está vivo na frente.
+        count = len(self.players)
+        order = np.lexsort((np.arange(count), ~self.alive[:count], -self.score[:count]))
+        return [int(row) for row in order[:limit]]
+
+    def set_remote(self, row, y, score, alive, tick):
+        self.target_y[row] = y
+        self.score[row] = score
+        self.alive[row] = alive
+        self.last_seen[row] = tick
+
+    def follow_remote(self):
+        # linhas remotas: o y é o recebido (interpolado no tick mostrado, ver battle.py)
+        count = len(self.players)
+        np.copyto(self.y[:count], self.target_y[:count], where=~self.simulated[:count])
+
+
+class JitterTable:
+    # Um JitterBuffer (jitter_buffer.py) por linha remota do bando, amostrados juntos.
+    # Cada buffer continua guardando os estados e estimando relógio e atraso quando um
+    # estado chega (push, uma vez por mensagem). O que roda a cada tick, para todas as
+    # linhas, fica em arrays: o atraso andando até o alvo, o tick mostrado e a
+    # projeção pela velocidade a partir do último estado antes dele. Só as linhas cujo
+    # tick mostrado passou do estado seguinte (ou que receberam estado) voltam ao
+    # buffer para trocar de estado base; com estados só em pulos e keyframes, são poucas.
+    def __init__(self, capacity=MAX_BIRDS):
+        self.buffers = [None] * capacity
+        self.offset = np.full(capacity, np.nan)
+        self.delay = np.full(capacity, np.nan)
+        self.target_delay = np.full(capacity, np.nan)
+        self.last_now = np.full(capacity, np.nan)
+        # estado base de cada linha e tick do estado seguinte; o y t ticks depois da base
+        # é base_y + t·(linear + quadratic·t) (simulation.project; sem velocidade, parado)
+        self.base_tick = np.zeros(capacity)
+        self.base_y = np.zeros(capacity)
+        self.linear = np.zeros(capacity)
+        self.quadratic = np.zeros(capacity)
+        self.next_tick = np.full(capacity, np.inf)
+        self.has_state = np.zeros(capacity, dtype=bool)
+
+    def _columns(self):
+        return (self.offset, self.delay, self.target_delay, self.last_now, self.base_tick, self.base_y,
+                self.linear, self.quadratic, self.next_tick, self.has_state)
+
+    def _reset_rows(self, rows):
+        for column in (self.offset, self.delay, self.target_delay, self.last_now):
+            column[rows] = np.nan
+        self.next_tick[rows] = np.inf
+        self.has_state[rows] = False
+
+    def push(self, row, tick, y, now, velocity=None):
+        buffer = self.buffers[row]
+        if buffer is None:
+            buffer = self.buffers[row] = JitterBuffer()
+        if not buffer.push(tick, y, now, velocity):
+            return False
+        if len(buffer.offsets) == 1:
+            # relógio novo (primeiro estado ou o remetente pulou): o atraso começa no alvo
+            self.delay[row] = buffer.delay
+            self.last_now[row] = np.nan
+        self.offset[row] = buffer.offset
+        self.target_delay[row] = buffer._target_delay
+        # o estado pode ser anterior ao tick mostrado: a base é refeita no próximo sample
+        self.next_tick[row] = -np.inf
+        return True
+
+    def clear(self):
+        # o tick local recomeçou ou pulou: o relógio dos buffers não vale mais
+        for buffer in self.buffers:
+            if buffer is not None:
+                buffer.clear()
+        self._reset_rows(slice(None))
+
+    def move(self, source, row):
+        # acompanha Flock.remove: a linha 'source' (a última) ocupa o lugar de 'row'
+        if source != row:
+            self.buffers[row] = self.buffers[source]
+            for column in self._columns():
+                column[row] = column[source]
+        self.buffers[source] = None
+        self._reset_rows(source)
+
+    def sample(self, now, start, stop, out):
+        # y das linhas [start, stop) no tick local 'now', escrito em out (ex.: Flock.target_y);
+        # linhas sem estado ficam como estão. Arrays pequenos: poucas operações, sem np.clip.
+        rows = slice(start, stop)
+        delay = self.delay[rows]
+        # o atraso anda até o alvo no máximo DELAY_SLEW por tick (fmax: NaN na primeira amostra vira 0)
+        step = np.fmax(now - self.last_now[rows], 0)
+        step *= DELAY_SLEW
+        change = self.target_delay[rows] - delay
+        delay += np.maximum(np.minimum(change, step, out=change), -step, out=change)
+        self.last_now[rows] = now
+        shown = self.offset[rows] - delay
+        shown += now
+        for row in np.flatnonzero(shown >= self.next_tick[rows]).tolist():
+            tick, y, velocity, following = self.buffers[row + start].segment(float(shown[row]))
+            row += start
+            self.base_tick[row] = tick
+            self.base_y[row] = y
+            # y + t·v + g·t·(t+1)/2 = y + t·(v + g/2 + g/2·t)
+            self.linear[row] = 0.0 if velocity is None else velocity + GRAVITY / 2
+            self.quadratic[row] = 0.0 if velocity is None else GRAVITY / 2
+            self.next_tick[row] = np.inf if following is None else following
+            self.has_state[row] = True
+        # simulation.project vetorizado
+        ticks = shown - self.base_tick[rows]
+        y = self.quadratic[rows] * ticks
+        y += self.linear[rows]
+        y *= ticks
+        y += self.base_y[rows]
+        np.minimum(np.maximum(y, 0, out=y), HEIGHT, out=y)
+        np.copyto(out[rows], y, where=self.has_state[rows])
+
+
+class BattleWorld(World):
+    # simulation.World com os pássaros num Flock: mesma pista, mesmo seed, mesmos
+    # eventos; os índices dos eventos e dos pulos são linhas do bando.
+    def __init__(self, flock, seed=0, pipe_factory=None, judge_collisions=True):
+        kwargs = {} if pipe_factory is None else {"pipe_factory": pipe_factory}
+        super().__init__(birds=[], seed=seed, judge_collisions=judge_collisions, **kwargs)
+        self.flock = flock
+
+    def reset(self, seed=None):
+        super().reset(seed)
+        self.flock.reset()
+
+    def save_state(self):
+        flock = self.flock
+        count = len(flock)
+        return (super().save_state(),
+                tuple(column[:count].copy() for column in (flock.y, flock.velocity, flock.alive, flock.score,
+                                                           flock.next_to_pass)))
+
+    def load_state(self, state):
+        world, columns = state
+        super().load_state(world)
+        flock = self.flock
+        for column, saved in zip((flock.y, flock.velocity, flock.alive, flock.score, flock.next_to_pass), columns):
+            column[:len(saved)] = saved
+
+    def fast_forward(self, tick):
+        super().fast_forward(tick)
+        # como o skip_passed do World: canos já atrás do bando não pontuam
+        flock = self.flock
+        count = len(flock)
+        cursor = self.flock.next_to_pass[:count]
+        np.maximum(cursor, self._passed_index(), out=cursor)
+
+    def _passed_index(self):
+        # Índice de spawn do primeiro cano que o x do bando ainda não passou.
+        track = self.track
+        pipes = track.pipes
+        if not pipes:
+            return track.spawned
+        x = self.flock.x
+        for pipe in pipes:
+            if not x > pipe.world_x - track.offset + track.pipe_width:
+                return pipe.index
+        return pipes[-1].index + 1
+
+    def step(self, inputs=()):
+        # Avança um tick. inputs: linhas que pularam neste tick (lista ou máscara booleana).
+        flock = self.flock
+        count = len(flock)
+        events = []
+        y = flock.y[:count]
+        velocity = flock.velocity[:count]
+        alive = flock.alive[:count]
+        score = flock.score[:count]
+        alive_before = alive.copy()
+        score_before = score.copy()
+
+        # pulos: só de quem está vivo
+        if isinstance(inputs, np.ndarray) and inputs.dtype == bool:
+            jumped = inputs
+        else:
+            jumped = np.zeros(count, dtype=bool)
+            jumped[list(inputs)] = True
+        np.copyto(velocity, JUMP_STRENGTH, where=jumped & alive)
+
+        # física: só linhas simuladas e vivas (operações com where=, sem cópias)
+        moving = flock.simulated[:count] & alive
+        np.add(velocity, GRAVITY, out=velocity, where=moving)
+        np.add(y, velocity, out=y, where=moving)
+
+        judged = flock.simulated[:count] if self.judge_collisions else np.zeros(count, dtype=bool)
+        half_height = flock.height // 2
+        out = judged & ((y - half_height < 0) | (y + half_height > HEIGHT))
+        np.copyto(alive, False, where=out)
+
+        self.spawn_timer += 1
+        if self.spawn_timer >= SPAWN_INTERVAL:
+            events.append((EVENT_SPAWN, self.spawn_pipe()))
+            self.spawn_timer = 0
+
+        track = self.track
+        track.advance(PIPE_SPEED)
+
+        if judged.any():
+            self._collide(judged & alive)
+
+        scored = score != score_before
+        if scored.any():
+            events.extend((EVENT_SCORE, int(row)) for row in np.flatnonzero(scored))
+        died = alive_before > alive
+        if died.any():
+            events.extend((EVENT_DEATH, int(row)) for row in np.flatnonzero(died))
+
+        if self.judge_collisions and not self.game_over and count and not alive.any():
+            self.game_over = True
+            events.append((EVENT_GAME_OVER,))
+
+        self.tick += 1
+        return events
+
+    def _collide(self, checked):
+        # Mesma regra de simulation.check_collision, para todas as linhas de 'checked'
+        # de uma vez: os canos que cruzam o x do bando são achados uma vez só.
+        flock = self.flock
+        count = len(flock)
+        track = self.track
+        hit = np.zeros(count, dtype=bool)
+        if flock.hit_width and flock.hit_height:
+            top = np.trunc(flock.y[:count] + flock.hit_dy)
+            bottom = top + flock.hit_height
+            left = flock.hit_x + track.offset
+            right = left + flock.hit_width
+            pipes = track.pipes
+            index = track.first_reaching(left)
+            while index < len(pipes):
+                pipe = pipes[index]
+                if pipe.world_x + pipe.hit_left >= right:
+                    break
+                if left < pipe.world_x + pipe.hit_right and pipe.hit_right > pipe.hit_left:
+                    if pipe.y_top_end:
+                        hit |= (top < pipe.y_top_end) & (0 < bottom)
+                    if HEIGHT - pipe.bottom_y:
+                        hit |= (top < HEIGHT) & (pipe.bottom_y < bottom)
+                index += 1
+        hit &= checked
+        np.copyto(flock.alive[:count], False, where=hit)
+
+        # pontuação de quem não bateu: canos passados desde o cursor de cada um
+        scoring = checked > hit
+        if track.pipes and scoring.any():
+            cursor = flock.next_to_pass[:count]
+            start = np.maximum(cursor, track.pipes[0].index)
+            passed = np.maximum(start, self._passed_index())
+            np.add(flock.score[:count], passed - start, out=flock.score[:count], where=scoring)
+            np.copyto(cursor, passed, where=scoring)
+
+
+def should_jump(flock, track):
+    # simulation.should_jump para o bando inteiro (bots): máscara das linhas que pulam.
+    count = len(flock)
+    target = HEIGHT // 2
+    for pipe in track:
+        if pipe.x + pipe.width > flock.x - flock.width // 2:
+            target = pipe.y_top_end + PIPE_GAP // 2
+            break
+    return (flock.alive[:count] & (flock.velocity[:count] >= 0) &
+            (flock.y[:count] > target + BIRD_HEIGHT // 2))
@@ -0,0 +1,191 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+# Log do jogo com níveis, amostragem por categoria e buffer circular em memória.
+# O console (lento, principalmente em terminais do Windows) só recebe INFO para cima;
+# o DEBUG vai apenas para o buffer em memória, que é gravado em arquivo quando o
+# jogo quebra ou a partida termina. Eventos de alta frequência (ex.: estado recebido
+# pela rede, dezenas por segundo) passam por amostragem: só 1 a cada N vira registro.
+#
+# FLAPPY_LOG=DEBUG|INFO|WARNING     nível do console (padrão INFO)
+# FLAPPY_LOG_BUFFER=DEBUG|INFO|...  nível do buffer em memória (padrão DEBUG; OFF desliga)
+# FLAPPY_LOG_SAMPLE=net.state=20    1 a cada N por categoria, separado por vírgulas
+# FLAPPY_LOG_DIR=logs               onde os dumps são gravados
+
+RING_SIZE = 4096
+DEFAULT_SAMPLE_RATES = {
+    'net.state': 30,   # ~1 registro por segundo com o oponente a 20-40 msg/s
+    'net.input': 1,
+}
+LOG_FORMAT = '%(asctime)s.%(msecs)03d %(levelname)-7s %(name)s [%(threadName)s] %(message)s'
+DATE_FORMAT = '%H:%M:%S'
+
+ROOT = 'flappy'
+
+
+class RingBufferHandler(logging.Handler):
+    # Guarda os últimos registros sem formatar; a formatação só acontece no dump.
+    def __init__(self, capacity=RING_SIZE, level=logging.DEBUG):
+        super().__init__(level)
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def dump(self, path, header=None):
+        self.acquire()
+        try:
+            records = list(self.records)
+        finally:
+            self.release()
+        formatter = self.formatter or logging.Formatter(LOG_FORMAT, DATE_FORMAT)
+        with open(path, 'w', encoding='utf-8') as f:
+            if header:
+                f.write(header + '\n')
+            for record in records:
+                f.write(formatter.format(record) + '\n')
+        return len(records)
+
+
+class Sampler:
+    # Decide se um evento de uma categoria vira registro: o 1º e depois 1 a cada N.
+    def __init__(self, rates=None):
+        self.rates = dict(DEFAULT_SAMPLE_RATES if rates is None else rates)
+        self.counts = {}
+        # eventos descartados por categoria (aparecem no dump)
+        self.skipped = {}
+
+    def __call__(self, category):
+        count = self.counts.get(category, 0)
+        self.counts[category] = count + 1
+        if count % self.rates.get(category, 1) == 0:
+            return True
+        self.skipped[category] = self.skipped.get(category, 0) + 1
+        return False
+
+
+def _parse_level(name, default, variable=None):
+    if not name:
+        return default
+    if name.upper() == 'OFF':
+        return None
+    level = logging.getLevelName(name.upper()) if not name.isdigit() else int(name)
+    if not isinstance(level, int):
+        # nome desconhecido: getLevelName devolve a string 'Level X', que o setLevel recusa
+        _bad_levels.append((variable, name, logging.getLevelName(default)))
+        return default
+    return level
+
+
+def _parse_rates(spec):
+    rates = dict(DEFAULT_SAMPLE_RATES)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        category, _, rate = item.partition('=')
+        rates[category.strip()] = max(1, int(rate))
+    return rates
+
+
+# estado do módulo, preenchido por setup()
+ring = None
+# níveis inválidos nas variáveis de ambiente, avisados depois que o log está montado
+_bad_levels = []
+sampler = Sampler()
+log_dir = 'logs'
+session_name = ROOT
+
+
+def get_logger(category):
+    return logging.getLogger(f'{ROOT}.{category}')
+
+
+def setup(name=ROOT, console_level=None, buffer_level=None, sample_rates=None, directory=None):
+    # Configura o log do processo (uma vez, no início). 'name' entra no nome dos dumps.
+    global ring, sampler, log_dir, session_name
+    console_level = console_level or _parse_level(os.environ.get('FLAPPY_LOG'), logging.INFO, 'FLAPPY_LOG')
+    if buffer_level is None:
+        buffer_level = _parse_level(os.environ.get('FLAPPY_LOG_BUFFER'), logging.DEBUG, 'FLAPPY_LOG_BUFFER')
+    sampler = Sampler(sample_rates if sample_rates is not None else _parse_rates(os.environ.get('FLAPPY_LOG_SAMPLE')))
+    log_dir = directory or os.environ.get('FLAPPY_LOG_DIR', 'logs')
+    session_name = name
+
+    logger = logging.getLogger(ROOT)
+    logger.handlers.clear()
+    logger.propagate = False
+
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    # no console, só a mensagem (como os antigos print)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(console)
+
+    levels = [console_level]
+    if buffer_level is not None:
+        ring = RingBufferHandler(level=buffer_level)
+        ring.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+        logger.addHandler(ring)
+        levels.append(buffer_level)
+    else:
+        ring = None
+    # o logger descarta cedo (isEnabledFor) o que nenhum handler quer
+    logger.setLevel(min(levels))
+    _install_crash_hooks()
+    for variable, name, default in _bad_levels:
+        get_logger('log').warning("%s=%s: nível desconhecido, usando %s", variable, name, default)
+    _bad_levels.clear()
+    return logger
+
+
+def sampled(logger, category, msg, *args):
+    # DEBUG amostrado: quase de graça quando o DEBUG está desligado ou o evento é descartado.
+    # Os argumentos só são formatados se o registro for gravado num dump.
+    if logger.isEnabledFor(logging.DEBUG) and sampler(category):
+        logger.debug(msg, *args)
+
+
+def dump(reason):
+    # Grava o buffer em memória num arquivo; devolve o caminho (ou None).
+    if ring is None or not ring.records:
+        return None
+    try:
+        os.makedirs(log_dir, exist_ok=True)
+        path = os.path.join(log_dir, f'{session_name}-{time.strftime("%Y%m%d-%H%M%S")}-{reason}.log')
+        header = f'# {session_name} | {reason} | amostragem descartou: {sampler.skipped}'
+        ring.dump(path, header)
+    except OSError as e:
+        get_logger('log').warning('não foi possível gravar o log em %s: %s', log_dir, e)
+        return None
+    get_logger('log').info('log gravado em %s', path)
+    return path
+
+
+_hooks_installed = False
+
+
+def _install_crash_hooks():
+    # Exceção não tratada (na thread principal ou na do MQTT) grava o buffer antes de sair.
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+    previous_hook = sys.excepthook
+    previous_thread_hook = threading.excepthook
+
+    def excepthook(exc_type, exc, tb):
+        if issubclass(exc_type, KeyboardInterrupt):
+            return previous_hook(exc_type, exc, tb)
+        get_logger('crash').critical('exceção não tratada', exc_info=(exc_type, exc, tb))
+        dump('crash')
+        previous_hook(exc_type, exc, tb)
+
+    def thread_excepthook(args):
+        get_logger('crash').critical('exceção não tratada na thread %s', args.thread.name if args.thread else '?',
+                                     exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+        dump('crash')
+        previous_thread_hook(args)
+
+    sys.excepthook = excepthook
+    threading.excepthook = thread_excepthook
@@ -0,0 +1,62 @@
+from collections import deque
+
+import gamelog
+
+# Caixa de entrada entre a thread de rede (loop_start do paho) e o loop do jogo.
+# O on_message só decodifica e enfileira; quem mexe em remote_states, game_state,
+# canos e pássaros é só a thread do jogo, ao esvaziar a caixa uma vez por frame.
+# Sem lock: no CPython, atribuir/remover uma chave de dict e append/popleft numa
+# deque são operações atômicas, e cada lado só faz essas operações.
+#
+# As mensagens ordenadas (seed, game_over, entradas, snapshots) têm um limite entre
+# dois drenos: MAX_EVENTS por padrão (folga de sobra para um cliente, que esvazia a
+# caixa a cada frame, mas que segura a memória se o loop do jogo travar ou o
+# tópico for inundado), maior no servidor e no relay, que recebem muitas partidas.
+# O que passa do limite é descartado, contado em 'overflowed' e avisado no log.
+
+log = gamelog.get_logger('net')
+
+MAX_EVENTS = 4096
+
+
+class Inbox:
+    def __init__(self, max_events=MAX_EVENTS):
+        # estado contínuo (y, pontuação...): só o último de cada remetente interessa
+        self._latest = {}
+        # mensagens entregues todas, na ordem de chegada (até max_events entre dois drenos)
+        self._events = deque()
+        self.max_events = max_events
+        # estados substituídos antes de o jogo lê-los (só a thread de rede escreve)
+        self.coalesced = 0
+        # mensagens ordenadas descartadas por passarem de max_events
+        self.overflowed = 0
+
+    def put_state(self, sender, message):
+        if sender in self._latest:
+            self.coalesced += 1
+        self._latest[sender] = message
+
+    def put_event(self, message):
+        if len(self._events) >= self.max_events:
+            self.overflowed += 1
+            # avisa no primeiro descarte e depois a cada 1000, sem inundar o console
+            if self.overflowed == 1 or self.overflowed % 1000 == 0:
+                log.warning("caixa de entrada cheia (%d mensagens): %d descartadas até agora",
+                            self.max_events, self.overflowed)
+            return
+        self._events.append(message)
+
+    def drain_states(self):
+        # Devolve {remetente: último estado} e esvazia; chamado só pela thread do jogo.
+        states = {}
+        for sender in list(self._latest):
+            message = self._latest.pop(sender, None)
+            if message is not None:
+                states[sender] = message
+        return states
+
+    def drain_events(self):
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
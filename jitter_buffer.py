@@ -0,0 +1,168 @@
+from bisect import bisect_right
+from collections import deque
+
+from simulation import HEIGHT, project
+
+# Buffer de jitter do y de um pássaro remoto.
+# A suavização antiga (y += (alvo - y) * 0.2 por tick) andava atrás do alvo sem nunca
+# chegar, e cada estado atrasado ou fora de ordem virava um tranco. Aqui os estados
+# ficam guardados pelo tick do remetente e o pássaro é desenhado um pouco no passado
+# (o atraso), interpolando entre os dois estados que cercam esse instante: o
+# movimento fica igual ao do outro lado, só deslocado no tempo.
+#
+# Relógios: 'now' é o tick local (world.tick), que anda no mesmo passo fixo que o do
+# remetente. Cada estado dá uma estimativa de (tick remoto - tick local) na chegada; a
+# maior da janela recente é a do estado que chegou mais rápido, e a diferença para a
+# menor é o jitter. O atraso = intervalo entre estados + jitter + 1 tick de folga,
+# entre MIN_DELAY_TICKS e MAX_DELAY_TICKS, e muda devagar (DELAY_SLEW por tick) para
+# o pássaro não dar saltos quando a rede piora ou melhora.
+#
+# Se os estados param de chegar, o y é extrapolado pela velocidade dos dois últimos
+# por até MAX_EXTRAPOLATION_TICKS e depois fica parado.
+#
+# Estados com velocidade (wire v3, ver state_sender.py) chegam só em pulos, mortes,
+# pontos e keyframes: entre eles o pássaro é projetado a partir do último estado
+# antes do tick mostrado (simulation.project, a mesma física do remetente), sem
+# limite de tempo. O atraso então só precisa cobrir o jitter, para o estado de um
+# pulo chegar antes de o tick mostrado passar por ele.
+
+CAPACITY = 32
+OFFSET_WINDOW = 20              # estados usados para o relógio e o jitter (~1 s a 20/s)
+MIN_DELAY_TICKS = 2
+MAX_DELAY_TICKS = 30            # 500 ms
+DELAY_SLEW = 0.1                # ticks de atraso que mudam por tick
+MAX_EXTRAPOLATION_TICKS = 6     # 100 ms
+GAP_SMOOTHING = 0.1             # peso de cada intervalo novo na média do intervalo entre estados
+RESYNC_TICKS = 60               # salto no relógio do remetente que zera o buffer (nova partida, fast_forward)
+
+
+class JitterBuffer:
+    def __init__(self, capacity=CAPACITY, min_delay=MIN_DELAY_TICKS, max_delay=MAX_DELAY_TICKS,
+                 max_extrapolation=MAX_EXTRAPOLATION_TICKS):
+        self.capacity = capacity
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_extrapolation = max_extrapolation
+        # estatísticas (overlay de rede, logs)
+        self.late = 0        # amostras tiradas além do último estado (extrapoladas ou paradas)
+        self.dropped = 0     # estados repetidos ou velhos demais para serem usados
+        self.clear()
+
+    def clear(self):
+        # Nova partida (ou o tick local pulou): esquece estados e relógio.
+        self.ticks = []
+        self.values = []
+        self.velocities = []
+        self.offsets = deque(maxlen=OFFSET_WINDOW)
+        self.offset = None
+        self.gap = None
+        self.delay = None
+        self._target_delay = None
+        self._last_now = None
+        self._rendered_tick = None
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def push(self, tick, y, now, velocity=None):
+        # Guarda o y (e a velocidade, se veio) do tick 'tick' do remetente, recebido no
+        # tick local 'now'. Devolve False se o estado foi descartado.
+        if self.offset is not None and abs(tick - now - self.offset) > RESYNC_TICKS:
+            # o remetente recomeçou a partida ou pulou adiante: o relógio antigo não vale
+            # (o intervalo entre estados, que pode ser longo, não conta)
+            self.clear()
+        ticks = self.ticks
+        if self._rendered_tick is not None and tick <= self._rendered_tick and ticks and tick < ticks[0]:
+            # mais velho que tudo o que ainda pode ser desenhado
+            self.dropped += 1
+            return False
+        position = bisect_right(ticks, tick)
+        if position and ticks[position - 1] == tick:
+            self.dropped += 1
+            return False
+        if position == len(ticks) and ticks:
+            gap = tick - ticks[-1]
+            self.gap = gap if self.gap is None else self.gap + (gap - self.gap) * GAP_SMOOTHING
+        ticks.insert(position, tick)
+        self.values.insert(position, y)
+        self.velocities.insert(position, velocity)
+        if len(ticks) > self.capacity:
+            del ticks[0]
+            del self.values[0]
+            del self.velocities[0]
+
+        self.offsets.append(tick - now)
+        self.offset = max(self.offsets)
+        # com velocidade, o intervalo entre estados não importa (o y é projetado)
+        gap = 0 if velocity is not None else (self.gap or 1)
+        target = gap + (self.offset - min(self.offsets)) + 1
+        target = min(max(target, self.min_delay), self.max_delay)
+        if self.delay is None:
+            self.delay = target
+        self._target_delay = target
+        return True
+
+    def render_tick(self, now):
+        # Tick remoto mostrado no tick local 'now'.
+        if self.offset is None:
+            return None
+        if self._last_now is not None and now > self._last_now:
+            step = DELAY_SLEW * (now - self._last_now)
+            self.delay += min(max(self._target_delay - self.delay, -step), step)
+        self._last_now = now
+        return now + self.offset - self.delay
+
+    def segment(self, target):
+        # Estado do qual o tick remoto 'target' é projetado, para quem amostra muitos
+        # buffers de uma vez (flock.JitterTable): (tick, y, velocidade ou None, tick do
+        # estado seguinte ou None). Antes do primeiro estado, o y dele, parado.
+        ticks = self.ticks
+        self._rendered_tick = target
+        position = bisect_right(ticks, target)
+        if position == 0:
+            return ticks[0], self.values[0], None, ticks[0]
+        if position > 1:
+            del ticks[:position - 1]
+            del self.values[:position - 1]
+            del self.velocities[:position - 1]
+        return ticks[0], self.values[0], self.velocities[0], ticks[1] if len(ticks) > 1 else None
+
+    def sample(self, now):
+        # y do pássaro remoto no tick local 'now' (None sem nenhum estado).
+        target = self.render_tick(now)
+        if target is None:
+            return None
+        ticks = self.ticks
+        values = self.values
+        velocities = self.velocities
+        self._rendered_tick = target
+        position = bisect_right(ticks, target)
+        if position == 0:
+            return values[0]
+        velocity = velocities[position - 1]
+        if velocity is not None:
+            # dead reckoning a partir do último estado antes do tick mostrado
+            y, _ = project(values[position - 1], velocity, target - ticks[position - 1])
+            if position > 1:
+                del ticks[:position - 1]
+                del values[:position - 1]
+                del velocities[:position - 1]
+            return min(max(y, 0), HEIGHT)
+        if position < len(ticks):
+            # estados dos dois lados: interpolação linear
+            before, after = ticks[position - 1], ticks[position]
+            alpha = (target - before) / (after - before)
+            y = values[position - 1] + (values[position] - values[position - 1]) * alpha
+            # os estados antes do anterior não serão mais usados
+            if position > 1:
+                del ticks[:position - 1]
+                del values[:position - 1]
+                del velocities[:position - 1]
+            return y
+        # além do último estado: extrapola um pouco, depois para
+        self.late += 1
+        if len(ticks) < 2:
+            return values[-1]
+        ahead = min(target - ticks[-1], self.max_extrapolation)
+        velocity = (values[-1] - values[-2]) / (ticks[-1] - ticks[-2])
+        return values[-1] + velocity * ahead
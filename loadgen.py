@@ -0,0 +1,350 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import topics
+import transport
+import wire
+from netstats import now_ms, percentile, SEQ_MODULO
+from simulation import World, Bird, BIRD_X, HEIGHT, should_jump
+from state_sender import StateSender
+from timestep import FixedTimestep, TICK_RATE
+
+# Gerador de carga: centenas a milhares de bots sem janela, em poucos processos,
+# jogando partidas no modo 'state' com os mesmos tópicos e mensagens do Flappy.py
+# com FLAPPY_MATCH (flappybird/<partida>/game): estado binário nos pulos, mortes,
+# pontos e keyframes (state_sender.py; --send fixed: a cada 50 ms, como antes) com
+# sequência e carimbo de envio, seed retido pelo P1 e game over em JSON. Cada bot tem
+# a própria conexão e simula o próprio pássaro (simulation.World); pula pela heurística
+# de simulation.should_jump, com erros de propósito para as partidas terminarem.
+#
+# Mede, por intervalo: mensagens publicadas e recebidas por segundo, latência de
+# entrega (carimbo de envio até a chegada no oponente, p50/p95/p99/máx) e perdas e
+# reordenações pelos números de sequência. Os dois bots de uma partida ficam no
+# mesmo processo, então o carimbo e a chegada usam o mesmo relógio.
+#
+# Uso: python loadgen.py --bots 1000 --procs 4 --duration 60 --broker localhost
+#      python loadgen.py --bots 200 --transport loopback   (rede dentro do processo,
+#          com FLAPPY_LOOPBACK_LATENCY/_JITTER/_LOSS; sempre num processo só)
+
+STATE_EVERY_TICKS = 3        # 50 ms, como o Flappy.py com FLAPPY_SEND=fixed
+REPORT_INTERVAL = 5.0        # s entre linhas do relatório
+RESTART_TICKS = TICK_RATE    # bot morto recomeça depois de 1 s
+MISTAKE_RATE = 0.002         # chance por tick de o bot errar o pulo
+MAX_SAMPLES = 2000           # amostras de latência por processo por intervalo
+MAX_TOTAL_SAMPLES = 100000   # amostras guardadas para o resumo final
+# acima disso o broker não está dando conta do fluxo de 50 ms
+SATURATED_LATENCY_MS = STATE_EVERY_TICKS * 1000 / TICK_RATE
+SATURATED_DROP_RATE = 0.01
+# estados publicados que chegaram ao oponente (cada estado tem um receptor); abaixo
+# disso o broker está perdendo ou segurando mensagens
+SATURATED_DELIVERY = 0.95
+
+
+class Bot:
+    def __init__(self, match_id, bird_index, number, link, rng, event_sends=True):
+        self.match_id = match_id
+        self.bird_index = bird_index
+        self.player_id = f'player-{number}'
+        self.color = 'red' if bird_index == 0 else 'blue'
+        self.topic = topics.match_topic(match_id, topics.GAME)
+        self.link = link
+        self.rng = rng
+        self.world = World(birds=[Bird(BIRD_X, HEIGHT // 2)])
+        self.bird = self.world.birds[0]
+        self.sender = StateSender() if event_sends else None
+        self.seq = 0
+        self.ticks = 0
+        self.dead_ticks = 0
+        self.pending_seed = None
+        # contadores: escritos só pela thread de rede deste bot (recebidos) ou
+        # pelo loop do processo (publicados); lidos e zerados pelo loop no relatório
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+        self.reordered = 0
+        self.latencies = []
+        self._last_seq = None
+        link.on_message = self._on_message
+        link.subscribe(self.topic)
+
+    def _on_message(self, msg):
+        try:
+            data = wire.decode(msg.payload)
+        except (ValueError, UnicodeDecodeError):
+            return
+        if data.get("player_id") == self.player_id:
+            return
+        if "seed" in data:
+            self.pending_seed = data["seed"]
+            return
+        if data.get("color") not in ('red', 'blue'):
+            return
+        self.received += 1
+        sent = data.get("sent")
+        if sent is not None:
+            self.latencies.append((now_ms() - sent) & 0xFFFFFFFF)
+        seq = data.get("seq")
+        if seq is not None:
+            if self._last_seq is not None:
+                gap = (seq - self._last_seq - 1) % SEQ_MODULO
+                if gap >= SEQ_MODULO // 2:
+                    # chegou depois de uma mais nova
+                    self.reordered += 1
+                    return
+                self.dropped += gap
+            self._last_seq = seq
+
+    def start(self):
+        if self.bird_index == 0:
+            self.new_match()
+
+    def new_match(self):
+        # o P1 sorteia o seed e publica retido, como o Flappy.py
+        seed = self.rng.randrange(100000)
+        self.world.reset(seed)
+        self.link.publish(self.topic, json.dumps({"player_id": self.player_id, "seed": seed}), retain=True)
+
+    def tick(self):
+        world = self.world
+        bird = self.bird
+        if self.pending_seed is not None:
+            world.set_seed(self.pending_seed)
+            self.pending_seed = None
+        jump = False
+        if bird.is_alive:
+            jump = should_jump(bird, world.track)
+            if self.rng.random() < MISTAKE_RATE:
+                jump = not jump
+            world.step([0] if jump else ())
+            if not bird.is_alive:
+                self.link.publish(self.topic, json.dumps({"player_id": self.player_id, "game_state": 'game_over'}))
+        else:
+            self.dead_ticks += 1
+            if self.dead_ticks >= RESTART_TICKS:
+                self.dead_ticks = 0
+                if self.bird_index == 0:
+                    self.new_match()
+                else:
+                    world.reset()
+        # como no jogo: nos eventos e keyframes, ou a cada 50 ms morto ou vivo
+        self.ticks += 1
+        if self.sender is not None:
+            send = self.sender.should_send(world.tick, jump, bird.is_alive, bird.score, 'playing')
+        else:
+            send = self.ticks % STATE_EVERY_TICKS == 0
+        if send:
+            self.link.publish(self.topic, wire.encode_state({
+                "player_id": self.player_id,
+                "color": self.color,
+                "y": bird.y,
+                "velocity": bird.velocity if bird.is_alive else None,
+                "score": bird.score,
+                "alive": bird.is_alive,
+                "game_state": 'playing',
+                "tick": world.tick,
+                "seq": self.seq,
+                "sent": now_ms()
+            }))
+            self.seq = (self.seq + 1) % SEQ_MODULO
+            self.published += 1
+
+    def collect(self):
+        counts = (self.published, self.received, self.dropped, self.reordered)
+        self.published = self.received = self.dropped = self.reordered = 0
+        latencies, self.latencies = self.latencies, []
+        return counts, latencies
+
+
+def collect(bots, rng, interval, elapsed):
+    totals = [0, 0, 0, 0]
+    latencies = []
+    for bot in bots:
+        counts, samples = bot.collect()
+        for position, count in enumerate(counts):
+            totals[position] += count
+        latencies.extend(samples)
+    if len(latencies) > MAX_SAMPLES:
+        latencies = rng.sample(latencies, MAX_SAMPLES)
+    published, received, dropped, reordered = totals
+    return {"interval": interval, "elapsed": elapsed, "published": published, "received": received,
+            "dropped": dropped, "reordered": reordered, "latencies": latencies}
+
+
+def worker(worker_index, bot_count, options, results, stop):
+    rng = random.Random(options.seed * 1000 + worker_index)
+    kind = options.transport
+    bots = []
+    for position in range(bot_count):
+        match_id = f'{options.prefix}-{worker_index}-{position // 2}'
+        number = worker_index * 100000 + position
+        link = transport.create(f'flappy-load-{os.getpid()}-{position}', options.broker, options.port, kind)
+        bots.append(Bot(match_id, position % 2, number, link, rng, options.send == 'events'))
+    for bot in bots:
+        bot.link.connect()
+    for bot in bots:
+        bot.start()
+    network = transport.default_network() if kind == 'loopback' else None
+
+    timestep = FixedTimestep()
+    started = last_report = time.perf_counter()
+    deadline = started + options.duration
+    interval = 0
+    try:
+        while not stop.is_set():
+            if network is not None:
+                network.pump()
+            for _ in range(timestep.advance()):
+                for bot in bots:
+                    bot.tick()
+            if network is not None:
+                network.pump()
+            now = time.perf_counter()
+            if now - last_report >= REPORT_INTERVAL or now >= deadline:
+                results.put(collect(bots, rng, interval, now - last_report))
+                interval += 1
+                last_report = now
+                if now >= deadline:
+                    break
+            time.sleep(max(0.0, timestep.dt - timestep.accumulator))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for bot in bots:
+            bot.link.close()
+        results.put({"done": worker_index, "dropped_ticks": timestep.dropped_ticks})
+
+
+def summarize(reports, elapsed):
+    published = sum(report["published"] for report in reports)
+    received = sum(report["received"] for report in reports)
+    dropped = sum(report["dropped"] for report in reports)
+    reordered = sum(report["reordered"] for report in reports)
+    latencies = sorted(sample for report in reports for sample in report["latencies"])
+    drop_rate = dropped / (received + dropped) if received + dropped else 0.0
+    summary = {
+        "publish_rate": published / elapsed if elapsed else 0.0,
+        "delivery": received / published if published else None,
+        "receive_rate": received / elapsed if elapsed else 0.0,
+        "dropped": dropped,
+        "drop_rate": drop_rate,
+        "reordered": reordered,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "latency_max": latencies[-1] if latencies else None,
+    }
+    summary["saturated"] = bool(drop_rate > SATURATED_DROP_RATE or
+                                (summary["delivery"] is not None and summary["delivery"] < SATURATED_DELIVERY) or
+                                (summary["latency_p95"] is not None and summary["latency_p95"] > SATURATED_LATENCY_MS))
+    return summary
+
+
+def format_summary(summary):
+    def ms(value):
+        return '-' if value is None else f'{value:.0f}'
+    delivery = '-' if summary["delivery"] is None else f'{summary["delivery"]:.1%}'
+    line = (f'pub {summary["publish_rate"]:,.0f}/s  rec {summary["receive_rate"]:,.0f}/s ({delivery})  '
+            f'latência p50/p95/p99/máx {ms(summary["latency_p50"])}/{ms(summary["latency_p95"])}/'
+            f'{ms(summary["latency_p99"])}/{ms(summary["latency_max"])} ms  '
+            f'perdas {summary["dropped"]} ({summary["drop_rate"]:.2%})  fora de ordem {summary["reordered"]}')
+    return line + ('  SATURADO' if summary["saturated"] else '')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga do Flappy Bird (bots sem janela)")
+    parser.add_argument("--bots", type=int, default=100, help="bots no total (dois por partida)")
+    parser.add_argument("--procs", type=int, default=os.cpu_count() or 1, help="processos")
+    parser.add_argument("--duration", type=float, default=60.0, help="s de teste")
+    parser.add_argument("--broker", default=os.environ.get("FLAPPY_BROKER", "localhost"))
+    parser.add_argument("--port", type=int, default=transport.DEFAULT_PORT)
+    parser.add_argument("--transport", choices=("mqtt", "loopback"), default=os.environ.get("FLAPPY_TRANSPORT", "mqtt"))
+    parser.add_argument("--prefix", default="load", help="prefixo dos ids das partidas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--send", choices=("events", "fixed"), default="events",
+                        help="envio do estado: eventos e keyframes (como o jogo) ou a cada 50 ms")
+    parser.add_argument("--json", metavar="ARQUIVO", help="grava o resumo final em JSON")
+    options = parser.parse_args()
+
+    bots = options.bots + options.bots % 2
+    # o loopback só existe dentro de um processo
+    procs = 1 if options.transport == 'loopback' else max(1, min(options.procs, bots // 2))
+    # partidas inteiras por processo
+    pairs = [bots // 2 // procs + (1 if index < bots // 2 % procs else 0) for index in range(procs)]
+    print(f"{bots} bots, {bots // 2} partidas, {procs} processos, transporte {options.transport}")
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    if procs == 1:
+        # sem processo filho: também funciona com o loopback
+        workers = []
+        worker(0, 2 * pairs[0], options, results, stop)
+    else:
+        workers = [multiprocessing.Process(target=worker, args=(index, 2 * count, options, results, stop),
+                                           name=f'flappy-load-{index}', daemon=True)
+                   for index, count in enumerate(pairs)]
+        for process in workers:
+            process.start()
+
+    pending = {}
+    reports = []
+    # amostra uniforme das latências de todo o teste (reservoir sampling)
+    samples = []
+    seen = 0
+    sampler = random.Random(options.seed)
+    done = 0
+    dropped_ticks = 0
+    try:
+        while done < procs:
+            try:
+                report = results.get(timeout=1.0)
+            except queue.Empty:
+                if workers and not any(process.is_alive() for process in workers):
+                    break
+                continue
+            if "done" in report:
+                done += 1
+                dropped_ticks += report["dropped_ticks"]
+                continue
+            for sample in report["latencies"]:
+                seen += 1
+                if len(samples) < MAX_TOTAL_SAMPLES:
+                    samples.append(sample)
+                else:
+                    position = sampler.randrange(seen)
+                    if position < MAX_TOTAL_SAMPLES:
+                        samples[position] = sample
+            reports.append(dict(report, latencies=[]))
+            # uma linha por intervalo, quando todos os processos mandaram o seu
+            interval = pending.setdefault(report["interval"], [])
+            interval.append(report)
+            if len(interval) == procs:
+                del pending[report["interval"]]
+                elapsed = max(r["elapsed"] for r in interval)
+                print(f'[{report["interval"] + 1:3d}] {format_summary(summarize(interval, elapsed))}')
+    except KeyboardInterrupt:
+        stop.set()
+        for process in workers:
+            process.join(5)
+
+    # tempo medido pelos processos (sem a conexão dos bots)
+    elapsed = sum(report["elapsed"] for report in reports) / procs
+    summary = summarize(reports + [{"published": 0, "received": 0, "dropped": 0, "reordered": 0,
+                                    "latencies": samples}], elapsed)
+    summary.update({"bots": bots, "matches": bots // 2, "procs": procs, "transport": options.transport,
+                    "duration": elapsed, "dropped_ticks": dropped_ticks})
+    print(f"total: {format_summary(summary)}")
+    if dropped_ticks:
+        # o próprio gerador não deu conta: as medidas valem pouco, use mais processos
+        print(f"atenção: {dropped_ticks} ticks descartados pelos bots (CPU do gerador no limite)")
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+from collections import deque
+
+# Modo de sincronização por entradas (lockstep determinístico com rollback).
+# Em vez de mandar o y absoluto a cada 50 ms, cada jogador só publica os pulos,
+# carimbados com o tick em que acontecem. Os dois lados rodam a mesma simulação a
+# partir do mesmo seed; quando um pulo remoto chega atrasado (tick já simulado), o
+# mundo volta ao estado salvo daquele tick e ressimula até o presente. Assim as duas
+# telas concordam exatamente sobre quem bateu em qual cano.
+#
+# O game over só é definitivo quando nenhum pulo remoto pode mais mudá-lo: a morte de
+# um pássaro depende só dos pulos dele, então cada jogador avisa (finish) o tick em que
+# o seu morreu, e depois disso não há mais entradas dele. Até todos os pássaros
+# avisarem, a partida segue avançando (com rollback); sem aviso, o game over vale
+# quando sai da janela de rollback.
+#
+# Um pulo mais atrasado que a janela de rollback não tem como ser aplicado no tick
+# dele: as duas simulações já divergiram. Em vez de aplicá-lo num tick errado, a
+# sessão marca 'desynced' e quem joga encerra a partida (ver Flappy.py). Para isso
+# não acontecer logo no começo, quem recebe o seed entra no tick em que o P1 já está
+# (fast_forward), em vez de começar do 0 com o atraso da rede.
+
+MAX_ROLLBACK_TICKS = 120  # estados guardados para rollback (2 s a 60 ticks/s)
+INPUT_DELAY_TICKS = 1     # atraso aplicado à entrada local; reduz rollbacks no oponente
+
+
+class LockstepSession:
+    def __init__(self, world, local_index=None, input_delay=INPUT_DELAY_TICKS, max_rollback=MAX_ROLLBACK_TICKS):
+        self.world = world
+        # None para espectadores: só recebem entradas
+        self.local_index = local_index
+        self.input_delay = input_delay
+        self.max_rollback = max_rollback
+        # tick -> lista de índices de pássaros que pulam naquele tick
+        self.inputs = {}
+        # tick -> estado do mundo ANTES de simular aquele tick
+        self.states = {}
+        # entradas remotas ainda não aplicadas; só advance() mexe no mundo
+        self._incoming = deque()
+        # pássaro -> tick em que morreu: não manda mais entradas
+        self.finished = {}
+        self._game_over_at = None
+        self.rollbacks = 0
+        self.resimulated_ticks = 0
+        # entradas remotas que chegaram depois da janela de rollback
+        self.stale_inputs = 0
+        self.desynced = False
+        # on_final(tick, pulos, estado depois do tick): chamado quando um tick sai da
+        # janela de rollback e não muda mais (ex.: gravação de replay, ver replay.py)
+        self.on_final = None
+        self._final_tick = -1
+
+    def start(self):
+        self.world.reset()
+        self.inputs.clear()
+        self.states.clear()
+        self._incoming.clear()
+        self.finished.clear()
+        self._game_over_at = None
+        self._final_tick = -1
+        self.desynced = False
+
+    def fast_forward(self, tick):
+        # Simula sem entradas até o tick combinado no início da partida. Os estados
+        # ficam guardados: um pulo remoto nesses ticks ainda volta por rollback.
+        while self.world.tick < tick:
+            self._simulate_tick()
+
+    def local_jump(self):
+        # Registra um pulo local e devolve o tick carimbado, para publicar.
+        tick = self.world.tick + self.input_delay
+        self.inputs.setdefault(tick, []).append(self.local_index)
+        return tick
+
+    def receive(self, tick, bird_index):
+        # Guarda um pulo remoto; é aplicado (com rollback, se preciso) no próximo advance().
+        self._incoming.append((tick, bird_index))
+
+    def finish(self, bird_index, tick):
+        # O pássaro morreu em 'tick' (local ou aviso remoto): todas as entradas dele já chegaram.
+        self.finished[bird_index] = tick
+
+    def settled(self):
+        # Game over que não muda mais: todos os pássaros avisaram que morreram, ou ele
+        # já está há uma janela de rollback inteira sem ser desfeito.
+        if not self.world.game_over:
+            return False
+        if all(index in self.finished for index in range(len(self.world.birds))):
+            return True
+        return self.world.tick - self._game_over_at >= self.max_rollback
+
+    def _drain_incoming(self):
+        # Devolve o menor tick já simulado que precisa ser refeito, ou None.
+        rollback_to = None
+        current = self.world.tick
+        while self._incoming:
+            tick, bird_index = self._incoming.popleft()
+            if tick < current - len(self.states):
+                # velho demais para rollback: não há como aplicá-lo no tick certo
+                self.stale_inputs += 1
+                self.desynced = True
+                continue
+            tick_inputs = self.inputs.setdefault(tick, [])
+            if bird_index in tick_inputs:
+                continue
+            tick_inputs.append(bird_index)
+            if tick < current and (rollback_to is None or tick < rollback_to):
+                rollback_to = tick
+        return rollback_to
+
+    def _simulate_tick(self):
+        world = self.world
+        tick = world.tick
+        self.states[tick] = world.save_state()
+        final = tick - self.max_rollback
+        if final > self._final_tick:
+            # o estado salvo antes de 'final + 1' é o estado depois de 'final'
+            self._finalize(final, self.inputs.get(final, ()), self.states[final + 1])
+        self.states.pop(final, None)
+        self.inputs.pop(final, None)
+        return world.step(self.inputs.get(tick, ()))
+
+    def _finalize(self, tick, inputs, state):
+        if tick >= 0 and self.on_final is not None:
+            self.on_final(tick, inputs, state)
+        self._final_tick = tick
+
+    def flush(self):
+        # Fim da partida: os ticks ainda na janela de rollback ficam finais.
+        current = self.world.tick
+        for tick in range(self._final_tick + 1, current):
+            state = self.states[tick + 1] if tick + 1 < current else self.world.save_state()
+            self._finalize(tick, self.inputs.get(tick, ()), state)
+
+    def advance(self):
+        # Avança um tick, fazendo rollback antes se chegou entrada atrasada.
+        rollback_to = self._drain_incoming()
+        if rollback_to is not None:
+            target = self.world.tick
+            self.world.load_state(self.states[rollback_to])
+            self.rollbacks += 1
+            while self.world.tick < target:
+                self._simulate_tick()
+                self.resimulated_ticks += 1
+        events = self._simulate_tick()
+        if not self.world.game_over:
+            self._game_over_at = None
+        elif self._game_over_at is None or rollback_to is not None:
+            # o rollback pode ter mudado o tick do game over: a espera recomeça
+            self._game_over_at = self.world.tick
+        return events
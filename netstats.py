@@ -0,0 +1,214 @@
+import json
+import threading
+import time
+from collections import deque
+
+# Medidas da rede por par (peer): RTT por ping/pong, perda e reordenação pelos
+# números de sequência dos estados, jitter pelo carimbo de envio (RFC 3550, não
+# precisa de relógios sincronizados) e taxa de mensagens. Serve para decidir o
+# intervalo de envio e a suavização do pássaro remoto com dados, não no olho.
+# O pong devolve a perda que quem responde mede nos estados de quem pingou: é
+# assim que o remetente sabe quanto do que ele manda se perde (ver state_sender.py).
+#
+# on_state/on_pong são chamados na thread de rede, na chegada da mensagem (o
+# horário de chegada é o que importa); summary() é lido pela thread do jogo.
+
+PING_INTERVAL = 1.0      # s entre pings
+WINDOW = 256             # amostras guardadas por par (RTT, sequências, chegadas)
+PEER_TIMEOUT = 10.0      # par sem mensagens por esse tempo some do resumo
+SEQ_MODULO = 1 << 16     # números de sequência do estado são de 16 bits
+
+
+def now_ms(clock=time.perf_counter):
+    # carimbo de envio: ms do relógio local, em 32 bits
+    return int(clock() * 1000) & 0xFFFFFFFF
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class PeerStats:
+    def __init__(self, now):
+        self.rtts = deque(maxlen=WINDOW)       # ms
+        self.seqs = deque(maxlen=WINDOW)       # sequências recebidas, na ordem de chegada
+        self.arrivals = deque(maxlen=WINDOW)   # horários de chegada (s)
+        self.highest_seq = None                # maior sequência vista (desenrolada)
+        self.reordered = 0
+        self.duplicates = 0
+        self.jitter = 0.0                      # ms
+        self.reported_loss = None              # perda dos NOSSOS estados, medida por este par
+        self._last_transit = None
+        self.last_seen = now
+
+    def on_state(self, seq, sent_ms, now):
+        self.last_seen = now
+        self.arrivals.append(now)
+        if seq is not None:
+            # desenrola a sequência de 16 bits perto da maior já vista
+            if self.highest_seq is None:
+                unwrapped = seq
+            else:
+                delta = (seq - self.highest_seq) % SEQ_MODULO
+                if delta >= SEQ_MODULO // 2:
+                    delta -= SEQ_MODULO
+                unwrapped = self.highest_seq + delta
+            if unwrapped in self.seqs:
+                self.duplicates += 1
+            elif self.highest_seq is not None and unwrapped < self.highest_seq:
+                self.reordered += 1
+            self.seqs.append(unwrapped)
+            if self.highest_seq is None or unwrapped > self.highest_seq:
+                self.highest_seq = unwrapped
+        if sent_ms is not None:
+            # jitter entre chegadas (RFC 3550): variação do "tempo de trânsito"
+            transit = now * 1000 - sent_ms
+            if self._last_transit is not None:
+                d = abs(transit - self._last_transit)
+                # carimbos de 32 bits dão a volta; uma diferença absurda é descartada
+                if d < 60000:
+                    self.jitter += (d - self.jitter) / 16
+            self._last_transit = transit
+
+    def loss(self):
+        # fração perdida na janela: sequências esperadas entre a menor e a maior recebidas
+        if len(self.seqs) < 2:
+            return None
+        received = set(self.seqs)
+        expected = max(received) - min(received) + 1
+        return max(0.0, 1.0 - len(received) / expected)
+
+    def rate(self):
+        # mensagens de estado por segundo, na janela
+        if len(self.arrivals) < 2:
+            return None
+        span = self.arrivals[-1] - self.arrivals[0]
+        return (len(self.arrivals) - 1) / span if span > 0 else None
+
+    def summary(self):
+        rtts = sorted(self.rtts)
+        return {
+            "rtt_p50": percentile(rtts, 0.50),
+            "rtt_p95": percentile(rtts, 0.95),
+            "rtt_p99": percentile(rtts, 0.99),
+            # latência de ida estimada: metade do RTT mediano
+            "latency": percentile(rtts, 0.50) / 2 if rtts else None,
+            "jitter": self.jitter,
+            "loss": self.loss(),
+            "reordered": self.reordered,
+            "duplicates": self.duplicates,
+            "rate": self.rate(),
+            "reported_loss": self.reported_loss,
+        }
+
+
+class NetStats:
+    def __init__(self, player_id, clock=time.perf_counter, ping_interval=PING_INTERVAL):
+        self.player_id = player_id
+        self.clock = clock
+        self.ping_interval = ping_interval
+        self.peers = {}
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._ping_id = 0
+        self._last_ping = None
+
+    def _peer(self, peer_id, now):
+        peer = self.peers.get(peer_id)
+        if peer is None:
+            peer = self.peers[peer_id] = PeerStats(now)
+        return peer
+
+    def stamp(self, state):
+        # Carimba um estado que vai ser enviado: sequência e horário de envio.
+        state["seq"] = self._seq
+        state["sent"] = now_ms(self.clock)
+        self._seq = (self._seq + 1) % SEQ_MODULO
+        return state
+
+    def ping(self, to=None):
+        # Devolve uma mensagem de ping se já é hora de mandar outra, senão None.
+        # to: quem deve responder, num tópico compartilhado (só ele responde)
+        now = self.clock()
+        if self._last_ping is not None and now - self._last_ping < self.ping_interval:
+            return None
+        self._last_ping = now
+        self._ping_id += 1
+        ping = {"type": "ping", "player_id": self.player_id, "ping_id": self._ping_id, "t": now_ms(self.clock)}
+        if to is not None:
+            ping["to"] = to
+        return ping
+
+    def pong(self, ping):
+        # resposta a um ping de outro par: devolve o carimbo dele sem mexer, com a
+        # perda medida nos estados dele
+        with self._lock:
+            peer = self.peers.get(ping.get("player_id"))
+            loss = peer.loss() if peer is not None else None
+        return {"type": "pong", "player_id": self.player_id, "to": ping.get("player_id"),
+                "ping_id": ping.get("ping_id"), "t": ping.get("t"), "loss": loss}
+
+    def on_pong(self, pong):
+        if pong.get("to") != self.player_id or pong.get("t") is None:
+            return
+        now = self.clock()
+        rtt = (now_ms(self.clock) - pong["t"]) & 0xFFFFFFFF
+        with self._lock:
+            peer = self._peer(pong.get("player_id"), now)
+            peer.rtts.append(rtt)
+            peer.last_seen = now
+            if pong.get("loss") is not None:
+                peer.reported_loss = pong["loss"]
+
+    def reported_loss(self):
+        # maior perda dos nossos estados entre os pares que responderam (None sem medida)
+        with self._lock:
+            losses = [stats.reported_loss for stats in self.peers.values() if stats.reported_loss is not None]
+        return max(losses) if losses else None
+
+    def on_state(self, state):
+        now = self.clock()
+        with self._lock:
+            self._peer(state.get("player_id"), now).on_state(state.get("seq"), state.get("sent"), now)
+
+    def summary(self):
+        # {par: medidas}; pares calados há mais de PEER_TIMEOUT saem
+        now = self.clock()
+        with self._lock:
+            for peer_id in [p for p, stats in self.peers.items() if now - stats.last_seen > PEER_TIMEOUT]:
+                del self.peers[peer_id]
+            return {peer_id: stats.summary() for peer_id, stats in self.peers.items()}
+
+
+def format_peer(peer_id, stats):
+    # linha curta para o overlay na tela
+    def ms(value):
+        return '-' if value is None else f'{value:.0f}'
+    loss = '-' if stats["loss"] is None else f'{stats["loss"] * 100:.1f}%'
+    rate = '-' if stats["rate"] is None else f'{stats["rate"]:.0f}/s'
+    return (f'{peer_id}: rtt {ms(stats["rtt_p50"])}/{ms(stats["rtt_p95"])}/{ms(stats["rtt_p99"])} ms'
+            f'  jitter {ms(stats["jitter"])} ms  perda {loss}  {rate}')
+
+
+class MetricsExporter:
+    # Grava o resumo periodicamente (uma linha JSON por intervalo) num arquivo.
+    def __init__(self, path, interval=10.0, clock=time.time):
+        self.path = path
+        self.interval = interval
+        self.clock = clock
+        self._last = clock()
+
+    def maybe_export(self, netstats, extra=None):
+        now = self.clock()
+        if now - self._last < self.interval:
+            return False
+        self._last = now
+        record = {"time": now, "player_id": netstats.player_id, "peers": netstats.summary()}
+        if extra:
+            record.update(extra)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        return True
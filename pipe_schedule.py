@@ -0,0 +1,46 @@
+# Sequência de alturas de cano de uma partida, derivada só do seed.
+# Antes as alturas vinham do módulo random global, semeado dentro da thread do
+# paho: qualquer outro uso de random (ex.: gerar o client_id) ou um seed que
+# chegasse atrasado desalinhava os canos. Aqui cada partida tem sua própria
+# sequência, calculada por um gerador baseado em contador (splitmix64): a altura do
+# cano N depende só de (seed, N), então qualquer cliente pula direto para o cano N
+# ao entrar atrasado, sem repetir todos os spawns desde o início.
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+BATCH_SIZE = 64  # alturas calculadas de uma vez, sob demanda
+
+
+def splitmix64(x):
+    x = (x + GOLDEN_GAMMA) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+class PipeSchedule:
+    def __init__(self, seed, min_y, max_y, batch_size=BATCH_SIZE):
+        self.seed = seed
+        self.min_y = min_y
+        self.span = max_y - min_y + 1
+        self.batch_size = batch_size
+        # chave do contador: mistura o seed para partidas com seeds vizinhos não se parecerem
+        self._key = splitmix64(seed & MASK64)
+        self._batches = {}
+
+    def height(self, index):
+        return self.min_y + splitmix64((self._key + index) & MASK64) % self.span
+
+    def _batch(self, batch_index):
+        batch = self._batches.get(batch_index)
+        if batch is None:
+            start = batch_index * self.batch_size
+            batch = [self.height(index) for index in range(start, start + self.batch_size)]
+            self._batches[batch_index] = batch
+        return batch
+
+    def __getitem__(self, index):
+        # altura do cano de número 'index' (0 = primeiro cano da partida)
+        batch_index, position = divmod(index, self.batch_size)
+        return self._batch(batch_index)[position]
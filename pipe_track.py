@@ -0,0 +1,100 @@
+from collections import deque
+
+
+# Pista única de canos compartilhada pelos dois pássaros.
+# Os canos ficam numa deque ordenada por x (entram sempre pela direita), então
+# os que saem da tela são sempre os da frente: expiração O(1) com popleft().
+# Em vez de mover cada cano a cada frame, a pista guarda um deslocamento global
+# (offset): o x na tela de um cano é world_x - offset.
+class PipeTrack:
+    def __init__(self, pipe_width):
+        self.pipe_width = pipe_width
+        self.pipes = deque()
+        self.offset = 0
+        # índice de spawn do próximo cano adicionado (ids estáveis e crescentes)
+        self.spawned = 0
+        # por pássaro: índice de spawn do próximo cano que ele ainda não passou
+        self._next_to_pass = {}
+
+    def reset(self):
+        self.pipes.clear()
+        self.offset = 0
+        self.spawned = 0
+        self._next_to_pass.clear()
+
+    def clear(self):
+        # remove só os canos; offset, ids e cursores continuam valendo
+        self.pipes.clear()
+
+    def add(self, pipe):
+        # pipe.world_x chega como a posição na tela no momento do spawn
+        # e é convertido para a coordenada da pista
+        pipe.world_x += self.offset
+        pipe.index = self.spawned
+        pipe.track = self
+        self.spawned += 1
+        self.pipes.append(pipe)
+        return pipe
+
+    def advance(self, dx):
+        self.offset += dx
+        pipes = self.pipes
+        limit = self.offset - self.pipe_width
+        # remove da frente os canos que já saíram totalmente da tela (x + largura <= 0)
+        while pipes and pipes[0].world_x <= limit:
+            pipes.popleft()
+
+    def first_reaching(self, world_x):
+        # Índice do primeiro cano que ainda alcança world_x (world_x do cano + largura >
+        # world_x), por busca binária: os canos estão em ordem de x na pista.
+        pipes = self.pipes
+        limit = world_x - self.pipe_width
+        lo, hi = 0, len(pipes)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if pipes[mid].world_x <= limit:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def screen_x(self, pipe):
+        return pipe.world_x - self.offset
+
+    def count_passed(self, key, bird_x):
+        # Conta (e consome) os canos que o pássaro 'key' passou desde a última chamada.
+        # Substitui a flag 'passed' por cano, que exigia uma lista de canos por pássaro.
+        next_index = self._next_to_pass.get(key, 0)
+        pipes = self.pipes
+        if not pipes:
+            return 0
+        first = pipes[0].index
+        # canos que expiraram sem serem contados não pontuam mais
+        position = max(next_index - first, 0)
+        passed = 0
+        while position < len(pipes) and bird_x > pipes[position].world_x - self.offset + self.pipe_width:
+            position += 1
+            passed += 1
+        self._next_to_pass[key] = first + position
+        return passed
+
+    def skip_passed(self, key, bird_x):
+        # Marca como passados, sem pontuar, os canos que já estão atrás do pássaro.
+        self.count_passed(key, bird_x)
+
+    def save_state(self):
+        # Canos não mudam depois de criados, então basta guardar as referências.
+        return (self.offset, self.spawned, tuple(self.pipes), dict(self._next_to_pass))
+
+    def load_state(self, state):
+        offset, spawned, pipes, next_to_pass = state
+        self.offset = offset
+        self.spawned = spawned
+        self.pipes = deque(pipes)
+        self._next_to_pass = dict(next_to_pass)
+
+    def __iter__(self):
+        return iter(self.pipes)
+
+    def __len__(self):
+        return len(self.pipes)
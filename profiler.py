@@ -0,0 +1,208 @@
+import cProfile
+import csv
+import heapq
+import io
+import json
+import pstats
+import time
+from collections import deque
+
+# Perfil do loop principal, por fase do frame.
+# O loop chama begin_frame(), depois mark('<fase>') ao fim de cada fase (o tempo
+# desde a marca anterior vai para a fase; marcar a mesma fase de novo no mesmo
+# frame soma) e end_frame(). Guarda, por fase, histograma e estatísticas; os
+# piores frames com o detalhe das fases; contadores por frame (ex.: chamadas de
+# font.render); e o histórico recente frame a frame. dump() grava CSV (um frame
+# por linha) ou JSON (resumo), pela extensão do arquivo.
+#
+# capture(n) liga o cProfile nos próximos n frames e grava o resultado em .prof.
+
+# limites superiores dos baldes do histograma, em ms (o último é "acima de 66 ms")
+HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3, 66.7, float('inf'))
+WORST_FRAMES = 20
+FRAME_HISTORY = 36000   # ~10 min a 60 FPS
+CAPTURE_FRAMES = 120
+
+
+class PhaseStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * len(HISTOGRAM_BUCKETS)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        for index, limit in enumerate(HISTOGRAM_BUCKETS):
+            if ms <= limit:
+                self.histogram[index] += 1
+                break
+
+    def summary(self):
+        return {
+            "frames": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "max_ms": self.max,
+            "histogram": {('>66.7' if limit == float('inf') else f'<={limit}'): count
+                          for limit, count in zip(HISTOGRAM_BUCKETS, self.histogram)},
+        }
+
+
+class CountingFont:
+    # Fonte do pygame que conta as chamadas de render (o atributo do pygame.font.Font
+    # é só leitura, então a fonte é embrulhada em vez de trocar o método).
+    def __init__(self, font, profiler, name='font.render'):
+        self._font = font
+        self._profiler = profiler
+        self._name = name
+
+    def render(self, *args, **kwargs):
+        self._profiler.count(self._name)
+        return self._font.render(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self._font, attr)
+
+
+class FrameProfiler:
+    def __init__(self, enabled=True, clock=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.phases = {}
+        self.frame_stats = PhaseStats()
+        self.counter_totals = {}
+        self.worst = []              # heap (duração, frame, detalhe)
+        self.history = deque(maxlen=FRAME_HISTORY)
+        self.phase_names = []        # ordem de aparição, para as colunas do CSV
+        self.counter_names = []
+        self.frame = 0
+        self._frame_start = None
+        self._last_mark = None
+        self._current = {}
+        self._counts = {}
+        # captura do cProfile
+        self._capture_profile = None
+        self._capture_left = 0
+        self.capture_path = None
+        # top 15 do último cProfile, em texto, para o log
+        self.last_capture_report = None
+
+    # --- fases ---
+
+    def begin_frame(self):
+        if self._capture_left and self._capture_profile is None:
+            self._capture_profile = cProfile.Profile()
+            self._capture_profile.enable()
+        if not self.enabled:
+            return
+        now = self.clock()
+        self._frame_start = self._last_mark = now
+        self._current = {}
+        self._counts = {}
+
+    def mark(self, phase):
+        if not self.enabled or self._last_mark is None:
+            return
+        now = self.clock()
+        self._current[phase] = self._current.get(phase, 0.0) + (now - self._last_mark) * 1000
+        self._last_mark = now
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def end_frame(self):
+        if self._capture_profile is not None:
+            self._capture_left -= 1
+            if self._capture_left <= 0:
+                self._finish_capture()
+        if not self.enabled or self._frame_start is None:
+            return
+        total = (self.clock() - self._frame_start) * 1000
+        self.frame += 1
+        self.frame_stats.add(total)
+        for phase, ms in self._current.items():
+            stats = self.phases.get(phase)
+            if stats is None:
+                stats = self.phases[phase] = PhaseStats()
+                self.phase_names.append(phase)
+            stats.add(ms)
+        for name, amount in self._counts.items():
+            if name not in self.counter_totals:
+                self.counter_names.append(name)
+            self.counter_totals[name] = self.counter_totals.get(name, 0) + amount
+        self.history.append((self.frame, total, self._current, self._counts))
+        entry = (total, self.frame, {"phases": self._current, "counts": self._counts})
+        if len(self.worst) < WORST_FRAMES:
+            heapq.heappush(self.worst, entry)
+        elif total > self.worst[0][0]:
+            heapq.heapreplace(self.worst, entry)
+        self._frame_start = None
+
+    # --- contadores de chamadas ---
+
+    def count_calls(self, owner, attr, name=None):
+        # Troca owner.attr (função de uma classe ou módulo Python) por uma versão que conta as chamadas.
+        function = getattr(owner, attr)
+        name = name or f'{getattr(owner, "__name__", owner)}.{attr}'
+        profiler = self
+
+        def counted(*args, **kwargs):
+            profiler.count(name)
+            return function(*args, **kwargs)
+
+        setattr(owner, attr, counted)
+        return function
+
+    def wrap_font(self, font, name='font.render'):
+        return CountingFont(font, self, name) if self.enabled else font
+
+    # --- cProfile ---
+
+    def capture(self, frames=CAPTURE_FRAMES, path=None):
+        # Liga o cProfile no começo do próximo frame, por 'frames' frames.
+        if self._capture_left:
+            return False
+        self._capture_left = frames
+        self.capture_path = path or f'profile-{time.strftime("%Y%m%d-%H%M%S")}.prof'
+        return True
+
+    def _finish_capture(self):
+        profile = self._capture_profile
+        profile.disable()
+        self._capture_profile = None
+        self._capture_left = 0
+        profile.dump_stats(self.capture_path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(15)
+        self.last_capture_report = out.getvalue()
+
+    # --- resultados ---
+
+    def summary(self):
+        return {
+            "frames": self.frame,
+            "frame": self.frame_stats.summary(),
+            "phases": {name: self.phases[name].summary() for name in self.phase_names},
+            "counters": {name: {"total": total, "per_frame": total / self.frame if self.frame else 0.0}
+                         for name, total in self.counter_totals.items()},
+            "worst_frames": [{"frame": frame, "ms": total, **detail}
+                             for total, frame, detail in sorted(self.worst, reverse=True)],
+        }
+
+    def dump(self, path):
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['frame', 'total_ms'] + [f'{name}_ms' for name in self.phase_names] + self.counter_names)
+                for frame, total, phases, counts in self.history:
+                    writer.writerow([frame, f'{total:.3f}'] +
+                                    [f'{phases.get(name, 0.0):.3f}' for name in self.phase_names] +
+                                    [counts.get(name, 0) for name in self.counter_names])
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.summary(), f, indent=2)
+        return path
@@ -0,0 +1,197 @@
+import argparse
+import os
+import time
+
+import gamelog
+import topics
+import transport
+import wire
+from inbox import Inbox
+from simulation import project
+
+# Relay de espectadores.
+# Sem ele, cada espectador assina o tópico dos jogadores e recebe tudo: os estados
+# de cada jogador, seeds e game over. Com muitos espectadores, o tópico dos
+# jogadores é copiado para todos eles. O relay é o único assinante desse tópico. Ele
+# junta os dois jogadores num quadro agregado (wire.encode_frame, 34 bytes) e
+# publica no tópico de espectadores a uma taxa menor. Um quadro retido (keyframe)
+# faz o espectador que entra atrasado desenhar a partida atual na hora.
+#
+# Atende o tópico único e todas as partidas com FLAPPY_MATCH (modos 'state' e
+# 'server'; no lockstep os jogadores só mandam pulos e não há estado para agregar).
+#
+# Uso: python relay.py --broker localhost --rate 10
+# Espectadores: FLAPPY_RELAY=1 (com o mesmo FLAPPY_MATCH da partida, se houver).
+
+FRAME_RATE = 10           # quadros por segundo para os espectadores
+KEYFRAME_INTERVAL = 1.0   # s entre quadros retidos, se algo mudou
+MATCH_IDLE_SECONDS = 60   # partida sem mensagens por esse tempo sai do relay
+
+log = gamelog.get_logger('relay')
+
+
+class MatchView:
+    # O que o relay sabe de uma partida, montado a partir das mensagens dos jogadores.
+    def __init__(self, match_id, now):
+        self.match_id = match_id
+        self.topic = topics.spectate_topic(match_id)
+        self.seed = None
+        self.game_state = 'start_screen'
+        self.tick = 0
+        self.birds = {'red': None, 'blue': None}
+        self.last_message = now
+        # mudou desde o último quadro / desde o último keyframe
+        self.changed = False
+        self.keyframe_stale = False
+        self.last_keyframe = now
+
+    def apply(self, data, now):
+        self.last_message = now
+        if "seed" in data:
+            # partida nova: estados da anterior não valem mais
+            self.seed = data["seed"]
+            self.game_state = 'playing'
+            self.tick = 0
+            self.birds = {'red': None, 'blue': None}
+            self.last_keyframe = -KEYFRAME_INTERVAL  # keyframe no próximo quadro
+        color = data.get("color")
+        if color in self.birds:
+            self.birds[color] = data
+            self.tick = data.get("tick", self.tick)
+            if self.game_state == 'start_screen' and data.get("game_state") == 'playing':
+                self.game_state = 'playing'
+        if data.get("game_state") == 'game_over' and self.game_state != 'game_over':
+            self.game_state = 'game_over'
+            self.last_keyframe = -KEYFRAME_INTERVAL
+        self.changed = True
+        self.keyframe_stale = True
+
+    def frame(self):
+        return wire.encode_frame({
+            "tick": self.tick,
+            "seed": self.seed,
+            "game_state": self.game_state,
+            "birds": [self.bird_at_tick(self.birds['red']), self.bird_at_tick(self.birds['blue'])]
+        })
+
+    def bird_at_tick(self, bird):
+        # Os jogadores só mandam estado em eventos e keyframes (ver state_sender.py), então
+        # o estado de um pássaro pode ser de um tick bem anterior ao do quadro: com a
+        # velocidade, ele é projetado para o tick do quadro.
+        if bird is None or bird.get("velocity") is None or not bird.get("alive"):
+            return bird
+        ticks = self.tick - bird.get("tick", self.tick)
+        if ticks <= 0:
+            return bird
+        y, velocity = project(bird["y"], bird["velocity"], ticks)
+        return dict(bird, y=y, velocity=velocity)
+
+
+class SpectatorRelay:
+    def __init__(self, link, frame_rate=FRAME_RATE, keyframe_interval=KEYFRAME_INTERVAL, clock=time.monotonic):
+        self.link = link
+        self.frame_interval = 1.0 / frame_rate
+        self.keyframe_interval = keyframe_interval
+        self.clock = clock
+        self.views = {}
+        # estados coalescidos por (partida, cor); seed e game over em ordem
+        self.inbox = Inbox(65536)
+        self.frames = 0
+        self.keyframes = 0
+        link.on_message = self._on_message
+        link.subscribe(topics.LEGACY_TOPIC)
+        for channel in (topics.GAME, topics.STATE, topics.CONTROL):
+            link.subscribe(topics.all_matches(channel))
+
+    def _on_message(self, msg):
+        if msg.topic == topics.LEGACY_TOPIC:
+            match_id = None
+        else:
+            parsed = topics.parse(msg.topic)
+            if parsed is None:
+                return
+            match_id = parsed[0]
+        if not msg.payload:
+            return
+        try:
+            data = wire.decode(msg.payload)
+        except (ValueError, UnicodeDecodeError) as e:
+            gamelog.sampled(log, 'relay.bad_message', "mensagem inválida em %s: %s", msg.topic, e)
+            return
+        color = data.get("color")
+        if color in ('red', 'blue'):
+            self.inbox.put_state((match_id, color), data)
+        elif "seed" in data or "game_state" in data:
+            self.inbox.put_event((match_id, data))
+
+    def _view(self, match_id, now):
+        view = self.views.get(match_id)
+        if view is None:
+            view = self.views[match_id] = MatchView(match_id, now)
+            log.debug("relay: partida %s", match_id or '(tópico único)')
+        return view
+
+    def step(self):
+        # Um quadro de espectador: aplica o que chegou e publica as partidas que mudaram.
+        now = self.clock()
+        # eventos antes dos estados: um seed zera os estados da partida anterior
+        for match_id, data in self.inbox.drain_events():
+            self._view(match_id, now).apply(data, now)
+        for (match_id, _), data in self.inbox.drain_states().items():
+            self._view(match_id, now).apply(data, now)
+
+        publish = self.link.publish
+        for match_id, view in list(self.views.items()):
+            if now - view.last_message > MATCH_IDLE_SECONDS:
+                del self.views[match_id]
+                # apaga o keyframe retido
+                publish(view.topic, b'', retain=True)
+                continue
+            keyframe = view.keyframe_stale and now - view.last_keyframe >= self.keyframe_interval
+            if not (view.changed or keyframe):
+                continue
+            # o keyframe é o próprio quadro, só que retido
+            publish(view.topic, view.frame(), retain=keyframe)
+            view.changed = False
+            self.frames += 1
+            if keyframe:
+                view.keyframe_stale = False
+                view.last_keyframe = now
+                self.keyframes += 1
+
+    def run(self, running=lambda: True):
+        next_frame = self.clock()
+        while running():
+            self.link.poll()
+            self.step()
+            next_frame += self.frame_interval
+            delay = next_frame - self.clock()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # atrasado: não tenta recuperar quadros perdidos
+                next_frame = self.clock()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay de espectadores do Flappy Bird")
+    parser.add_argument("--broker", default=os.environ.get("FLAPPY_BROKER", "localhost"))
+    parser.add_argument("--port", type=int, default=transport.DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=FRAME_RATE, help="quadros por segundo")
+    parser.add_argument("--keyframe", type=float, default=KEYFRAME_INTERVAL, help="s entre keyframes retidos")
+    args = parser.parse_args()
+
+    gamelog.setup('relay')
+    link = transport.create('flappy-relay', args.broker, args.port)
+    relay = SpectatorRelay(link, args.rate, args.keyframe)
+    link.connect()
+    try:
+        relay.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        link.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import pygame
+from collections import OrderedDict
+
+
+# Cache compartilhado das imagens dos canos.
+# A altura do cano de cima (y_top_end) define as duas superfícies (cima e baixo),
+# então escalamos/viramos a imagem uma única vez por altura em vez de a cada Pipe criado.
+class PipeSpriteCache:
+    def __init__(self, pipe_img, pipe_width, screen_height, pipe_gap, max_size=64):
+        self.pipe_img = pipe_img
+        self.pipe_width = pipe_width
+        self.screen_height = screen_height
+        self.pipe_gap = pipe_gap
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+
+    def get(self, y_top_end):
+        sprites = self._sprites.get(y_top_end)
+        if sprites is not None:
+            # marca como usado recentemente (LRU)
+            self._sprites.move_to_end(y_top_end)
+            self.hits += 1
+            return sprites
+
+        self.misses += 1
+        image_top = pygame.transform.scale(self.pipe_img, (self.pipe_width, y_top_end))
+        bottom_height = self.screen_height - (y_top_end + self.pipe_gap)
+        bottom_pipe = pygame.transform.scale(self.pipe_img, (self.pipe_width, bottom_height))
+        image_bottom = pygame.transform.flip(bottom_pipe, False, True)
+        sprites = (image_top, image_bottom)
+
+        self._sprites[y_top_end] = sprites
+        if len(self._sprites) > self.max_size:
+            # descarta a altura usada há mais tempo
+            self._sprites.popitem(last=False)
+        return sprites
+
+    def clear(self):
+        self._sprites.clear()
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def stats(self):
+        return {"size": len(self._sprites), "hits": self.hits, "misses": self.misses}
+
+
+# Cache das superfícies de texto já renderizadas.
+# font.render é o passo mais caro das telas de menu; como os textos são quase sempre
+# os mesmos, guardamos a superfície por (fonte, texto, cor) e os retângulos
+# centralizados por posição, com descarte LRU para não crescer sem limite.
+class TextCache:
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def _entry(self, font, text, color):
+        key = (font, text, color)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        # entrada = [superfície, {centro: retângulo centralizado}]
+        entry = [font.render(text, True, color), {}]
+        self._entries[key] = entry
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def render(self, font, text, color):
+        return self._entry(font, text, color)[0]
+
+    def centered(self, font, text, color, center):
+        surface, rects = self._entry(font, text, color)
+        rect = rects.get(center)
+        if rect is None:
+            rect = rects[center] = surface.get_rect(center=center)
+        return surface, rect
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Texto do HUD que depende de um valor (ex.: pontuação).
+# Só renderiza de novo quando o valor muda.
+class HudText:
+    def __init__(self, font, template, color):
+        self.font = font
+        self.template = template
+        self.color = color
+        self._value = None
+        self._surface = None
+
+    def surface(self, value):
+        if self._surface is None or value != self._value:
+            self._value = value
+            self._surface = self.font.render(self.template.format(value), True, self.color)
+        return self._surface
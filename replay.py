@@ -0,0 +1,591 @@
+import argparse
+import bisect
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+
+from simulation import World, Bird, BIRD_X, HEIGHT, project
+from timestep import TICK_RATE
+
+# Replays das partidas: log binário, só de acréscimos, com o seed e as entradas de
+# cada tick, em vez de estados. A simulação é determinística (simulation.World), então
+# seed + pulos reproduzem a partida inteira; pássaros que não são simulados por quem
+# grava (o oponente no modo 'state') entram como ajustes de y/velocidade/pontos/vida.
+# O y do oponente muda quase todo tick, então entre dois ajustes ele segue a física do
+# simulation.Bird a partir do último (follow), e um ajuste novo só é gravado quando a
+# previsão erra mais de Y_TOLERANCE ou os pontos/vida mudam: na prática, nos pulos. O
+# replay guarda o y previsto, não o mostrado na partida (no máximo Y_TOLERANCE de
+# diferença), e os checksums são dele.
+#
+# A cada CHECKSUM_INTERVAL ticks vai um checksum do mundo, para achar o tick exato em
+# que um replay diverge da partida (resultados contestados), e a cada
+# KEYFRAME_INTERVAL ticks um keyframe com os pássaros: a pista sai de
+# World.fast_forward, então o seek é carregar o keyframe e simular no máximo
+# KEYFRAME_INTERVAL ticks.
+#
+# Arquivo: cabeçalho e registros (1 byte de tipo + layout fixo), todos com o tick.
+# Ao fechar, um índice dos keyframes e um trailer no fim do arquivo: a leitura (mmap)
+# abre na hora, sem percorrer o arquivo. Um arquivo sem trailer (jogo que quebrou) é
+# lido mesmo assim, percorrendo os registros.
+#
+# Uso: python replay.py replays/partida.flr            janela (ESPAÇO pausa, setas: seek
+#                                                        de 10 s e velocidade, F acelera ao máximo)
+#      python replay.py replays/partida.flr --verify   sem janela: confere os checksums
+#      python replay.py replays/partida.flr --publish abc --broker localhost
+#           publica os quadros para espectadores (FLAPPY_RELAY=1), sem jogadores
+
+MAGIC = b'FLRP'
+VERSION = 2
+TRAILER_MAGIC = b'FLRX'
+EXTENSION = '.flr'
+
+KEYFRAME_INTERVAL = 10 * TICK_RATE
+CHECKSUM_INTERVAL = TICK_RATE
+SEEK_STEP = 10 * TICK_RATE        # ticks por seta no visualizador
+MAX_SPEED = 64
+TURBO_FRAME_BUDGET = 0.012        # s de simulação por frame no modo acelerado
+Y_TOLERANCE = 1.0                 # px de erro da previsão do y de um pássaro não simulado
+
+# cabeçalho: marcador, versão, pássaros, flags, máscara dos pássaros simulados, ticks/s, seed
+HEADER = struct.Struct('<4sBBBBHI')
+FLAG_JUDGE_COLLISIONS = 0x01
+
+REC_SEED = 1       # antes do tick: troca o seed (seed que chegou atrasado)
+REC_INPUT = 2      # no tick: máscara dos pássaros que pularam
+REC_BIRD = 3       # depois do tick: y, velocidade, pontos e vida de um pássaro (ver follow)
+REC_CHECKSUM = 4   # depois do tick: crc32 do estado do mundo
+REC_KEYFRAME = 5   # depois do tick: seed, game over e os pássaros
+REC_END = 6        # fim da partida: último tick, game over e pontuações
+REC_INDEX = 7      # índice dos keyframes (só ao fechar)
+
+SEED = struct.Struct('<BiI')
+INPUT = struct.Struct('<BiB')
+BIRD = struct.Struct('<BiBddIB')
+CHECKSUM = struct.Struct('<BiI')
+INDEX = struct.Struct('<BiI')
+INDEX_ENTRY = struct.Struct('<iI')
+TRAILER = struct.Struct('<I4s')
+
+# checksum: tick, offset da pista, canos gerados, canos na pista, game over + por pássaro
+CHECKSUM_WORLD = struct.Struct('<idIIB')
+CHECKSUM_BIRD = struct.Struct('<ddIB')
+
+
+class ReplayError(ValueError):
+    pass
+
+
+def keyframe_layout(bird_count):
+    # tick, seed, game over + por pássaro: y, velocidade, pontos, vida
+    return struct.Struct('<BiIB' + 'ddIB' * bird_count)
+
+
+def end_layout(bird_count):
+    return struct.Struct('<BiB' + 'I' * bird_count)
+
+
+def follow(adjustment, tick):
+    # (y, velocidade) de um pássaro não simulado no tick, a partir do último ajuste
+    # gravado (y, velocidade, pontos, vida, tick); sem velocidade, o y fica parado
+    y, velocity, _, _, adjustment_tick = adjustment
+    if velocity is None:
+        return y, None
+    return project(y, velocity, tick - adjustment_tick)
+
+
+def replay_path(directory, name):
+    return os.path.join(directory, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}{EXTENSION}')
+
+
+def checksum(state):
+    # crc32 do estado do mundo no formato de World.save_state()
+    birds, track, _, tick, game_over = state
+    offset, spawned, pipes, _ = track
+    data = CHECKSUM_WORLD.pack(tick, offset, spawned, len(pipes), game_over)
+    for y, velocity, score, is_alive in birds:
+        data += CHECKSUM_BIRD.pack(y, velocity, score, is_alive)
+    return zlib.crc32(data)
+
+
+class ReplayWriter:
+    # Grava uma partida. Quem grava chama seed() antes do tick em que o seed muda,
+    # record() depois de cada tick e close() no fim.
+    def __init__(self, path, world, keyframe_interval=KEYFRAME_INTERVAL, checksum_interval=CHECKSUM_INTERVAL):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.checksum_interval = checksum_interval
+        self.current_seed = world.schedule.seed
+        self.bird_count = len(world.birds)
+        self.simulated = [bird.simulated for bird in world.birds]
+        self._keyframe = keyframe_layout(self.bird_count)
+        self._end = end_layout(self.bird_count)
+        self.keyframes = []
+        self.last_tick = world.tick - 1
+        self._last_state = None
+        self._file = open(path, 'wb')
+        self._position = 0
+        mask = sum(1 << index for index, simulated in enumerate(self.simulated) if simulated)
+        self._write(HEADER.pack(MAGIC, VERSION, self.bird_count,
+                                FLAG_JUDGE_COLLISIONS if world.judge_collisions else 0,
+                                mask, TICK_RATE, self.current_seed & 0xFFFFFFFF))
+        # estado inicial dos pássaros (ex.: vaga sem jogador começa morta)
+        self._birds = {}
+        # y de cada pássaro não simulado no tick anterior, para estimar a velocidade
+        self._last_y = {}
+        for index, bird in enumerate(world.birds):
+            self.bird(self.last_tick, index, bird.y, bird.score, bird.is_alive)
+
+    def _write(self, data):
+        self._file.write(data)
+        self._position += len(data)
+
+    def seed(self, tick, seed):
+        self.current_seed = seed
+        self._write(SEED.pack(REC_SEED, tick, seed & 0xFFFFFFFF))
+
+    def bird(self, tick, index, y, score, is_alive, velocity=None):
+        # Ajuste de um pássaro fora da simulação (rede, jogador que saiu).
+        self._birds[index] = (y, velocity, score, is_alive, tick)
+        self._write(BIRD.pack(REC_BIRD, tick, index, y, math.nan if velocity is None else velocity, score, is_alive))
+
+    def record(self, tick, jumps, state):
+        # Um tick simulado: pulos aplicados nele e o estado do mundo depois dele.
+        mask = 0
+        for index in jumps:
+            mask |= 1 << index
+        if mask:
+            self._write(INPUT.pack(REC_INPUT, tick, mask))
+        birds = state[0]
+        if not all(self.simulated):
+            # o replay guarda o y previsto dos pássaros não simulados (ver follow)
+            birds = list(birds)
+            for index, simulated in enumerate(self.simulated):
+                if not simulated:
+                    birds[index] = self._follow(tick, index, birds[index])
+            state = (birds,) + tuple(state[1:])
+        if (tick + 1) % self.checksum_interval == 0:
+            self._write(CHECKSUM.pack(REC_CHECKSUM, tick, checksum(state)))
+        if (tick + 1) % self.keyframe_interval == 0:
+            self.keyframes.append((tick, self._position))
+            fields = [REC_KEYFRAME, tick, self.current_seed & 0xFFFFFFFF, state[4]]
+            for y, velocity, score, is_alive in birds:
+                fields += (y, velocity, score, is_alive)
+            self._write(self._keyframe.pack(*fields))
+            # a previsão recomeça no keyframe: o seek chega nela sem ler os ajustes anteriores
+            for index, simulated in enumerate(self.simulated):
+                if not simulated:
+                    y, velocity = follow(self._birds[index], tick)
+                    self.bird(tick, index, y, birds[index][2], birds[index][3], velocity)
+            # um jogo que quebrar perde no máximo um intervalo de keyframe
+            self._file.flush()
+        self.last_tick = tick
+        self._last_state = state
+
+    def _follow(self, tick, index, bird):
+        # Estado gravado de um pássaro não simulado: o previsto, ou um ajuste novo.
+        y, velocity, score, is_alive = bird
+        adjustment = self._birds[index]
+        expected, _ = follow(adjustment, tick)
+        last_y = self._last_y.get(index)
+        self._last_y[index] = y
+        if (score, is_alive) == adjustment[2:4] and abs(y - expected) <= Y_TOLERANCE:
+            return expected, velocity, score, is_alive
+        # velocidade pelo último tick; parado (morto, sem estados) fica sem
+        moved = None if last_y is None or last_y == y or not is_alive else y - last_y
+        self.bird(tick, index, y, score, is_alive, moved)
+        return bird
+
+    def close(self):
+        if self._file is None:
+            return
+        state = self._last_state
+        game_over = state[4] if state else False
+        scores = [bird[2] for bird in state[0]] if state else [0] * self.bird_count
+        self._write(self._end.pack(REC_END, self.last_tick, game_over, *scores))
+        index_offset = self._position
+        self._write(INDEX.pack(REC_INDEX, self.last_tick, len(self.keyframes)))
+        for tick, offset in self.keyframes:
+            self._write(INDEX_ENTRY.pack(tick, offset))
+        self._write(TRAILER.pack(index_offset, TRAILER_MAGIC))
+        self._file.close()
+        self._file = None
+
+
+class Replay:
+    # Arquivo de replay aberto por mmap: o sistema só lê as páginas que forem usadas.
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ReplayError(f"replay vazio: {path}")
+        data = self._map
+        if len(data) < HEADER.size:
+            self.close()
+            raise ReplayError(f"replay truncado: {path}")
+        magic, version, self.bird_count, flags, self.simulated_mask, self.tick_rate, self.seed = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            self.close()
+            raise ReplayError(f"não é um replay: {path}")
+        if version != VERSION:
+            self.close()
+            raise ReplayError(f"versão de replay não suportada: {version}")
+        self.judge_collisions = bool(flags & FLAG_JUDGE_COLLISIONS)
+        self.data_offset = HEADER.size
+        self.layouts = {
+            REC_SEED: SEED,
+            REC_INPUT: INPUT,
+            REC_BIRD: BIRD,
+            REC_CHECKSUM: CHECKSUM,
+            REC_KEYFRAME: keyframe_layout(self.bird_count),
+            REC_END: end_layout(self.bird_count),
+        }
+        self.end = None   # (último tick, game over, pontuações)
+        self.keyframes = []
+        if not self._read_index():
+            self._scan()
+        self.keyframe_ticks = [tick for tick, _ in self.keyframes]
+
+    def _read_index(self):
+        data = self._map
+        if len(data) < self.data_offset + TRAILER.size:
+            return False
+        index_offset, magic = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        if magic != TRAILER_MAGIC:
+            return False
+        kind, _, count = INDEX.unpack_from(data, index_offset)
+        if kind != REC_INDEX:
+            return False
+        position = index_offset + INDEX.size
+        for _ in range(count):
+            self.keyframes.append(INDEX_ENTRY.unpack_from(data, position))
+            position += INDEX_ENTRY.size
+        # o END vem logo antes do índice
+        end = self.layouts[REC_END]
+        values = end.unpack_from(data, index_offset - end.size)
+        self.end = (values[1], bool(values[2]), list(values[3:]))
+        return True
+
+    def _scan(self):
+        # Sem índice (o jogo não fechou o arquivo): percorre os registros.
+        last_tick = None
+        for offset, values in self.records():
+            kind = values[0]
+            last_tick = values[1]
+            if kind == REC_KEYFRAME:
+                self.keyframes.append((values[1], offset))
+            elif kind == REC_END:
+                self.end = (values[1], bool(values[2]), list(values[3:]))
+        if self.end is None and last_tick is not None:
+            self.end = (last_tick, False, None)
+
+    def records(self, offset=None):
+        # (offset, valores) de cada registro a partir de 'offset'; para no índice ou
+        # num registro cortado no meio
+        data = self._map
+        size = len(data)
+        layouts = self.layouts
+        position = self.data_offset if offset is None else offset
+        while position < size:
+            layout = layouts.get(data[position])
+            if layout is None or position + layout.size > size:
+                return
+            yield position, layout.unpack_from(data, position)
+            position += layout.size
+
+    def keyframe_before(self, tick):
+        # último keyframe cujo estado é de antes de 'tick' (keyframe do tick k = depois de k)
+        position = bisect.bisect_left(self.keyframe_ticks, tick) - 1
+        return self.keyframes[position] if position >= 0 else None
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ReplayPlayer:
+    # Reproduz um replay num World: step() avança um tick, seek() pula para um tick.
+    def __init__(self, replay, birds=None, pipe_factory=None):
+        self.replay = replay
+        if birds is None:
+            birds = [Bird(BIRD_X, HEIGHT // 2) for _ in range(replay.bird_count)]
+        for index, bird in enumerate(birds):
+            bird.simulated = bool(replay.simulated_mask >> index & 1)
+        kwargs = {} if pipe_factory is None else {"pipe_factory": pipe_factory}
+        self.world = World(birds=birds, seed=replay.seed, judge_collisions=replay.judge_collisions, **kwargs)
+        # ticks cujo checksum não bateu com o gravado
+        self.mismatches = []
+        self.restart()
+
+    def restart(self):
+        world = self.world
+        world.reset(self.replay.seed)
+        self._fixed = [(bird.y, None, bird.score, bird.is_alive, -1) for bird in world.birds]
+        self._open(None)
+
+    def _open(self, offset):
+        self._records = self.replay.records(offset)
+        self._pending = next(self._records, None)
+        self.finished = self._pending is None
+
+    def _next(self):
+        self._pending = next(self._records, None)
+
+    def _apply_bird(self, values):
+        _, tick, index, y, velocity, score, is_alive = values
+        bird = self.world.birds[index]
+        bird.y, bird.score, bird.is_alive = y, score, bool(is_alive)
+        self._fixed[index] = (y, None if math.isnan(velocity) else velocity, score, bool(is_alive), tick)
+
+    def step(self):
+        if self.finished:
+            return []
+        world = self.world
+        tick = world.tick
+        jumps = []
+        # antes do tick: registros atrasados (keyframe já aplicado, estado inicial), seed e pulos
+        while self._pending is not None:
+            values = self._pending[1]
+            kind, record_tick = values[0], values[1]
+            if record_tick > tick or (record_tick == tick and kind not in (REC_SEED, REC_INPUT)):
+                break
+            if kind == REC_SEED:
+                world.set_seed(values[2])
+            elif kind == REC_INPUT:
+                mask = values[2]
+                jumps = [index for index in range(len(world.birds)) if mask >> index & 1]
+            elif kind == REC_BIRD:
+                self._apply_bird(values)
+            elif kind == REC_END:
+                self.finished = True
+                return []
+            self._next()
+
+        events = world.step(jumps)
+
+        # pássaros fora da simulação seguem o último ajuste gravado
+        for bird, fixed in zip(world.birds, self._fixed):
+            if not bird.simulated:
+                bird.y, _ = follow(fixed, tick)
+                bird.score, bird.is_alive = fixed[2], fixed[3]
+        while self._pending is not None:
+            values = self._pending[1]
+            kind = values[0]
+            if values[1] != tick:
+                break
+            if kind == REC_BIRD:
+                self._apply_bird(values)
+            elif kind == REC_CHECKSUM:
+                if checksum(world.save_state()) != values[2]:
+                    self.mismatches.append(tick)
+            elif kind == REC_END:
+                self.finished = True
+            self._next()
+        if self._pending is None:
+            self.finished = True
+        return events
+
+    def seek(self, tick):
+        # Vai para o começo do tick 'tick': carrega o keyframe anterior mais próximo
+        # e simula o resto (no máximo um intervalo de keyframe).
+        world = self.world
+        keyframe = self.replay.keyframe_before(tick)
+        keyframe_tick = keyframe[0] if keyframe else -1
+        if not (keyframe_tick < world.tick <= tick):
+            if keyframe is None:
+                self.restart()
+            else:
+                self._load_keyframe(keyframe[1])
+        while world.tick < tick and not self.finished:
+            self.step()
+
+    def _load_keyframe(self, offset):
+        layout = self.replay.layouts[REC_KEYFRAME]
+        values = layout.unpack_from(self.replay._map, offset)
+        _, tick, seed, game_over = values[:4]
+        world = self.world
+        world.reset(seed)
+        # a pista sai do seed e do tick (os canos já passados não pontuam de novo)
+        world.fast_forward(tick + 1)
+        world.game_over = bool(game_over)
+        self._fixed = []
+        for index, bird in enumerate(world.birds):
+            y, velocity, score, is_alive = values[4 + 4 * index:8 + 4 * index]
+            bird.y, bird.velocity, bird.score, bird.is_alive = y, velocity, score, bool(is_alive)
+            # o ajuste gravado logo depois do keyframe traz a velocidade da previsão
+            self._fixed.append((y, None, score, bool(is_alive), tick))
+        self._open(offset + layout.size)
+
+
+def verify(path):
+    replay = Replay(path)
+    player = ReplayPlayer(replay)
+    started = time.perf_counter()
+    while not player.finished:
+        player.step()
+    elapsed = time.perf_counter() - started
+    world = player.world
+    scores = [bird.score for bird in world.birds]
+    print(f"{path}: {world.tick} ticks em {elapsed:.3f} s ({world.tick / max(elapsed, 1e-9):.0f} ticks/s), "
+          f"{len(replay.keyframes)} keyframes, pontos {scores}")
+    ok = not player.mismatches
+    if player.mismatches:
+        print(f"checksum diverge a partir do tick {player.mismatches[0]} ({len(player.mismatches)} checksums)")
+    if replay.end is not None and replay.end[2] is not None and replay.end[2] != scores:
+        print(f"pontuação gravada {replay.end[2]} != reproduzida {scores}")
+        ok = False
+    replay.close()
+    return ok
+
+
+def publish(path, match_id, broker, port, frame_rate):
+    # Alimenta espectadores do relay (FLAPPY_RELAY=1) com a partida gravada, em 1x.
+    import topics
+    import transport
+    import wire
+
+    replay = Replay(path)
+    player = ReplayPlayer(replay)
+    link = transport.create(f'flappy-replay-{os.getpid()}', broker, port)
+    link.connect()
+    topic = topics.spectate_topic(match_id)
+    ticks_per_frame = max(1, round(replay.tick_rate / frame_rate))
+    colors = ('red', 'blue')
+    next_frame = time.monotonic()
+    try:
+        while not player.finished:
+            for _ in range(ticks_per_frame):
+                player.step()
+            world = player.world
+            link.publish(topic, wire.encode_frame({
+                "tick": world.tick,
+                "seed": world.schedule.seed,
+                "game_state": 'game_over' if world.game_over or player.finished else 'playing',
+                "birds": [{"color": color, "y": bird.y, "score": bird.score, "alive": bird.is_alive,
+                           "velocity": bird.velocity if bird.is_alive else None}
+                          for color, bird in zip(colors, world.birds)]
+            }), retain=True)
+            link.poll()
+            next_frame += ticks_per_frame / replay.tick_rate
+            time.sleep(max(0.0, next_frame - time.monotonic()))
+    finally:
+        link.close()
+        replay.close()
+
+
+def view(path):
+    import pygame
+    from render_cache import PipeSpriteCache
+    from simulation import WIDTH, BIRD_WIDTH, BIRD_HEIGHT, PIPE_WIDTH, PIPE_GAP
+    from sprites import Bird as SpriteBird, Pipe as SpritePipe
+    from timestep import FixedTimestep
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"Replay: {os.path.basename(path)}")
+    font = pygame.font.Font(None, 28)
+    try:
+        images = [pygame.transform.scale(pygame.image.load(name).convert_alpha(), (BIRD_WIDTH, BIRD_HEIGHT))
+                  for name in ('RedBird.png', 'Yellow_bird.png')]
+        SpritePipe.sprite_cache = PipeSpriteCache(pygame.image.load('Pipe.png').convert_alpha(), PIPE_WIDTH, HEIGHT, PIPE_GAP)
+    except (pygame.error, FileNotFoundError):
+        images = [None, None]
+    colors = ((255, 0, 0), (0, 0, 255))
+
+    replay = Replay(path)
+    birds = [SpriteBird(BIRD_X, HEIGHT // 2, images[index % 2], colors[index % 2]) for index in range(replay.bird_count)]
+    player = ReplayPlayer(replay, birds, SpritePipe)
+    world = player.world
+    end_tick = replay.end[0] + 1 if replay.end else None
+    timestep = FixedTimestep()
+    clock = pygame.time.Clock()
+    speed, paused, turbo = 1, False, False
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                replay.close()
+                pygame.quit()
+                return
+            if event.type != pygame.KEYDOWN:
+                continue
+            if event.key == pygame.K_SPACE:
+                paused = not paused
+            elif event.key == pygame.K_RIGHT:
+                player.seek(world.tick + SEEK_STEP)
+            elif event.key == pygame.K_LEFT:
+                player.seek(max(0, world.tick - SEEK_STEP))
+            elif event.key == pygame.K_HOME:
+                player.seek(0)
+            elif event.key == pygame.K_UP:
+                speed = min(speed * 2, MAX_SPEED)
+            elif event.key == pygame.K_DOWN:
+                speed = max(speed // 2, 1)
+            elif event.key == pygame.K_f:
+                turbo = not turbo
+
+        ticks = timestep.advance()
+        if not paused:
+            if turbo:
+                # sem desenhar entre ticks: simula o que couber no orçamento do frame
+                deadline = time.perf_counter() + TURBO_FRAME_BUDGET
+                while not player.finished and time.perf_counter() < deadline:
+                    player.step()
+            else:
+                for _ in range(ticks * speed):
+                    player.step()
+
+        screen.fill((135, 206, 235))
+        for pipe in world.track:
+            pipe.draw(screen)
+        for bird in world.birds:
+            bird.draw(screen)
+        seconds = world.tick / replay.tick_rate
+        status = 'pausado' if paused else ('máx' if turbo else f'{speed}x')
+        total = f' / {end_tick / replay.tick_rate:.1f} s' if end_tick else ''
+        hud = [f"tick {world.tick}  {seconds:.1f} s{total}  [{status}]",
+               "  ".join(f"P{index + 1}: {bird.score}" for index, bird in enumerate(world.birds))]
+        if player.finished:
+            hud.append("fim do replay")
+        if player.mismatches:
+            hud.append(f"checksum diverge no tick {player.mismatches[0]}")
+        for line, text in enumerate(hud):
+            screen.blit(font.render(text, True, (0, 0, 0)), (10, 10 + 26 * line))
+        pygame.display.flip()
+        clock.tick(60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays do Flappy Bird")
+    parser.add_argument("path")
+    parser.add_argument("--verify", action="store_true", help="sem janela: reproduz tudo e confere os checksums")
+    parser.add_argument("--publish", metavar="PARTIDA", nargs="?", const="",
+                        help="publica os quadros para espectadores (sem id: tópico único)")
+    parser.add_argument("--broker", default=os.environ.get("FLAPPY_BROKER", "localhost"))
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--rate", type=float, default=10, help="quadros por segundo no --publish")
+    args = parser.parse_args()
+
+    try:
+        if args.verify:
+            sys.exit(0 if verify(args.path) else 1)
+        elif args.publish is not None:
+            publish(args.path, args.publish or None, args.broker, args.port, args.rate)
+        else:
+            view(args.path)
+    except (OSError, ReplayError) as e:
+        print(f"replay: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
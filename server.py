@@ -0,0 +1,321 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import gamelog
+import topics
+import transport
+import wire
+from inbox import Inbox
+from netstats import now_ms
+from replay import ReplayWriter, replay_path
+from simulation import World, Bird, BIRD_X, HEIGHT, EVENT_GAME_OVER
+from timestep import FixedTimestep, TICK_RATE
+
+# Servidor de partidas sem janela, com autoridade sobre a simulação.
+# Cada processo de trabalho roda muitas partidas num único loop de passo fixo
+# (simulation.World, sem pygame); as partidas são divididas entre os processos
+# pela fatia do canal de entrada (topics.shard, crc32 do id da partida), e cada
+# processo assina só as suas fatias: o broker entrega a ele só as suas partidas.
+# Os processos vivem enquanto o servidor viver (partidas novas entram nos
+# processos que já existem).
+#
+# Protocolo, por partida (ver topics.py):
+#   flappybird/<partida>/input/<fatia>    clientes -> servidor (topics.input_topic)
+#       {"type": "join", "player_id": ..., "bird": 0|1}   entra (bird opcional)
+#       {"type": "start", "player_id": ...}               inicia/reinicia a partida
+#       {"type": "leave", "player_id": ...}
+#       {"type": "ping", "player_id": ..., "t": ...}      respondido com pong no control
+#       entrada binária (wire.encode_input)               pulo do pássaro 'bird'
+#   flappybird/<partida>/control  servidor -> clientes (JSON)
+#       {"type": "joined"|"rejected", "to": <player_id>, "bird": ...}
+#       {"seed": ..., "sync": "server", ...}   retido: quem entra depois recebe
+#       {"game_state": "game_over", "scores": [...]}   retido
+#   flappybird/<partida>/state    servidor -> clientes: estado binário de cada pássaro
+#
+# Uso: python server.py --broker localhost --workers 4 [--record replays]
+# --record grava cada partida como replay (seed + pulos, ver replay.py).
+# Sem broker de verdade, MatchServer(LoopbackNetwork().transport()) roda num
+# processo só (ver transport.py).
+
+SERVER_ID = 'server'
+COLORS = ('red', 'blue')
+
+STATE_EVERY_TICKS = 3                 # 20 estados/s por partida, como os 50 ms dos clientes
+MATCH_IDLE_TICKS = 60 * TICK_RATE     # partida parada sem mensagens por 1 min é removida
+MAX_INBOX_EVENTS = 65536              # mensagens entre dois ticks, somando todas as partidas
+STATS_INTERVAL = 10.0                 # s entre linhas de estatística no log
+
+log = gamelog.get_logger('server')
+
+
+class Match:
+    def __init__(self, match_id):
+        self.match_id = match_id
+        self.world = World(birds=[Bird(BIRD_X, HEIGHT // 2), Bird(BIRD_X, HEIGHT // 2)])
+        # player_id dono de cada pássaro (None = vaga livre)
+        self.players = [None, None]
+        self.state = 'start_screen'
+        self.jumps = []
+        self.idle_ticks = 0
+        # sequência dos estados publicados (a mesma para os dois pássaros de um tick)
+        self.seq = 0
+        self.state_topic = topics.match_topic(match_id, topics.STATE)
+        self.control_topic = topics.match_topic(match_id, topics.CONTROL)
+        self.recorder = None
+
+    def join(self, player_id, bird=None):
+        # Devolve o índice do pássaro do jogador, ou None se não houver vaga.
+        if player_id in self.players:
+            return self.players.index(player_id)
+        free = [index for index, owner in enumerate(self.players) if owner is None]
+        if bird is None and free:
+            bird = free[0]
+        if bird not in free:
+            return None
+        self.players[bird] = player_id
+        return bird
+
+    def leave(self, player_id):
+        if player_id in self.players:
+            index = self.players.index(player_id)
+            self.players[index] = None
+            # quem sai no meio da partida perde o pássaro
+            bird = self.world.birds[index]
+            bird.is_alive = False
+            if self.recorder is not None:
+                self.recorder.bird(self.world.tick - 1, index, bird.y, bird.score, bird.is_alive)
+
+    def start(self, seed, record_dir=None):
+        self.world.reset(seed)
+        for bird, owner in zip(self.world.birds, self.players):
+            # vaga sem jogador não joga
+            bird.is_alive = owner is not None
+        self.jumps = []
+        self.state = 'playing'
+        self.stop_recording()
+        if record_dir:
+            self.recorder = ReplayWriter(replay_path(record_dir, self.match_id), self.world)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            log.debug("replay da partida %s gravado em %s", self.match_id, self.recorder.path)
+            self.recorder = None
+
+    def jump(self, player_id, bird_index):
+        # só o dono pula com o próprio pássaro
+        if self.state == 'playing' and 0 <= bird_index < len(self.players) and self.players[bird_index] == player_id:
+            self.jumps.append(bird_index)
+
+    def step(self):
+        jumps = self.jumps
+        events = self.world.step(jumps)
+        self.jumps = []
+        if self.recorder is not None:
+            self.recorder.record(self.world.tick - 1, jumps, self.world.save_state())
+        if self.world.game_over:
+            self.state = 'game_over'
+            self.stop_recording()
+        return events
+
+    def state_messages(self):
+        world = self.world
+        self.seq = (self.seq + 1) & 0xFFFF
+        sent = now_ms()
+        for index, (bird, owner) in enumerate(zip(world.birds, self.players)):
+            if owner is None:
+                continue
+            yield wire.encode_state({
+                "player_id": owner,
+                "color": COLORS[index],
+                "y": bird.y,
+                "velocity": bird.velocity if bird.is_alive else None,
+                "score": bird.score,
+                "alive": bird.is_alive,
+                "game_state": self.state,
+                "tick": world.tick,
+                "seq": self.seq,
+                "sent": sent
+            })
+
+
+class MatchServer:
+    def __init__(self, link, worker_index=0, worker_count=1, seed=None, record_dir=None):
+        self.link = link
+        # pasta dos replays das partidas (None = não grava)
+        self.record_dir = record_dir
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.matches = {}
+        # a thread de rede só enfileira (partida, mensagem); o loop do servidor aplica
+        self.inbox = Inbox(MAX_INBOX_EVENTS)
+        # seeds das partidas (gerador próprio, não o random global)
+        self.rng = random.Random(seed)
+        self.ticks = 0
+        self.timestep = FixedTimestep()
+        link.on_connect = self._on_connect
+        link.on_message = self._on_message
+        for shard in range(topics.INPUT_SHARDS):
+            if shard % worker_count == worker_index:
+                link.subscribe(topics.shard_inputs(shard))
+
+    def owns(self, match_id):
+        return topics.shard(match_id) % self.worker_count == self.worker_index
+
+    def _on_connect(self, ok, reason):
+        if ok:
+            log.info("servidor %d/%d conectado", self.worker_index, self.worker_count)
+        else:
+            log.error("Falha de conexão MQTT: %s", reason)
+
+    def _on_message(self, msg):
+        parsed = topics.parse(msg.topic)
+        if parsed is None or not self.owns(parsed[0]):
+            return
+        try:
+            data = wire.decode(msg.payload)
+        except (ValueError, UnicodeDecodeError) as e:
+            gamelog.sampled(log, 'server.bad_message', "mensagem inválida em %s: %s", msg.topic, e)
+            return
+        self.inbox.put_event((parsed[0], data))
+
+    def _publish_control(self, match, message, retain=False):
+        message["player_id"] = SERVER_ID
+        message["match"] = match.match_id
+        self.link.publish(match.control_topic, json.dumps(message), retain=retain)
+
+    def _handle(self, match_id, data):
+        kind = data.get("type")
+        player_id = data.get("player_id")
+        match = self.matches.get(match_id)
+        if kind == "join":
+            if match is None:
+                match = self.matches[match_id] = Match(match_id)
+                log.debug("partida %s criada", match_id)
+            try:
+                wire.player_number(player_id)
+                bird = match.join(player_id, data.get("bird"))
+            except (AttributeError, ValueError):
+                bird = None
+            self._publish_control(match, {"type": "joined" if bird is not None else "rejected",
+                                          "to": player_id, "bird": bird})
+        if match is None:
+            return
+        match.idle_ticks = 0
+        if kind == "input":
+            match.jump(player_id, data.get("bird", -1))
+        elif kind == "start":
+            if player_id in match.players and match.state != 'playing':
+                seed_value = self.rng.randrange(100000)
+                match.start(seed_value, self.record_dir)
+                self._publish_control(match, {"seed": seed_value, "sync": "server"}, retain=True)
+        elif kind == "leave":
+            match.leave(player_id)
+        elif kind == "ping":
+            # RTT do cliente até o servidor (ver netstats.py)
+            self._publish_control(match, {"type": "pong", "to": player_id,
+                                          "ping_id": data.get("ping_id"), "t": data.get("t")})
+
+    def tick(self):
+        for match_id, data in self.inbox.drain_events():
+            self._handle(match_id, data)
+
+        publish = self.link.publish
+        for match in list(self.matches.values()):
+            if match.state != 'playing':
+                match.idle_ticks += 1
+                if match.idle_ticks > MATCH_IDLE_TICKS:
+                    del self.matches[match.match_id]
+                    match.stop_recording()
+                    # apaga a mensagem retida da partida
+                    publish(match.control_topic, b'', retain=True)
+                    log.debug("partida %s removida (parada)", match.match_id)
+                continue
+
+            events = match.step()
+            game_over = any(event[0] == EVENT_GAME_OVER for event in events)
+            if game_over or match.world.tick % STATE_EVERY_TICKS == 0:
+                for payload in match.state_messages():
+                    publish(match.state_topic, payload)
+            if game_over:
+                self._publish_control(match, {"game_state": 'game_over',
+                                              "scores": [bird.score for bird in match.world.birds]}, retain=True)
+        self.ticks += 1
+
+    def run(self, running=lambda: True):
+        # Loop de passo fixo: TICK_RATE ticks por segundo para todas as partidas.
+        timestep = self.timestep
+        last_stats = time.perf_counter()
+        busy = 0.0
+        while running():
+            self.link.poll()
+            ticks = timestep.advance()
+            started = time.perf_counter()
+            for _ in range(ticks):
+                self.tick()
+            now = time.perf_counter()
+            busy += now - started
+            if now - last_stats >= STATS_INTERVAL:
+                playing = sum(1 for match in self.matches.values() if match.state == 'playing')
+                log.info("servidor %d: %d partidas (%d em jogo), carga %.0f%%, %d ticks descartados, "
+                         "%d mensagens descartadas na caixa de entrada",
+                         self.worker_index, len(self.matches), playing,
+                         100 * busy / (now - last_stats), timestep.dropped_ticks, self.inbox.overflowed)
+                last_stats, busy = now, 0.0
+            # dorme até o próximo tick
+            time.sleep(max(0.0, timestep.dt - timestep.accumulator))
+
+
+def serve(worker_index, worker_count, broker, port, record_dir=None):
+    # Um processo de trabalho: conexão MQTT própria + loop das suas partidas.
+    gamelog.setup(f'server-{worker_index}')
+    link = transport.PahoTransport(broker, port, client_id=f'flappy-server-{os.getpid()}-{worker_index}')
+    server = MatchServer(link, worker_index, worker_count, record_dir=record_dir)
+    link.connect()
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for match in server.matches.values():
+            match.stop_recording()
+        link.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de partidas do Flappy Bird (sem janela)")
+    parser.add_argument("--broker", default=os.environ.get("FLAPPY_BROKER", "localhost"))
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="processos de trabalho (padrão: um por núcleo)")
+    parser.add_argument("--record", metavar="PASTA", help="grava cada partida como replay nesta pasta")
+    args = parser.parse_args()
+
+    if args.workers > topics.INPUT_SHARDS:
+        log.warning("só %d fatias de entrada: %d processos ficariam sem partidas",
+                    topics.INPUT_SHARDS, args.workers - topics.INPUT_SHARDS)
+        args.workers = topics.INPUT_SHARDS
+
+    if args.workers <= 1:
+        serve(0, 1, args.broker, args.port, args.record)
+        return
+
+    workers = [multiprocessing.Process(target=serve, args=(index, args.workers, args.broker, args.port, args.record),
+                                       name=f'flappy-server-{index}', daemon=True)
+               for index in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+from pipe_track import PipeTrack
+from pipe_schedule import PipeSchedule
+
+# Núcleo da simulação do jogo, sem pygame.
+# Física, geração de canos, colisão e pontuação ficam aqui, num estado de mundo
+# explícito (World) que avança com step(inputs) -> eventos. O Flappy.py só desenha
+# por cima disso (ver sprites.py), e o mesmo código roda sem janela em servidores,
+# replays e benchmarks.
+
+# --- Configurações do jogo ---
+WIDTH, HEIGHT = 1200, 700
+
+BIRD_X = 100
+BIRD_WIDTH, BIRD_HEIGHT = 45, 30
+PIPE_WIDTH = 50
+
+PIPE_GAP = 200
+GRAVITY = 0.5
+JUMP_STRENGTH = -10
+PIPE_SPEED = 3
+
+# um cano novo a cada SPAWN_INTERVAL ticks, com altura entre PIPE_MIN_Y e PIPE_MAX_Y
+SPAWN_INTERVAL = 120
+PIPE_MIN_Y = 100
+PIPE_MAX_Y = HEIGHT - PIPE_GAP - 100
+
+COLLISION_MARGIN = 5
+
+# Eventos devolvidos por World.step
+EVENT_SPAWN = 'spawn'          # (EVENT_SPAWN, pipe)
+EVENT_SCORE = 'score'          # (EVENT_SCORE, índice do pássaro)
+EVENT_DEATH = 'death'          # (EVENT_DEATH, índice do pássaro)
+EVENT_GAME_OVER = 'game_over'  # (EVENT_GAME_OVER,)
+
+
+def rects_collide(a, b):
+    # Mesma regra do pygame.Rect.colliderect para retângulos (x, y, largura, altura)
+    # com tamanhos positivos: retângulo vazio nunca colide e bordas encostadas não contam.
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    if not (aw and ah and bw and bh):
+        return False
+    return ax < bx + bw and ay < by + bh and bx < ax + aw and by < ay + ah
+
+
+class Bird:
+    def __init__(self, x, y, width=BIRD_WIDTH, height=BIRD_HEIGHT):
+        self.x, self.initial_y = x, y
+        self.y = y
+        self.width = width
+        self.height = height
+        # retângulo de colisão relativo a (x, y), calculado uma vez (ver hitbox)
+        margin_x = int(width * 0.45)
+        margin_y = int(height * 0.10)
+        self._hit_dx = -(width // 2) + margin_x
+        self._hit_dy = -(height // 2) + margin_y
+        self.hit_width = int(width - 2 * margin_x)
+        self.hit_height = int(height - 2 * margin_y)
+        # pássaros não simulados (ex.: o oponente) têm o y vindo da rede
+        self.simulated = True
+        self.reset()
+
+    def reset(self):
+        self.y = self.initial_y
+        self.velocity = 0
+        self.score = 0
+        self.is_alive = True
+
+    def jump(self):
+        if self.is_alive:
+            self.velocity = JUMP_STRENGTH
+
+    def move(self):
+        if self.is_alive:
+            self.velocity += GRAVITY
+            self.y += self.velocity
+
+    def hitbox(self):
+        # Retângulo de colisão (x, y, largura, altura), menor que a imagem.
+        # int() trunca como o pygame.Rect faz com coordenadas float.
+        return (
+            int(self.x + self._hit_dx),
+            int(self.y + self._hit_dy),
+            self.hit_width,
+            self.hit_height
+        )
+
+    def is_out_of_bounds(self):
+        return self.y - self.height // 2 < 0 or self.y + self.height // 2 > HEIGHT
+
+
+class Pipe:
+    def __init__(self, x, y_top_end):
+        # x na tela; ao entrar na PipeTrack vira coordenada da pista (world_x)
+        self.world_x = x
+        self.track = None
+        self.index = None
+        self.y_top_end = y_top_end
+        self.width = PIPE_WIDTH
+        # retângulos de colisão, fixos desde o spawn: faixa x relativa a world_x e os
+        # limites em y do cano de cima (0 até y_top_end) e de baixo (bottom_y até HEIGHT)
+        self.hit_left = COLLISION_MARGIN
+        self.hit_right = PIPE_WIDTH - COLLISION_MARGIN
+        self.bottom_y = y_top_end + PIPE_GAP
+
+    def __repr__(self):
+        return f'Pipe(index={self.index}, y_top_end={self.y_top_end})'
+
+    @property
+    def x(self):
+        # a pista move todos os canos juntos através do seu offset
+        if self.track is None:
+            return self.world_x
+        return self.world_x - self.track.offset
+
+    def hitboxes(self):
+        x = self.x + COLLISION_MARGIN
+        width = self.width - 2 * COLLISION_MARGIN
+        bottom_y = self.y_top_end + PIPE_GAP
+        return (x, 0, width, self.y_top_end), (x, bottom_y, width, HEIGHT - bottom_y)
+
+
+def check_collision(bird, track):
+    # Devolve True se o pássaro bateu em algum cano; senão, soma os canos passados.
+    # Mesmo resultado de testar rects_collide(bird.hitbox(), pipe.hitboxes()) com todos
+    # os canos, mas em coordenadas da pista e só com os canos que cruzam o x do pássaro
+    # (a pista é ordenada por x): O(1) por pássaro, com qualquer densidade de canos.
+    if not bird.is_alive:
+        return False
+
+    bx, by, bw, bh = bird.hitbox()
+    if bw and bh:
+        left = bx + track.offset
+        right = left + bw
+        bottom = by + bh
+        pipes = track.pipes
+        count = len(pipes)
+        index = track.first_reaching(left)
+        while index < count:
+            pipe = pipes[index]
+            world_x = pipe.world_x
+            if world_x + pipe.hit_left >= right:
+                break
+            if left < world_x + pipe.hit_right and pipe.hit_right > pipe.hit_left:
+                top_height = pipe.y_top_end
+                bottom_height = HEIGHT - pipe.bottom_y
+                if ((top_height and by < top_height and 0 < bottom) or
+                        (bottom_height and by < HEIGHT and pipe.bottom_y < bottom)):
+                    bird.is_alive = False
+                    return True
+            index += 1
+    # pontuação: cada pássaro tem seu próprio cursor de canos passados na pista
+    bird.score += track.count_passed(bird, bird.x)
+    return False
+
+
+def should_jump(bird, track):
+    # Heurística simples de piloto automático (bots, benchmarks): pula se está caindo
+    # abaixo do meio da abertura do próximo cano (ou do meio da tela, sem canos à frente).
+    if not bird.is_alive or bird.velocity < 0:
+        return False
+    target = HEIGHT // 2
+    for pipe in track:
+        if pipe.x + pipe.width > bird.x - bird.width // 2:
+            target = pipe.y_top_end + PIPE_GAP // 2
+            break
+    return bird.y > target + BIRD_HEIGHT // 2
+
+
+def project(y, velocity, ticks):
+    # (y, velocidade) de um pássaro vivo 'ticks' ticks adiante sem pular: a soma
+    # fechada de 'ticks' chamadas de Bird.move (aceita ticks fracionários, para a
+    # interpolação entre ticks). É o dead reckoning do pássaro remoto.
+    return y + ticks * velocity + GRAVITY * ticks * (ticks + 1) / 2, velocity + GRAVITY * ticks
+
+
+class World:
+    def __init__(self, birds=None, seed=0, pipe_factory=Pipe, judge_collisions=True):
+        if birds is None:
+            birds = [Bird(BIRD_X, HEIGHT // 2), Bird(BIRD_X, HEIGHT // 2)]
+        self.birds = birds
+        # alturas dos canos da partida, derivadas só do seed (ver pipe_schedule.py)
+        self.schedule = PipeSchedule(seed, PIPE_MIN_Y, PIPE_MAX_Y)
+        self.pipe_factory = pipe_factory
+        # espectadores não julgam colisões: recebem vida e pontuação dos jogadores
+        self.judge_collisions = judge_collisions
+        self.track = PipeTrack(PIPE_WIDTH)
+        self.spawn_timer = 0
+        self.tick = 0
+        self.game_over = False
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.schedule = PipeSchedule(seed, PIPE_MIN_Y, PIPE_MAX_Y)
+        for bird in self.birds:
+            bird.reset()
+        self.track.reset()
+        self.spawn_timer = 0
+        self.tick = 0
+        self.game_over = False
+
+    def save_state(self):
+        # Estado completo do mundo, para rollback (lockstep) e replays.
+        return (
+            [(bird.y, bird.velocity, bird.score, bird.is_alive) for bird in self.birds],
+            self.track.save_state(),
+            self.spawn_timer,
+            self.tick,
+            self.game_over
+        )
+
+    def load_state(self, state):
+        birds, track, self.spawn_timer, self.tick, self.game_over = state
+        for bird, (y, velocity, score, is_alive) in zip(self.birds, birds):
+            bird.y, bird.velocity, bird.score, bird.is_alive = y, velocity, score, is_alive
+        self.track.load_state(track)
+
+    def set_seed(self, seed):
+        # Troca o seed no meio da partida (ex.: seed que chegou atrasado):
+        # os canos já na tela são refeitos com as alturas certas.
+        self.schedule = PipeSchedule(seed, PIPE_MIN_Y, PIPE_MAX_Y)
+        pipes = self.track.pipes
+        for position, pipe in enumerate(pipes):
+            height = self.schedule[pipe.index]
+            if pipe.y_top_end != height:
+                fixed = self.pipe_factory(0, height)
+                fixed.world_x, fixed.index, fixed.track = pipe.world_x, pipe.index, pipe.track
+                pipes[position] = fixed
+
+    def fast_forward(self, tick):
+        # Monta a pista exatamente como estaria depois de 'tick' ticks desde o início
+        # da partida, sem simular os ticks intermediários (entrada atrasada de
+        # espectadores). Os pássaros não são tocados.
+        track = self.track
+        track.reset()
+        track.offset = PIPE_SPEED * tick
+        spawned = tick // SPAWN_INTERVAL
+        for index in range(spawned):
+            # o cano 'index' nasce no tick (index + 1) * SPAWN_INTERVAL, antes da pista andar
+            spawn_tick = (index + 1) * SPAWN_INTERVAL
+            world_x = WIDTH + PIPE_SPEED * (spawn_tick - 1)
+            if world_x - track.offset + PIPE_WIDTH <= 0:
+                continue
+            track.spawned = index
+            track.add(self.pipe_factory(world_x - track.offset, self.schedule[index]))
+        track.spawned = spawned
+        for bird in self.birds:
+            track.skip_passed(bird, bird.x)
+        self.spawn_timer = tick % SPAWN_INTERVAL
+        self.tick = tick
+
+    def spawn_pipe(self):
+        # altura pelo número do cano na partida: O(1) e igual em todos os clientes
+        pipe_height = self.schedule[self.track.spawned]
+        return self.track.add(self.pipe_factory(WIDTH, pipe_height))
+
+    def step(self, inputs=()):
+        # Avança um tick. inputs: índices dos pássaros que pularam neste tick.
+        events = []
+        birds = self.birds
+        alive_before = [bird.is_alive for bird in birds]
+        scores_before = [bird.score for bird in birds]
+
+        for index in inputs:
+            birds[index].jump()
+
+        for bird in birds:
+            if bird.simulated:
+                bird.move()
+
+        if self.judge_collisions:
+            for bird in birds:
+                if bird.is_out_of_bounds():
+                    bird.is_alive = False
+
+        self.spawn_timer += 1
+        if self.spawn_timer >= SPAWN_INTERVAL:
+            events.append((EVENT_SPAWN, self.spawn_pipe()))
+            self.spawn_timer = 0
+
+        self.track.advance(PIPE_SPEED)
+
+        if self.judge_collisions:
+            for bird in birds:
+                check_collision(bird, self.track)
+
+        for index, bird in enumerate(birds):
+            if bird.score != scores_before[index]:
+                events.append((EVENT_SCORE, index))
+            if alive_before[index] and not bird.is_alive:
+                events.append((EVENT_DEATH, index))
+
+        if self.judge_collisions and not self.game_over and not any(bird.is_alive for bird in birds):
+            self.game_over = True
+            events.append((EVENT_GAME_OVER,))
+
+        self.tick += 1
+        return events
@@ -0,0 +1,177 @@
+# Snapshots do mundo em keyframe + delta.
+# O P1 (autoridade) não reenvia mais a lista inteira de canos a cada snapshot:
+# cada cano tem um id estável (índice de spawn na PipeTrack) e, como a pista rola
+# por um offset global, um cano nunca muda depois de criado. Um delta leva só o
+# offset, os canos criados/removidos e os campos que mudaram desde um snapshot que
+# os receptores já confirmaram (ack). Receptores que perderam a base pedem um keyframe.
+
+KEYFRAME_INTERVAL = 10  # força um keyframe completo a cada N snapshots
+HISTORY_SIZE = 32       # snapshots guardados para servir de base de delta
+ACK_TIMEOUT = 3         # receptor sem ack nos últimos N snapshots deixa de segurar a base
+
+# campos do snapshot além dos canos e do offset
+FIELDS = ("scores", "alive", "state")
+
+
+def capture(track, fields):
+    # estado: {"offset": ..., "pipes": {id: (world_x, y_top_end)}, <campos>}
+    state = {
+        "offset": track.offset,
+        "pipes": {pipe.index: (pipe.world_x, pipe.y_top_end) for pipe in track}
+    }
+    state.update(fields)
+    return state
+
+
+def _remember(history, seq, state):
+    history[seq] = state
+    if len(history) > HISTORY_SIZE:
+        del history[min(history)]
+
+
+class SnapshotSender:
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.history = {}
+        # último seq confirmado por cada receptor, e o seq que o remetente estava quando o ack chegou
+        self.acks = {}
+        self.heard = {}
+        self.force_keyframe = True
+
+    def ack(self, receiver_id, seq=None, need_keyframe=False):
+        if need_keyframe:
+            self.force_keyframe = True
+        if seq is not None and seq > self.acks.get(receiver_id, -1):
+            self.acks[receiver_id] = seq
+            self.heard[receiver_id] = self.seq
+
+    def _baseline(self):
+        # base comum: o snapshot mais antigo que todos os receptores confirmaram.
+        # Receptores calados (sem ack há ACK_TIMEOUT snapshots) ou cuja base já saiu
+        # do histórico deixam de contar até o próximo ack: senão um receptor que foi
+        # embora prenderia a base para sempre.
+        for receiver_id, seq in list(self.acks.items()):
+            if seq not in self.history or self.seq - self.heard[receiver_id] > ACK_TIMEOUT:
+                del self.acks[receiver_id]
+                del self.heard[receiver_id]
+        if not self.acks:
+            return None
+        return min(self.acks.values())
+
+    def make(self, state):
+        self.seq += 1
+        seq = self.seq
+        base = None if self.force_keyframe or seq % self.keyframe_interval == 0 else self._baseline()
+
+        if base is None:
+            self.force_keyframe = False
+            message = {
+                "type": "snapshot", "seq": seq, "key": True, "offset": state["offset"],
+                "pipes": [[pipe_id, x, y] for pipe_id, (x, y) in state["pipes"].items()]
+            }
+            for field in FIELDS:
+                if field in state:
+                    message[field] = state[field]
+        else:
+            base_state = self.history[base]
+            base_pipes = base_state["pipes"]
+            pipes = state["pipes"]
+            message = {
+                "type": "snapshot", "seq": seq, "base": base, "offset": state["offset"],
+                "spawn": [[pipe_id, x, y] for pipe_id, (x, y) in pipes.items() if base_pipes.get(pipe_id) != (x, y)],
+                "despawn": [pipe_id for pipe_id in base_pipes if pipe_id not in pipes]
+            }
+            for field in FIELDS:
+                if field in state and state[field] != base_state.get(field):
+                    message[field] = state[field]
+        # só guarda depois de montar a mensagem: guardar pode tirar a base do histórico
+        _remember(self.history, seq, state)
+        return message
+
+
+class SnapshotReceiver:
+    def __init__(self):
+        self.history = {}
+        self.last_seq = 0
+
+    def apply(self, message):
+        # Devolve o estado completo do snapshot, ou None se for antigo ou se
+        # a base do delta não estiver no histórico (nesse caso, peça um keyframe).
+        seq = message["seq"]
+        if message.get("key"):
+            # keyframe sempre vale (inclusive se a autoridade reiniciou a numeração)
+            self.history.clear()
+            self.last_seq = 0
+        elif seq <= self.last_seq:
+            return None
+
+        if message.get("key"):
+            state = {"pipes": {pipe_id: (x, y) for pipe_id, x, y in message["pipes"]}}
+            for field in FIELDS:
+                if field in message:
+                    state[field] = message[field]
+        else:
+            base_state = self.history.get(message["base"])
+            if base_state is None:
+                return None
+            state = dict(base_state)
+            pipes = dict(base_state["pipes"])
+            for pipe_id in message["despawn"]:
+                pipes.pop(pipe_id, None)
+            for pipe_id, x, y in message["spawn"]:
+                pipes[pipe_id] = (x, y)
+            state["pipes"] = pipes
+            for field in FIELDS:
+                if field in message:
+                    state[field] = message[field]
+        state["offset"] = message["offset"]
+
+        _remember(self.history, seq, state)
+        self.last_seq = max(self.last_seq, seq)
+        return state
+
+
+def apply_to_track(track, state, pipe_factory):
+    # Aplica o snapshot na pista reaproveitando os objetos Pipe existentes:
+    # só cria canos que faltam e remove os que a autoridade não tem mais.
+    target = state["pipes"]
+    existing = {pipe.index: pipe for pipe in track}
+    track.clear()
+    track.offset = state["offset"]
+    for pipe_id in sorted(target):
+        world_x, y_top_end = target[pipe_id]
+        pipe = existing.get(pipe_id)
+        if pipe is None or pipe.y_top_end != y_top_end:
+            pipe = pipe_factory(0, y_top_end)
+        pipe.world_x = world_x
+        pipe.index = pipe_id
+        pipe.track = track
+        track.pipes.append(pipe)
+    # os próximos canos gerados localmente seguem a numeração da autoridade
+    if target:
+        track.spawned = max(track.spawned, max(target) + 1)
+
+
+def receive_snapshot(receiver, message, track, birds, pipe_factory, player_id):
+    # Handler de snapshot do receptor (TesteSincroniza.py; bench.py mede este caminho).
+    # Aplica o snapshot na pista e nos pássaros (vermelho, azul) e devolve
+    # (estado, resposta): a resposta é o ack a publicar, ou o pedido de keyframe
+    # quando o delta veio sobre uma base que não temos (aí o estado é None).
+    snapshot = receiver.apply(message)
+    if snapshot is None:
+        if "base" in message and message["seq"] > receiver.last_seq:
+            return None, {"type": "snapshot_ack", "player_id": player_id, "need_keyframe": True}
+        return None, None
+
+    # atualiza os canos existentes no lugar (ids estáveis)
+    apply_to_track(track, snapshot, pipe_factory)
+    # canos recriados que já ficaram para trás não pontuam de novo
+    for bird in birds:
+        track.skip_passed(bird, bird.x)
+    for bird, color in zip(birds, ('red', 'blue')):
+        bird.score = snapshot["scores"].get(color, bird.score)
+        # estado de vida, se enviado
+        if "alive" in snapshot:
+            bird.is_alive = snapshot["alive"].get(color, bird.is_alive)
+    return snapshot, {"type": "snapshot_ack", "player_id": player_id, "seq": message["seq"]}
@@ -0,0 +1,54 @@
+import pygame
+
+import simulation
+from simulation import HEIGHT, PIPE_GAP
+
+# Adaptador pygame sobre o núcleo da simulação: os objetos continuam sendo os da
+# simulação (física e colisão em simulation.py), só ganham imagem e desenho.
+
+BLACK = (0, 0, 0)
+
+
+class Bird(simulation.Bird):
+    def __init__(self, x, y, image, color, width=simulation.BIRD_WIDTH, height=simulation.BIRD_HEIGHT):
+        super().__init__(x, y, width, height)
+        self.image = image
+        self.color = color
+
+    def draw(self, screen, y=None):
+        # y: posição de desenho (ex.: interpolada entre ticks); padrão = posição simulada
+        if y is None:
+            y = self.y
+        if self.is_alive and self.image:
+            return screen.blit(self.image, (self.x - self.width // 2, int(y) - self.height // 2))
+        elif self.is_alive:
+            return pygame.draw.circle(screen, self.color, (self.x, int(y)), self.width // 2)
+        return None
+
+    def get_rect(self):
+        return pygame.Rect(self.hitbox())
+
+
+class Pipe(simulation.Pipe):
+    # cache compartilhado de imagens por altura (render_cache.PipeSpriteCache);
+    # None = desenha retângulos pretos
+    sprite_cache = None
+
+    def __init__(self, x, y_top_end):
+        super().__init__(x, y_top_end)
+        if Pipe.sprite_cache is not None:
+            self.image_top, self.image_bottom = Pipe.sprite_cache.get(self.y_top_end)
+        else:
+            self.image_top = None
+            self.image_bottom = None
+
+    def draw(self, screen, x=None):
+        # x: posição de desenho na tela (ex.: interpolada entre ticks); padrão = posição simulada
+        if x is None:
+            x = self.x
+        if self.image_top and self.image_bottom:
+            return (screen.blit(self.image_top, (x, self.y_top_end - self.image_top.get_height())),
+                    screen.blit(self.image_bottom, (x, self.y_top_end + PIPE_GAP)))
+        else:
+            return (pygame.draw.rect(screen, BLACK, (x, 0, self.width, self.y_top_end)),
+                    pygame.draw.rect(screen, BLACK, (x, self.y_top_end + PIPE_GAP, self.width, HEIGHT - (self.y_top_end + PIPE_GAP))))
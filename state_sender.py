@@ -0,0 +1,68 @@
+# Quando mandar o estado do pássaro local.
+# O estado ia a cada 50 ms (20 mensagens/s por jogador) mesmo sem nada acontecer. A
+# trajetória de um pássaro só muda num pulo: entre dois pulos ela é a física do
+# simulation.Bird, e o receptor, com y e velocidade de um tick, projeta o resto
+# (simulation.project, ver jitter_buffer.py). Então o estado vai quando algo muda,
+# pulo, morte, ponto ou estado do jogo, e num keyframe de vez em quando, que corrige
+# o receptor se um desses estados se perdeu e mantém vivas as medidas de rede.
+#
+# O intervalo do keyframe acompanha a perda que os outros pares medem nos nossos
+# estados (devolvida no pong, ver netstats.py): 1 s sem perda, 200 ms a partir de
+# 20%. Com alguma perda medida, cada evento também é repetido REPEAT_TICKS depois: um
+# pulo perdido deixaria o pássaro caindo do outro lado até o próximo keyframe. Numa
+# partida típica ficam de 2 a 4 mensagens/s por jogador.
+
+KEYFRAME_MAX_TICKS = 60     # 1 s, sem perda
+KEYFRAME_MIN_TICKS = 12     # 200 ms, com perda de LOSS_FOR_MIN_INTERVAL ou mais
+LOSS_FOR_MIN_INTERVAL = 0.2
+REPEAT_TICKS = 3            # 50 ms
+
+
+def keyframe_interval(loss, max_ticks=KEYFRAME_MAX_TICKS, min_ticks=KEYFRAME_MIN_TICKS):
+    # ticks entre keyframes para a perda medida (None = ainda sem medida)
+    if not loss:
+        return max_ticks
+    fraction = min(loss / LOSS_FOR_MIN_INTERVAL, 1.0)
+    return round(max_ticks - (max_ticks - min_ticks) * fraction)
+
+
+class StateSender:
+    def __init__(self, max_ticks=KEYFRAME_MAX_TICKS, min_ticks=KEYFRAME_MIN_TICKS):
+        self.max_ticks = max_ticks
+        self.min_ticks = min_ticks
+        self.interval = max_ticks
+        self.repeat = False
+        # estatísticas (overlay de rede, logs)
+        self.events = 0
+        self.keyframes = 0
+        self.repeats = 0
+        self.reset()
+
+    def reset(self):
+        # nova partida: o próximo estado vai na hora
+        self._last_tick = None
+        self._last_key = None
+        self._repeat_at = None
+
+    def adapt(self, loss):
+        self.interval = keyframe_interval(loss, self.max_ticks, self.min_ticks)
+        self.repeat = bool(loss)
+
+    def should_send(self, tick, jumped, alive, score, game_state):
+        # jumped: o pássaro pulou desde o último envio
+        key = (alive, score, game_state)
+        since_last = None if self._last_tick is None else tick - self._last_tick
+        if jumped or key != self._last_key:
+            self.events += 1
+            self._repeat_at = tick + REPEAT_TICKS if self.repeat else None
+        elif self._repeat_at is not None and tick >= self._repeat_at:
+            self.repeats += 1
+            self._repeat_at = None
+        elif since_last is not None and 0 <= since_last < self.interval:
+            return False
+        else:
+            self.keyframes += 1
+            self._repeat_at = None
+        self._last_tick = tick
+        self._last_key = key
+        return True
@@ -0,0 +1,187 @@
+import random
+
+import numpy as np
+import pytest
+
+from battle import Battle, KEYFRAME_TICKS
+from flock import Flock, BattleWorld, JitterTable, should_jump as flock_should_jump
+from jitter_buffer import JitterBuffer
+from simulation import World, Bird, BIRD_X, HEIGHT, EVENT_SPAWN, should_jump
+from transport import LoopbackNetwork
+
+
+def comparable(events):
+    # o spawn traz o objeto Pipe de cada pista: compara pelo índice e pela altura
+    return [(event[0], event[1].index, event[1].y_top_end) if event[0] == EVENT_SPAWN else event
+            for event in events]
+
+
+def play_both(seed, birds, ticks, mistakes=0.01):
+    # a mesma partida com objetos Bird no World e com o bando no BattleWorld
+    world = World(birds=[Bird(BIRD_X, HEIGHT // 2) for _ in range(birds)], seed=seed)
+    flock = Flock(birds)
+    for index in range(birds):
+        flock.add(f'player-{index}', simulated=True)
+    battle = BattleWorld(flock, seed=seed)
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        jumps = [index for index, bird in enumerate(world.birds)
+                 if should_jump(bird, world.track) != (rng.random() < mistakes)]
+        assert comparable(battle.step(jumps)) == comparable(world.step(jumps))
+        if world.game_over:
+            break
+    return world, flock
+
+
+@pytest.mark.parametrize('seed', [1, 7, 42])
+def test_flock_matches_world(seed):
+    world, flock = play_both(seed, 12, 6000)
+    assert flock.y.tolist()[:12] == [bird.y for bird in world.birds]
+    assert flock.velocity.tolist()[:12] == [bird.velocity for bird in world.birds]
+    assert flock.score.tolist()[:12] == [bird.score for bird in world.birds]
+    assert flock.alive.tolist()[:12] == [bird.is_alive for bird in world.birds]
+
+
+def test_flock_should_jump_matches_scalar():
+    world, flock = play_both(3, 8, 700, mistakes=0.2)
+    mask = flock_should_jump(flock, world.track)
+    assert mask.tolist() == [should_jump(bird, world.track) for bird in world.birds]
+
+
+def test_player_table_stays_contiguous():
+    flock = Flock(4)
+    rows = [flock.add(f'player-{index}', simulated=index == 0) for index in range(4)]
+    assert rows == [0, 1, 2, 3]
+    assert flock.add('player-9', simulated=False) is None
+    assert flock.add('player-2', simulated=False) == 2
+    flock.set_remote(3, 100.0, 5, True, 1)
+    flock.remove('player-1')
+    # a última linha ocupa o lugar da removida, com os seus dados
+    assert flock.players == ['player-0', 'player-3', 'player-2']
+    assert flock.rows['player-3'] == 1
+    assert (flock.target_y[1], flock.score[1]) == (100.0, 5)
+    flock.remove('player-1')
+    assert len(flock) == 3
+
+
+def test_ranking_and_remote_follow():
+    flock = Flock(3)
+    for index in range(3):
+        flock.add(f'player-{index}', simulated=index == 0)
+    flock.score[:3] = [2, 5, 5]
+    flock.alive[:3] = [True, False, True]
+    assert flock.ranking() == [2, 1, 0]
+    flock.set_remote(1, 100.0, 5, False, 0)
+    before = flock.y.copy()
+    flock.follow_remote()
+    assert flock.y[0] == before[0]
+    assert flock.y[1] == 100.0
+
+
+def test_save_load_and_fast_forward():
+    flock = Flock(4)
+    for index in range(4):
+        flock.add(f'player-{index}', simulated=True)
+    world = BattleWorld(flock, seed=11, judge_collisions=False)
+    for _ in range(300):
+        world.step()
+    saved = world.save_state()
+    for _ in range(100):
+        world.step([0, 1])
+    world.load_state(saved)
+    assert np.array_equal(flock.view(flock.y), saved[1][0])
+    # pular para um tick adiante não pontua os canos já passados
+    late = Flock(4)
+    for index in range(4):
+        late.add(f'player-{index}', simulated=True)
+    skipped = BattleWorld(late, seed=11, judge_collisions=False)
+    skipped.fast_forward(2000)
+    skipped.step()
+    assert late.view(late.score).tolist() == [0, 0, 0, 0]
+
+
+def jumping_path(ticks, period):
+    bird = Bird(BIRD_X, 300)
+    path = []
+    for tick in range(ticks):
+        if tick % period == 0:
+            bird.jump()
+        bird.move()
+        path.append((bird.y, bird.velocity))
+    return path
+
+
+def test_jitter_table_matches_one_buffer_per_row():
+    rng = random.Random(3)
+    paths = [jumping_path(300, period) for period in (25, 31, 40)]
+    table = JitterTable(4)
+    buffers = [JitterBuffer() for _ in paths]
+    # linha 0 local (sem buffer), 1-3 remotas; estados nos pulos e a cada 30 ticks, com jitter
+    arrivals = {}
+    for row, path in enumerate(paths, start=1):
+        period = (25, 31, 40)[row - 1]
+        for tick in range(0, 300, 1):
+            if tick % period == 0 or tick % 30 == 0:
+                arrivals.setdefault(tick + rng.randint(2, 8), []).append((row, tick, *path[tick]))
+    out = np.full(4, -1.0)
+    for now in range(300):
+        for row, tick, y, velocity in arrivals.get(now, []):
+            table.push(row, tick, y, now, velocity)
+            buffers[row - 1].push(tick, y, now, velocity)
+        table.sample(now, 1, 4, out)
+        for row, buffer in enumerate(buffers, start=1):
+            expected = buffer.sample(now)
+            assert out[row] == (-1.0 if expected is None else pytest.approx(expected))
+    assert out[0] == -1.0
+
+
+def test_jitter_table_follows_removed_rows():
+    table = JitterTable(3)
+    table.push(1, 10, 100.0, 12, -2.0)
+    table.push(2, 10, 200.0, 12, -2.0)
+    # a linha 1 saiu: a 2 (última) ocupa o lugar dela
+    table.move(2, 1)
+    out = np.zeros(3)
+    table.sample(20, 1, 2, out)
+    assert table.buffers[2] is None and 150 < out[1] < 200
+
+
+def test_battle_between_two_processes():
+    network = LoopbackNetwork()
+    links = [network.transport(name) for name in ('a', 'b')]
+    alice = Battle(links[0], 'sala', 'player-1', bots=3, rng=random.Random(1))
+    bob = Battle(links[1], 'sala', 'player-2', bots=2, rng=random.Random(2))
+    for link in links:
+        link.connect()
+    alice.start()
+    for _ in range(120):
+        network.pump()
+        for battle, link in ((alice, links[0]), (bob, links[1])):
+            link.poll()
+            battle.process_network()
+            battle.tick()
+    assert bob.state == 'playing' and bob.world.schedule.seed == alice.world.schedule.seed
+    # cada um vê os pássaros locais do outro como linhas remotas
+    assert len(alice.flock) == len(bob.flock) == 7
+    assert set(alice.flock.players) == set(bob.flock.players)
+    bob.leave()
+    network.pump()
+    links[0].poll()
+    alice.process_network()
+    assert len(alice.flock) == 4
+
+
+def test_idle_battle_keeps_publishing_states():
+    # fora de rodada o estado continua indo, para os outros não tirarem o jogador da tabela
+    network = LoopbackNetwork()
+    link = network.transport('a')
+    battle = Battle(link, 'sala', 'player-1', bots=1, rng=random.Random(1))
+    watcher = network.transport('b')
+    watcher.subscribe(battle.topic)
+    link.connect()
+    watcher.connect()
+    for _ in range(KEYFRAME_TICKS * 3):
+        battle.tick()
+    network.pump()
+    states = [message for message in watcher.receive() if message.payload[:1] != b'{']
+    assert len(states) == 3 * len(battle.local_ids)
@@ -0,0 +1,50 @@
+import logging
+
+import gamelog
+
+
+def test_sampler_keeps_first_and_one_in_n():
+    sampler = gamelog.Sampler({'net.state': 3})
+    kept = [sampler('net.state') for _ in range(7)]
+    assert kept == [True, False, False, True, False, False, True]
+    assert sampler.skipped == {'net.state': 4}
+    # categoria sem taxa: tudo passa
+    assert all(sampler('other') for _ in range(5))
+
+
+def test_parse_rates():
+    rates = gamelog._parse_rates('net.state=50, net.input=0,')
+    assert rates['net.state'] == 50
+    assert rates['net.input'] == 1
+
+
+def test_parse_level():
+    assert gamelog._parse_level(None, logging.INFO) == logging.INFO
+    assert gamelog._parse_level('debug', logging.INFO) == logging.DEBUG
+    assert gamelog._parse_level('15', logging.INFO) == 15
+    assert gamelog._parse_level('off', logging.INFO) is None
+
+
+def test_unknown_level_falls_back_to_default():
+    gamelog._bad_levels.clear()
+    assert gamelog._parse_level('verbose', logging.INFO, 'FLAPPY_LOG') == logging.INFO
+    assert gamelog._bad_levels == [('FLAPPY_LOG', 'verbose', 'INFO')]
+    gamelog._bad_levels.clear()
+
+
+def test_ring_buffer_keeps_the_last_records(tmp_path):
+    ring = gamelog.RingBufferHandler(capacity=3)
+    logger = logging.getLogger('flappy.test.ring')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(ring)
+    try:
+        for index in range(5):
+            logger.debug('registro %d', index)
+    finally:
+        logger.removeHandler(ring)
+    path = tmp_path / 'dump.log'
+    assert ring.dump(str(path), '# cabeçalho') == 3
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == '# cabeçalho'
+    assert [line.rsplit(' ', 1)[-1] for line in lines[1:]] == ['2', '3', '4']
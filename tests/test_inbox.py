@@ -0,0 +1,52 @@
+import threading
+
+from inbox import Inbox, MAX_EVENTS
+
+
+def test_latest_state_per_sender():
+    inbox = Inbox()
+    inbox.put_state('red', {"y": 1})
+    inbox.put_state('blue', {"y": 2})
+    inbox.put_state('red', {"y": 3})
+    assert inbox.drain_states() == {'red': {"y": 3}, 'blue': {"y": 2}}
+    assert inbox.coalesced == 1
+    assert inbox.drain_states() == {}
+
+
+def test_events_keep_their_order():
+    inbox = Inbox()
+    for tick in range(10):
+        inbox.put_event({"tick": tick})
+    assert [event["tick"] for event in inbox.drain_events()] == list(range(10))
+    assert inbox.drain_events() == []
+
+
+def test_events_from_another_thread():
+    inbox = Inbox()
+    writer = threading.Thread(target=lambda: [inbox.put_event(index) for index in range(100)])
+    writer.start()
+    received = []
+    while writer.is_alive() or received != list(range(100)):
+        received += inbox.drain_events()
+        if not writer.is_alive() and len(received) >= 100:
+            break
+    writer.join()
+    assert received == list(range(100))
+
+
+def test_overflow_keeps_the_oldest_and_counts():
+    inbox = Inbox(max_events=5)
+    for tick in range(8):
+        inbox.put_event(tick)
+    assert inbox.drain_events() == [0, 1, 2, 3, 4]
+    assert inbox.overflowed == 3
+    inbox.put_event(8)
+    assert inbox.drain_events() == [8]
+
+
+def test_default_inbox_is_bounded():
+    inbox = Inbox()
+    for tick in range(MAX_EVENTS + 10):
+        inbox.put_event(tick)
+    assert len(inbox.drain_events()) == MAX_EVENTS
+    assert inbox.overflowed == 10
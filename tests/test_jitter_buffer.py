@@ -0,0 +1,92 @@
+import pytest
+
+from jitter_buffer import JitterBuffer, RESYNC_TICKS, MAX_EXTRAPOLATION_TICKS, MIN_DELAY_TICKS
+from simulation import Bird, BIRD_X
+
+
+def falling_bird(ticks):
+    # y de um pássaro que pula a cada 30 ticks, e a velocidade depois de cada tick
+    bird = Bird(BIRD_X, 300)
+    path = []
+    for tick in range(ticks):
+        if tick % 30 == 0:
+            bird.jump()
+        bird.move()
+        path.append((bird.y, bird.velocity))
+    return path
+
+
+def test_empty_buffer():
+    assert JitterBuffer().sample(10) is None
+
+
+def test_interpolates_between_states():
+    buffer = JitterBuffer()
+    # estados a cada 3 ticks, sempre 4 ticks depois de enviados
+    for tick in range(0, 60, 3):
+        buffer.push(tick, float(tick * 2), tick + 4)
+    now = 64
+    shown = buffer.render_tick(now)
+    assert buffer.sample(now) == pytest.approx(shown * 2)
+
+
+def test_projects_states_with_velocity():
+    path = falling_bird(120)
+    buffer = JitterBuffer()
+    # só os estados dos pulos (ticks 0, 30, 60, 90), sem jitter
+    for tick in range(0, 120, 30):
+        y, velocity = path[tick]
+        buffer.push(tick, y, tick + 3, velocity)
+    for now in range(93, 110):
+        shown = buffer.render_tick(now)
+        assert shown == int(shown)
+        assert buffer.sample(now) == pytest.approx(path[int(shown)][0])
+
+
+def test_duplicates_and_late_states_are_dropped():
+    buffer = JitterBuffer()
+    for tick in range(10):
+        buffer.push(tick, float(tick), tick)
+    assert not buffer.push(5, 5.0, 12)
+    buffer.sample(40)
+    assert not buffer.push(0, 0.0, 40)
+    assert buffer.dropped == 2
+
+
+def test_out_of_order_states_are_sorted():
+    buffer = JitterBuffer()
+    for tick in (0, 6, 3, 9):
+        buffer.push(tick, float(tick), 10)
+    assert buffer.ticks == [0, 3, 6, 9]
+
+
+def test_resync_on_clock_jump():
+    buffer = JitterBuffer()
+    for tick in range(10):
+        buffer.push(tick, float(tick), tick)
+    # o remetente recomeçou a partida
+    buffer.push(RESYNC_TICKS * 10, 1.0, 10)
+    assert buffer.ticks == [RESYNC_TICKS * 10]
+
+
+def test_extrapolation_is_limited():
+    buffer = JitterBuffer()
+    for tick in range(0, 30, 3):
+        buffer.push(tick, float(tick), tick)
+    # os estados param no tick 27 (y = 27, velocidade 1 por tick)
+    assert buffer.sample(200) == pytest.approx(27 + MAX_EXTRAPOLATION_TICKS)
+    assert buffer.late == 1
+
+
+def test_delay_follows_jitter_slowly():
+    buffer = JitterBuffer()
+    for tick in range(0, 60, 3):
+        buffer.push(tick, 0.0, tick)
+        buffer.sample(tick)
+    steady = buffer.delay
+    assert steady == pytest.approx(max(3 + 1, MIN_DELAY_TICKS))
+    # um estado chega 12 ticks atrasado: o atraso alvo sobe, o atual anda devagar
+    buffer.push(60, 0.0, 72)
+    buffer.sample(73)
+    assert buffer._target_delay == pytest.approx(buffer.gap + 12 + 1)
+    assert steady < buffer.delay < buffer._target_delay
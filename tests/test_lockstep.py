@@ -0,0 +1,161 @@
+import random
+
+import wire
+from lockstep import LockstepSession
+from simulation import World, HEIGHT, PIPE_GAP
+
+
+def make_world(seed):
+    return World(seed=seed)
+
+
+def autopilot(world):
+    # pulos de um piloto simples: pula caindo abaixo do meio da próxima abertura
+    jumps = []
+    for index, bird in enumerate(world.birds):
+        target = HEIGHT // 2
+        for pipe in world.track:
+            if pipe.x + pipe.width > bird.x - bird.width // 2:
+                target = pipe.y_top_end + PIPE_GAP // 2
+                break
+        if bird.is_alive and bird.velocity >= 0 and bird.y > target + 15:
+            jumps.append(index)
+    return jumps
+
+
+def scripted_jumps(seed, ticks):
+    # pulos dos dois pássaros de uma partida jogada pelo piloto
+    world = make_world(seed)
+    jumps = {}
+    for _ in range(ticks):
+        tick_jumps = autopilot(world)
+        if tick_jumps:
+            jumps[world.tick] = tick_jumps
+        world.step(tick_jumps)
+    return jumps
+
+
+def new_session(seed, **kwargs):
+    session = LockstepSession(make_world(seed), local_index=0, input_delay=0, **kwargs)
+    session.start()
+    return session
+
+
+def test_rollback_matches_in_order_run():
+    seed, ticks = 21, 1500
+    jumps = scripted_jumps(seed, ticks)
+
+    in_order = new_session(seed)
+    for tick, birds in jumps.items():
+        for bird in birds:
+            in_order.receive(tick, bird)
+    for _ in range(ticks):
+        in_order.advance()
+
+    # os pulos remotos chegam de 1 a 30 ticks atrasados, fora de ordem
+    rng = random.Random(2)
+    late = new_session(seed)
+    arrivals = {}
+    for tick, birds in jumps.items():
+        for bird in birds:
+            if bird == late.local_index:
+                late.inputs.setdefault(tick, []).append(bird)
+            else:
+                arrivals.setdefault(tick + rng.randint(1, 30), []).append((tick, bird))
+    for _ in range(ticks):
+        for tick, bird in arrivals.pop(late.world.tick, ()):
+            late.receive(tick, bird)
+        late.advance()
+
+    assert late.rollbacks > 0
+    assert late.world.save_state()[0] == in_order.world.save_state()[0]
+    assert late.world.game_over == in_order.world.game_over
+
+
+def test_duplicate_inputs_are_ignored():
+    session = new_session(3)
+    for _ in range(10):
+        session.advance()
+    session.receive(5, 1)
+    session.receive(5, 1)
+    session.advance()
+    assert session.inputs[5] == [1]
+    assert session.rollbacks == 1
+
+
+def test_input_older_than_rollback_window_desyncs():
+    session = new_session(3, max_rollback=20)
+    for _ in range(30):
+        session.advance()
+    session.receive(2, 1)
+    session.advance()
+    # não é aplicado num tick errado: a sessão avisa que divergiu
+    assert session.desynced and session.stale_inputs == 1
+    assert all(1 not in jumps for jumps in session.inputs.values())
+    session.start()
+    assert not session.desynced
+
+
+def test_fast_forward_keeps_the_skipped_ticks_for_rollback():
+    seed = 4
+    jumps = scripted_jumps(seed, 40)
+    reference = new_session(seed)
+    for tick, birds in jumps.items():
+        for bird in birds:
+            reference.receive(tick, bird)
+    for _ in range(40):
+        reference.advance()
+
+    # entrou no tick 10 e os pulos do P1 desses ticks chegam depois
+    joined = new_session(seed)
+    joined.fast_forward(10)
+    assert joined.world.tick == 10
+    for tick, birds in jumps.items():
+        for bird in birds:
+            joined.receive(tick, bird)
+    for _ in range(30):
+        joined.advance()
+    assert not joined.desynced
+    assert joined.world.save_state() == reference.world.save_state()
+
+
+def test_local_jump_is_delayed():
+    session = LockstepSession(make_world(3), local_index=1, input_delay=2)
+    session.start()
+    session.advance()
+    assert session.local_jump() == 3
+    assert session.inputs[3] == [1]
+
+
+def test_game_over_waits_for_remote_inputs():
+    session = new_session(5)
+    while not session.world.game_over:
+        session.advance()
+    # o outro jogador ainda pode ter pulado: o game over previsto não vale
+    assert not session.settled()
+    session.finish(0, session.world.tick)
+    session.receive(10, 1)
+    session.advance()
+    assert not session.world.game_over
+    while not session.world.game_over:
+        session.advance()
+    session.finish(1, session.world.tick)
+    assert session.settled()
+
+
+def test_game_over_settles_after_rollback_window():
+    session = new_session(6)
+    session.max_rollback = 20
+    while not session.world.game_over:
+        session.advance()
+    for _ in range(19):
+        session.advance()
+        assert not session.settled()
+    session.advance()
+    assert session.settled()
+
+
+def test_input_message_round_trip():
+    payload = wire.encode_input("player-77", 1500, 1)
+    assert len(payload) == wire.INPUT_V1.size
+    assert wire.decode(payload) == {"type": "input", "player_id": "player-77", "tick": 1500, "bird": 1}
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+import netstats
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def state(player_id, seq, sent=None):
+    return {"player_id": player_id, "seq": seq, "sent": sent}
+
+
+def test_stamp_increments_and_wraps():
+    stats = netstats.NetStats("player-1", clock=FakeClock())
+    stats._seq = netstats.SEQ_MODULO - 1
+    assert stats.stamp({})["seq"] == netstats.SEQ_MODULO - 1
+    assert stats.stamp({})["seq"] == 0
+
+
+def test_loss_reordering_and_duplicates():
+    clock = FakeClock()
+    stats = netstats.NetStats("player-1", clock=clock)
+    for seq in (0, 1, 3, 2, 2, 5, 6, 7, 8, 9):
+        clock.now += 0.05
+        stats.on_state(state("player-2", seq))
+    peer = stats.summary()["player-2"]
+    # 10 esperadas (0..9), a 4 nunca chegou
+    assert peer["loss"] == pytest.approx(0.1)
+    assert peer["reordered"] == 1
+    assert peer["duplicates"] == 1
+    assert peer["rate"] == pytest.approx(20.0)
+
+
+def test_sequence_wraparound_is_not_loss():
+    stats = netstats.NetStats("player-1", clock=FakeClock())
+    for seq in (65534, 65535, 0, 1):
+        stats.on_state(state("player-2", seq))
+    peer = stats.summary()["player-2"]
+    assert peer["loss"] == 0.0
+    assert peer["reordered"] == 0
+
+
+def test_jitter_from_send_timestamps():
+    clock = FakeClock(0.0)
+    stats = netstats.NetStats("player-1", clock=clock)
+    # relógio do outro lado adiantado 5 s; trânsito alterna 20 ms e 40 ms
+    for i in range(200):
+        sent = 5000 + i * 50
+        clock.now = (i * 50 + (20 if i % 2 == 0 else 40)) / 1000
+        stats.on_state(state("player-2", i, sent))
+    assert stats.summary()["player-2"]["jitter"] == pytest.approx(20.0, abs=0.5)
+
+
+def test_ping_pong_rtt():
+    clock = FakeClock()
+    alice = netstats.NetStats("player-1", clock=clock, ping_interval=1.0)
+    bob = netstats.NetStats("player-2", clock=clock)
+    ping = alice.ping()
+    assert alice.ping() is None
+    clock.now += 0.080
+    alice.on_pong(bob.pong(ping))
+    # pong para outro jogador é ignorado
+    alice.on_pong(dict(bob.pong(ping), to="player-9"))
+    peer = alice.summary()["player-2"]
+    assert peer["rtt_p50"] == 80
+    assert peer["latency"] == 40
+    clock.now += 1.0
+    assert alice.ping()["ping_id"] == 2
+
+
+def test_addressed_ping():
+    stats = netstats.NetStats("player-1", clock=FakeClock())
+    ping = stats.ping(to="player-2")
+    assert ping["to"] == "player-2"
+    assert stats.pong(ping)["to"] == "player-1"
+
+
+def test_silent_peer_expires():
+    clock = FakeClock()
+    stats = netstats.NetStats("player-1", clock=clock)
+    stats.on_state(state("player-2", 0))
+    clock.now += netstats.PEER_TIMEOUT + 1
+    assert stats.summary() == {}
+
+
+def test_percentile():
+    assert netstats.percentile([], 0.5) is None
+    values = list(range(1, 101))
+    assert netstats.percentile(values, 0.5) in (50, 51)
+    assert netstats.percentile(values, 0.99) == 99
+
+
+def test_metrics_exporter(tmp_path):
+    clock = FakeClock(0.0)
+    path = tmp_path / "metrics.jsonl"
+    exporter = netstats.MetricsExporter(str(path), interval=10.0, clock=clock)
+    stats = netstats.NetStats("player-1", clock=FakeClock())
+    assert not exporter.maybe_export(stats)
+    clock.now = 10.0
+    assert exporter.maybe_export(stats, {"tick": 600})
+    record = json.loads(path.read_text().splitlines()[0])
+    assert (record["player_id"], record["tick"], record["peers"]) == ("player-1", 600, {})
+
+
+def test_pong_reports_loss_of_our_states():
+    clock = FakeClock()
+    alice = netstats.NetStats("player-1", clock=clock)
+    bob = netstats.NetStats("player-2", clock=clock)
+    assert alice.reported_loss() is None
+    # bob recebeu os estados de alice com 1 perdido em 10
+    for seq in (0, 1, 2, 3, 5, 6, 7, 8, 9):
+        bob.on_state(state("player-1", seq))
+    pong = bob.pong(alice.ping())
+    alice.on_pong(pong)
+    assert alice.reported_loss() == pytest.approx(0.1)
+    assert alice.summary()["player-2"]["reported_loss"] == pytest.approx(0.1)
@@ -0,0 +1,30 @@
+from pipe_schedule import PipeSchedule, splitmix64
+
+
+def test_heights_depend_only_on_seed_and_index():
+    first = PipeSchedule(42, 100, 400, batch_size=8)
+    second = PipeSchedule(42, 100, 400, batch_size=64)
+    # ordem de acesso e tamanho do lote não mudam as alturas
+    late = [second[index] for index in range(200, 0, -1)]
+    assert [first[index] for index in range(200, 0, -1)] == late
+    assert first[5] == first.height(5)
+
+
+def test_heights_stay_in_range():
+    schedule = PipeSchedule(7, 100, 400)
+    heights = [schedule[index] for index in range(5000)]
+    assert min(heights) >= 100 and max(heights) <= 400
+    # todas as alturas aparecem, sem viés grosseiro para um lado
+    assert min(heights) == 100 and max(heights) == 400
+    assert 230 < sum(heights) / len(heights) < 270
+
+
+def test_neighbouring_seeds_differ():
+    a = [PipeSchedule(1000, 100, 400)[index] for index in range(20)]
+    b = [PipeSchedule(1001, 100, 400)[index] for index in range(20)]
+    assert a != b
+
+
+def test_splitmix64_known_value():
+    # primeiro valor da sequência de referência do splitmix64 com estado 0
+    assert splitmix64(0) == 0xE220A8397B1DCDAF
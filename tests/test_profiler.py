@@ -0,0 +1,97 @@
+import csv
+import json
+
+import profiler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_frame(prof, clock, phases, counts=()):
+    prof.begin_frame()
+    for name, ms in phases:
+        clock.now += ms / 1000
+        prof.mark(name)
+    for name in counts:
+        prof.count(name)
+    prof.end_frame()
+
+
+def test_phases_and_counters():
+    clock = FakeClock()
+    prof = profiler.FrameProfiler(clock=clock)
+    run_frame(prof, clock, [("input", 1), ("update", 2), ("input", 1)], ["font.render"] * 3)
+    run_frame(prof, clock, [("input", 3), ("draw", 10)])
+    summary = prof.summary()
+    assert summary["frames"] == 2
+    assert list(summary["phases"]) == ["input", "update", "draw"]
+    # a mesma fase marcada duas vezes no frame soma
+    assert abs(summary["phases"]["input"]["mean_ms"] - 2.5) < 1e-9
+    assert summary["counters"]["font.render"] == {"total": 3, "per_frame": 1.5}
+    assert summary["worst_frames"][0]["frame"] == 2
+    assert summary["frame"]["histogram"]["<=4"] == 1
+    assert summary["frame"]["histogram"]["<=16.7"] == 1
+
+
+def test_worst_frames_are_bounded():
+    clock = FakeClock()
+    prof = profiler.FrameProfiler(clock=clock)
+    for ms in range(1, profiler.WORST_FRAMES * 2 + 1):
+        run_frame(prof, clock, [("update", ms)])
+    worst = prof.summary()["worst_frames"]
+    assert len(worst) == profiler.WORST_FRAMES
+    assert round(worst[0]["ms"]) == profiler.WORST_FRAMES * 2
+    assert round(worst[-1]["ms"]) == profiler.WORST_FRAMES + 1
+
+
+def test_disabled_profiler_records_nothing():
+    clock = FakeClock()
+    prof = profiler.FrameProfiler(enabled=False, clock=clock)
+    run_frame(prof, clock, [("update", 5)], ["x"])
+    assert prof.summary()["frames"] == 0
+    font = object()
+    assert prof.wrap_font(font) is font
+
+
+def test_count_calls():
+    class Thing:
+        def __init__(self):
+            pass
+
+    prof = profiler.FrameProfiler(clock=FakeClock())
+    prof.count_calls(Thing, '__init__', 'Thing')
+    prof.begin_frame()
+    Thing()
+    Thing()
+    prof.end_frame()
+    assert prof.summary()["counters"]["Thing"]["total"] == 2
+
+
+def test_dump_csv_and_json(tmp_path):
+    clock = FakeClock()
+    prof = profiler.FrameProfiler(clock=clock)
+    run_frame(prof, clock, [("update", 2)], ["pipes"])
+    run_frame(prof, clock, [("draw", 4)])
+    with open(prof.dump(str(tmp_path / "frames.csv")), newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["frame", "total_ms", "update_ms", "draw_ms", "pipes"]
+    assert rows[1][2:] == ["2.000", "0.000", "1"]
+    assert json.loads(open(prof.dump(str(tmp_path / "summary.json"))).read())["frames"] == 2
+
+
+def test_capture_writes_profile(tmp_path):
+    prof = profiler.FrameProfiler(clock=FakeClock())
+    path = str(tmp_path / "capture.prof")
+    assert prof.capture(frames=2, path=path)
+    assert not prof.capture(frames=2)
+    for _ in range(2):
+        prof.begin_frame()
+        sum(range(100))
+        prof.end_frame()
+    assert (tmp_path / "capture.prof").exists()
+    assert prof.last_capture_report
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+import topics
+import wire
+from relay import SpectatorRelay, KEYFRAME_INTERVAL, MATCH_IDLE_SECONDS
+from simulation import project
+from transport import LoopbackNetwork, VirtualClock
+
+
+def state(color, y, tick, game_state='playing', velocity=None):
+    number = 1 if color == 'red' else 2
+    return wire.encode_state({"player_id": f"player-{number}", "color": color, "y": y, "score": 0,
+                              "alive": True, "game_state": game_state, "tick": tick, "velocity": velocity})
+
+
+def setup():
+    clock = VirtualClock(100.0)
+    network = LoopbackNetwork(clock=clock)
+    relay_link = network.transport('relay')
+    relay = SpectatorRelay(relay_link, frame_rate=10, clock=clock)
+    relay_link.connect()
+    player = network.transport('player-1')
+    player.connect()
+    return clock, network, relay, player
+
+
+def spectator(network):
+    link = network.transport()
+    link.subscribe(topics.spectate_topic())
+    link.connect()
+    return link
+
+
+def frames(link):
+    return [wire.decode(message.payload) for message in link.receive() if message.payload]
+
+
+def test_states_are_merged_into_one_frame():
+    clock, network, relay, player = setup()
+    viewer = spectator(network)
+    player.publish(topics.LEGACY_TOPIC, json.dumps({"player_id": "player-1", "seed": 99}))
+    for tick in range(3):
+        player.publish(topics.LEGACY_TOPIC, state('red', 100 + tick, tick))
+    player.publish(topics.LEGACY_TOPIC, state('blue', 300, 2))
+    network.pump()
+    relay.step()
+    received = frames(viewer)
+    # só o último estado de cada cor, num quadro só
+    assert len(received) == 1
+    frame = received[0]
+    assert (frame["seed"], frame["game_state"], frame["tick"]) == (99, 'playing', 2)
+    assert [bird["y"] for bird in frame["birds"]] == [102, 300]
+
+
+def test_unchanged_match_sends_nothing():
+    clock, network, relay, player = setup()
+    viewer = spectator(network)
+    player.publish(topics.LEGACY_TOPIC, state('red', 100, 1))
+    network.pump()
+    relay.step()
+    clock.advance(0.1)
+    relay.step()
+    assert len(frames(viewer)) == 1
+    assert relay.frames == 1
+
+
+def test_late_spectator_gets_the_keyframe():
+    clock, network, relay, player = setup()
+    player.publish(topics.LEGACY_TOPIC, json.dumps({"player_id": "player-1", "seed": 7}))
+    network.pump()
+    relay.step()
+    for tick in range(1, 30):
+        clock.advance(0.1)
+        player.publish(topics.LEGACY_TOPIC, state('red', 100 + tick, tick))
+        network.pump()
+        relay.step()
+    # keyframes no início da partida e depois no máximo um por KEYFRAME_INTERVAL
+    assert 2 <= relay.keyframes <= 2 + 3 / KEYFRAME_INTERVAL
+    late = spectator(network)
+    retained = frames(late)
+    assert len(retained) == 1
+    assert retained[0]["seed"] == 7 and retained[0]["tick"] > 0
+
+
+def test_match_channels_and_idle_matches():
+    clock, network, relay, player = setup()
+    viewer = network.transport()
+    viewer.subscribe(topics.spectate_topic('abc'))
+    viewer.connect()
+    player.publish(topics.match_topic('abc', topics.GAME), state('blue', 250, 5))
+    network.pump()
+    relay.step()
+    assert frames(viewer)[0]["birds"][1]["y"] == 250
+    clock.advance(MATCH_IDLE_SECONDS + 1)
+    relay.step()
+    assert 'abc' not in relay.views
+    late = network.transport()
+    late.subscribe(topics.spectate_topic('abc'))
+    late.connect()
+    assert frames(late) == []
+
+
+def test_birds_are_projected_to_the_frame_tick():
+    clock, network, relay, player = setup()
+    viewer = spectator(network)
+    # o vermelho só mandou o estado do pulo, no tick 10; o azul está no tick 40
+    player.publish(topics.LEGACY_TOPIC, state('red', 300.0, 10, velocity=-8.0))
+    player.publish(topics.LEGACY_TOPIC, state('blue', 200.0, 40))
+    network.pump()
+    relay.step()
+    red, blue = frames(viewer)[0]["birds"]
+    y, velocity = project(300.0, -8.0, 30)
+    assert red["y"] == pytest.approx(y, abs=1e-3) and red["velocity"] == pytest.approx(velocity)
+    assert blue["y"] == 200.0
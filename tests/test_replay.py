@@ -0,0 +1,150 @@
+import random
+
+import pytest
+
+from lockstep import LockstepSession
+from replay import Replay, ReplayError, ReplayPlayer, ReplayWriter, checksum, CHECKSUM_INTERVAL, VERSION, Y_TOLERANCE
+from simulation import World, Bird, BIRD_X, HEIGHT, should_jump
+
+
+def record_match(path, ticks, seed=17, remote=False):
+    # partida do piloto; com remote, o pássaro 1 não é simulado e o y vem de "fora"
+    world = World(seed=seed)
+    if remote:
+        world.birds[1].simulated = False
+    writer = ReplayWriter(str(path), world, keyframe_interval=300)
+    rng = random.Random(seed)
+    for _ in range(ticks):
+        jumps = [0] if should_jump(world.birds[0], world.track) else []
+        world.step(jumps)
+        if remote:
+            bird = world.birds[1]
+            bird.y = 350 + 150 * rng.random() if world.tick % 40 == 0 else bird.y + rng.uniform(-3, 3)
+            bird.is_alive = True
+        writer.record(world.tick - 1, jumps, world.save_state())
+        if world.game_over:
+            break
+    writer.close()
+    return world
+
+
+def play(path):
+    replay = Replay(str(path))
+    player = ReplayPlayer(replay)
+    while not player.finished:
+        player.step()
+    return replay, player
+
+
+def test_replay_verifies(tmp_path):
+    path = tmp_path / 'match.flr'
+    world = record_match(path, 2000)
+    replay, player = play(path)
+    assert player.mismatches == []
+    assert player.world.save_state()[0] == world.save_state()[0]
+    assert replay.end[2] == [bird.score for bird in world.birds]
+    replay.close()
+
+
+def test_replay_with_remote_bird_verifies(tmp_path):
+    path = tmp_path / 'remote.flr'
+    world = record_match(path, 2000, remote=True)
+    replay, player = play(path)
+    assert player.mismatches == []
+    # o y remoto é o previsto, a menos de Y_TOLERANCE do original
+    assert player.world.birds[1].y == pytest.approx(world.birds[1].y, abs=Y_TOLERANCE)
+    replay.close()
+
+
+def test_seek_matches_playing_from_start(tmp_path):
+    path = tmp_path / 'seek.flr'
+    record_match(path, 2000, remote=True)
+    replay = Replay(str(path))
+    assert replay.keyframes
+    sequential = ReplayPlayer(replay)
+    sought = ReplayPlayer(replay)
+    for target in (1234, 650, 301, 1900):
+        sequential.restart()
+        while sequential.world.tick < target and not sequential.finished:
+            sequential.step()
+        sought.seek(target)
+        assert sought.world.tick == sequential.world.tick
+        assert checksum(sought.world.save_state()) == checksum(sequential.world.save_state())
+    replay.close()
+
+
+def test_remote_bird_is_stored_as_adjustments(tmp_path):
+    # o pássaro remoto segue a física (pula a cada 30 ticks): o arquivo só guarda os
+    # pulos dele, não um registro por tick
+    path = tmp_path / 'remote.flr'
+    world = World(seed=3, judge_collisions=False)
+    world.birds[1].simulated = False
+    writer = ReplayWriter(str(path), world)
+    shadow = Bird(BIRD_X, HEIGHT // 2)
+    for _ in range(600):
+        world.step()
+        if world.tick % 30 == 0:
+            shadow.jump()
+        shadow.move()
+        world.birds[1].y = shadow.y
+        writer.record(world.tick - 1, [], world.save_state())
+    writer.close()
+    replay, player = play(path)
+    adjustments = sum(1 for _, values in replay.records() if values[0] == 3)
+    replay.close()
+    assert player.mismatches == []
+    # um por pulo, mais os do começo (velocidade ainda desconhecida) e do keyframe
+    assert adjustments <= 600 // 30 + 5
+
+
+def test_replay_without_trailer_is_scanned(tmp_path):
+    path = tmp_path / 'crashed.flr'
+    record_match(path, 2000)
+    indexed = Replay(str(path))
+    keyframes = list(indexed.keyframes)
+    indexed.close()
+    # jogo que caiu: o arquivo termina no meio de um registro, sem END nem índice
+    data = path.read_bytes()
+    path.write_bytes(data[:keyframes[-1][1] + 3])
+    replay = Replay(str(path))
+    assert replay.keyframes == keyframes[:-1]
+    assert replay.end[2] is None
+    replay.close()
+
+
+def test_tampered_replay_is_detected(tmp_path):
+    path = tmp_path / 'tampered.flr'
+    record_match(path, 2000)
+    replay = Replay(str(path))
+    # troca o primeiro pulo de pássaro: a partida reproduzida diverge
+    offset = next(offset for offset, values in replay.records() if values[0] == 2)
+    replay.close()
+    data = bytearray(path.read_bytes())
+    data[offset + 5] ^= 0x03
+    path.write_bytes(bytes(data))
+    _, player = play(path)
+    assert player.mismatches
+    assert player.mismatches[0] % CHECKSUM_INTERVAL == CHECKSUM_INTERVAL - 1
+
+
+def test_other_versions_are_rejected(tmp_path):
+    path = tmp_path / 'old.flr'
+    record_match(path, 100)
+    data = bytearray(path.read_bytes())
+    data[4] = VERSION - 1
+    path.write_bytes(bytes(data))
+    with pytest.raises(ReplayError):
+        Replay(str(path))
+
+
+def test_lockstep_final_ticks(tmp_path):
+    # o replay de uma sessão lockstep só recebe ticks fora da janela de rollback
+    session = LockstepSession(World(seed=5), local_index=0, input_delay=0, max_rollback=10)
+    session.start()
+    final = []
+    session.on_final = lambda tick, inputs, state: final.append(tick)
+    for _ in range(50):
+        session.advance()
+    assert final == list(range(40))
+    session.flush()
+    assert final == list(range(50))
@@ -0,0 +1,125 @@
+import json
+
+import topics
+import wire
+from server import MatchServer
+from transport import LoopbackNetwork
+
+
+class Player:
+    def __init__(self, network, player_id, match_id='abc'):
+        self.player_id = player_id
+        self.match_id = match_id
+        self.link = network.transport(player_id)
+        self.link.subscribe(f'{topics.ROOT}/{match_id}/#')
+        self.link.connect()
+        self.received = []
+
+    def send(self, message):
+        message["player_id"] = self.player_id
+        self.link.publish(topics.input_topic(self.match_id), json.dumps(message))
+
+    def read(self):
+        self.received += self.link.receive()
+        return self.received
+
+    def control(self):
+        return [json.loads(message.payload) for message in self.read()
+                if message.topic.endswith('/' + topics.CONTROL)]
+
+    def states(self):
+        return [wire.decode(message.payload) for message in self.read()
+                if message.topic.endswith('/' + topics.STATE)]
+
+
+def new_server(network, **kwargs):
+    link = network.transport('server')
+    server = MatchServer(link, seed=1, **kwargs)
+    link.connect()
+    return server
+
+
+def tick(network, server, count=1):
+    for _ in range(count):
+        network.pump()
+        server.tick()
+    network.pump()
+
+
+def test_topics():
+    topic = topics.match_topic('abc', topics.STATE)
+    assert topic == 'flappybird/abc/state'
+    assert topics.parse(topic) == ('abc', topics.STATE)
+    assert topics.parse(topics.LEGACY_TOPIC) is None
+    assert topics.matches(topics.all_matches(topics.STATE), topic)
+    assert topics.matches('flappybird/#', topic)
+    assert not topics.matches(topics.all_matches(topics.CONTROL), topic)
+    assert not topics.matches('flappybird/+', topic)
+
+
+def test_input_topic_carries_the_shard():
+    topic = topics.input_topic('abc')
+    assert topic == f'flappybird/abc/input/{topics.shard("abc")}'
+    assert topics.parse(topic) == ('abc', topics.INPUT)
+    assert topics.matches(topics.shard_inputs(topics.shard('abc')), topic)
+    assert not topics.matches(topics.shard_inputs((topics.shard('abc') + 1) % topics.INPUT_SHARDS), topic)
+    # só o canal de entrada tem o quarto nível
+    assert topics.parse('flappybird/abc/state/3') is None
+
+
+def test_match_flow():
+    network = LoopbackNetwork()
+    server = new_server(network)
+    players = [Player(network, f'player-{number}') for number in (1, 2, 3)]
+    for player in players:
+        player.send({"type": "join"})
+    tick(network, server)
+    replies = players[0].control()
+    assert [(reply["type"], reply["to"], reply["bird"]) for reply in replies] == [
+        ("joined", "player-1", 0), ("joined", "player-2", 1), ("rejected", "player-3", None)]
+
+    players[0].send({"type": "start"})
+    players[1].send({"type": "input", "bird": 0})   # pássaro de outro: ignorado
+    tick(network, server, 6)
+    match = server.matches['abc']
+    assert match.state == 'playing'
+    assert "seed" in players[1].control()[-1]
+    assert {state["color"] for state in players[2].states()} == {"red", "blue"}
+    assert match.world.birds[0].velocity > 0
+
+
+def test_late_joiner_gets_the_retained_seed():
+    network = LoopbackNetwork()
+    server = new_server(network)
+    player = Player(network, 'player-1')
+    player.send({"type": "join"})
+    player.send({"type": "start"})
+    tick(network, server)
+    late = Player(network, 'player-9')
+    network.pump()
+    assert late.control()[0]["seed"] == server.matches['abc'].world.schedule.seed
+
+
+def test_each_match_has_one_owner():
+    network = LoopbackNetwork()
+    workers = [MatchServer(network.transport(), worker_index=index, worker_count=3) for index in range(3)]
+    for number in range(100):
+        assert sum(worker.owns(f'match-{number}') for worker in workers) == 1
+
+
+def test_workers_only_receive_their_matches():
+    network = LoopbackNetwork()
+    workers = [MatchServer(network.transport(f'worker-{index}'), seed=1, worker_index=index, worker_count=3)
+               for index in range(3)]
+    received = {index: [] for index in range(3)}
+    for index, worker in enumerate(workers):
+        worker.link.on_message = lambda message, index=index: received[index].append(message.topic)
+        worker.link.connect()
+    for number in range(60):
+        Player(network, f'player-{number}', match_id=f'match-{number}').send({"type": "join"})
+    network.pump()
+    for index, worker in enumerate(workers):
+        worker.link.poll()
+        assert received[index]
+        assert all(worker.owns(topics.parse(topic)[0]) for topic in received[index])
+    assert sum(len(topics_received) for topics_received in received.values()) == 60
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from pipe_track import PipeTrack
+from simulation import (World, Bird, Pipe, BIRD_X, HEIGHT, WIDTH, PIPE_WIDTH, PIPE_SPEED, SPAWN_INTERVAL,
+                        GRAVITY, JUMP_STRENGTH, EVENT_SPAWN, EVENT_SCORE, EVENT_DEATH, EVENT_GAME_OVER,
+                        check_collision, rects_collide, should_jump, project)
+
+
+def brute_force_collision(bird, track):
+    # o hitbox do pássaro contra os dois retângulos de todos os canos
+    hitbox = bird.hitbox()
+    return any(rects_collide(hitbox, box) for pipe in track for box in pipe.hitboxes())
+
+
+def random_track(rng):
+    # pista densa, com canos encostados e sobrepostos em x
+    track = PipeTrack(PIPE_WIDTH)
+    track.advance(rng.randrange(0, 5000))
+    x = rng.randrange(-100, 100)
+    for _ in range(rng.randrange(0, 12)):
+        track.add(Pipe(x, rng.randrange(0, HEIGHT)))
+        x += rng.randrange(0, 2 * PIPE_WIDTH)
+    return track
+
+
+def test_rects_collide_like_pygame():
+    assert rects_collide((0, 0, 10, 10), (5, 5, 10, 10))
+    # bordas encostadas não contam
+    assert not rects_collide((0, 0, 10, 10), (10, 0, 10, 10))
+    # retângulo vazio nunca colide
+    assert not rects_collide((0, 0, 0, 10), (0, 0, 10, 10))
+
+
+def test_check_collision_matches_brute_force():
+    rng = random.Random(3)
+    for _ in range(200):
+        track = random_track(rng)
+        for y in range(-20, HEIGHT + 20, 7):
+            bird = Bird(BIRD_X, y + rng.random())
+            expected = brute_force_collision(bird, track)
+            assert check_collision(bird, track) == expected
+            assert bird.is_alive == (not expected)
+
+
+def test_first_reaching_matches_linear_scan():
+    rng = random.Random(8)
+    for _ in range(200):
+        track = random_track(rng)
+        for world_x in range(track.offset - 200, track.offset + 1200, 13):
+            expected = next((index for index, pipe in enumerate(track.pipes)
+                             if pipe.world_x + PIPE_WIDTH > world_x), len(track.pipes))
+            assert track.first_reaching(world_x) == expected
+
+
+def test_bird_physics():
+    bird = Bird(BIRD_X, 300)
+    bird.jump()
+    bird.move()
+    assert (bird.y, bird.velocity) == (300 + JUMP_STRENGTH + GRAVITY, JUMP_STRENGTH + GRAVITY)
+    bird.is_alive = False
+    bird.jump()
+    bird.move()
+    assert bird.y == 300 + JUMP_STRENGTH + GRAVITY
+
+
+def test_step_events():
+    world = World(seed=1)
+    events = []
+    for _ in range(SPAWN_INTERVAL):
+        events += world.step()
+    spawns = [event for event in events if event[0] == EVENT_SPAWN]
+    assert len(spawns) == 1
+    assert spawns[0][1].x == WIDTH - PIPE_SPEED
+    # sem pular, os dois caem, morrem no chão e a partida acaba uma vez só
+    assert sorted(event[1] for event in events if event[0] == EVENT_DEATH) == [0, 1]
+    assert [event for event in events if event[0] == EVENT_GAME_OVER] == [(EVENT_GAME_OVER,)]
+    assert world.game_over and world.tick == SPAWN_INTERVAL
+
+
+def test_scoring_counts_each_pipe_once():
+    track = PipeTrack(PIPE_WIDTH)
+    # abertura na altura do pássaro
+    track.add(Pipe(BIRD_X + 10, 200))
+    bird = Bird(BIRD_X, 300)
+    scores = []
+    for _ in range(60):
+        track.advance(PIPE_SPEED)
+        check_collision(bird, track)
+        scores.append(bird.score)
+    assert bird.is_alive
+    assert scores[-1] == 1
+
+
+def test_non_simulated_bird_keeps_its_y():
+    world = World(seed=2)
+    world.birds[1].simulated = False
+    world.birds[1].y = 123.0
+    world.step([0, 1])
+    assert world.birds[1].y == 123.0
+    assert world.birds[0].velocity == JUMP_STRENGTH + GRAVITY
+
+
+def test_same_rng_same_match():
+    def play(seed):
+        world = World(seed=seed)
+        for tick in range(3000):
+            world.step([0] if tick % 22 == 0 else [])
+        return [bird.y for bird in world.birds], [pipe.y_top_end for pipe in world.track]
+
+    assert play(11) == play(11)
+
+
+def test_fast_forward_matches_stepping():
+    stepped = World(seed=9, judge_collisions=False)
+    for _ in range(1000):
+        stepped.step()
+    jumped = World(seed=9, judge_collisions=False)
+    jumped.fast_forward(1000)
+    assert jumped.track.offset == stepped.track.offset
+    assert jumped.spawn_timer == stepped.spawn_timer
+    assert [(pipe.index, pipe.world_x, pipe.y_top_end) for pipe in jumped.track] == \
+        [(pipe.index, pipe.world_x, pipe.y_top_end) for pipe in stepped.track]
+
+
+def test_late_seed_fixes_pipes_on_screen():
+    late = World(seed=0, judge_collisions=False)
+    for _ in range(600):
+        late.step()
+    late.set_seed(77)
+    right = World(seed=77, judge_collisions=False)
+    for _ in range(600):
+        right.step()
+    assert [pipe.y_top_end for pipe in late.track] == [pipe.y_top_end for pipe in right.track]
+
+
+def test_autopilot_survives():
+    world = World(seed=4)
+    for _ in range(3000):
+        world.step([index for index, bird in enumerate(world.birds) if should_jump(bird, world.track)])
+    assert not world.game_over
+    assert min(bird.score for bird in world.birds) >= 10
+
+
+def test_project_matches_moving():
+    bird = Bird(BIRD_X, 300)
+    bird.jump()
+    bird.move()
+    y, velocity = bird.y, bird.velocity
+    for ticks in range(1, 40):
+        bird.move()
+        assert project(y, velocity, ticks) == pytest.approx((bird.y, bird.velocity))
@@ -0,0 +1,150 @@
+from pipe_track import PipeTrack
+from simulation import Bird, Pipe, PIPE_WIDTH
+from snapshots import (SnapshotSender, SnapshotReceiver, capture, apply_to_track, receive_snapshot, HISTORY_SIZE,
+                       ACK_TIMEOUT)
+
+
+def make_track(heights, offset=0):
+    track = PipeTrack(PIPE_WIDTH)
+    for position, height in enumerate(heights):
+        track.add(Pipe(300 * position, height))
+    track.advance(offset)
+    return track
+
+
+def state_of(track, **fields):
+    return capture(track, dict({"scores": [0, 0], "alive": [True, True], "state": "playing"}, **fields))
+
+
+def test_keyframe_round_trip():
+    sender, receiver = SnapshotSender(), SnapshotReceiver()
+    state = state_of(make_track([100, 200, 300], offset=30))
+    message = sender.make(state)
+    assert message["key"]
+    assert receiver.apply(message) == state
+
+
+def test_delta_against_acked_baseline():
+    sender, receiver = SnapshotSender(keyframe_interval=100), SnapshotReceiver()
+    track = make_track([100, 200, 300])
+    receiver.apply(sender.make(state_of(track)))
+    sender.ack('p2', 1)
+    track.advance(30)
+    track.add(Pipe(900, 400))
+    state = state_of(track, scores=[1, 0])
+    message = sender.make(state)
+    assert message["base"] == 1
+    # só o cano novo e o placar; os outros canos não mudaram desde a base
+    assert [pipe[0] for pipe in message["spawn"]] == [3]
+    assert message["despawn"] == []
+    assert message["scores"] == [1, 0] and "alive" not in message
+    assert receiver.apply(message) == state
+
+
+def test_despawned_pipes_leave_the_delta():
+    sender, receiver = SnapshotSender(keyframe_interval=100), SnapshotReceiver()
+    track = make_track([100, 200])
+    receiver.apply(sender.make(state_of(track)))
+    sender.ack('p2', 1)
+    track.advance(PIPE_WIDTH + 1)
+    message = sender.make(state_of(track))
+    assert message["despawn"] == [0]
+    assert sorted(receiver.apply(message)["pipes"]) == [1]
+
+
+def test_baseline_is_the_oldest_ack():
+    sender = SnapshotSender(keyframe_interval=100)
+    track = make_track([100])
+    for _ in range(3):
+        sender.make(state_of(track))
+    sender.ack('p2', 3)
+    sender.ack('spectator', 2)
+    sender.ack('spectator', 1)   # ack velho não volta a base
+    assert sender.make(state_of(track))["base"] == 2
+
+
+def test_no_ack_means_keyframe():
+    sender = SnapshotSender(keyframe_interval=100)
+    track = make_track([100])
+    sender.make(state_of(track))
+    assert sender.make(state_of(track))["key"]
+
+
+def test_periodic_and_requested_keyframes():
+    sender = SnapshotSender(keyframe_interval=4)
+    track = make_track([100])
+    keys = []
+    for seq in range(1, 9):
+        sender.ack('p2', seq - 1 if seq > 1 else None)
+        keys.append(bool(sender.make(state_of(track)).get("key")))
+    assert keys == [True, False, False, True, False, False, False, True]
+    sender.ack('p2', 8, need_keyframe=True)
+    assert sender.make(state_of(track))["key"]
+
+
+def test_ack_older_than_history_is_ignored():
+    sender = SnapshotSender(keyframe_interval=1000)
+    track = make_track([100])
+    sender.make(state_of(track))
+    sender.ack('slow', 1)
+    for _ in range(HISTORY_SIZE + 1):
+        sender.make(state_of(track))
+    # a base do 'slow' saiu do histórico: sem outro ack, keyframe
+    assert sender.make(state_of(track))["key"]
+
+
+def test_silent_acker_stops_holding_the_baseline():
+    sender = SnapshotSender(keyframe_interval=1000)
+    track = make_track([100])
+    sender.make(state_of(track))
+    sender.ack('gone', 1)
+    for seq in range(2, 10):
+        sender.ack('p2', seq - 1)
+        message = sender.make(state_of(track))
+        # quem parou de confirmar segura a base só por ACK_TIMEOUT snapshots
+        expected = 1 if seq - 1 <= ACK_TIMEOUT else seq - 1
+        assert message["base"] == expected
+
+
+def test_receiver_without_baseline_and_stale_messages():
+    sender, receiver = SnapshotSender(keyframe_interval=100), SnapshotReceiver()
+    track = make_track([100])
+    first = sender.make(state_of(track))
+    sender.ack('p2', 1)
+    delta = sender.make(state_of(track))
+    # o keyframe se perdeu: o delta não tem base
+    assert receiver.apply(delta) is None
+    receiver.apply(first)
+    assert receiver.apply(delta) is not None
+    assert receiver.apply(delta) is None
+
+
+def test_apply_to_track_reuses_pipes():
+    source = make_track([100, 200, 300], offset=40)
+    target = make_track([100, 200])
+    kept = list(target)
+    apply_to_track(target, state_of(source), Pipe)
+    assert target.offset == source.offset
+    assert [(pipe.index, pipe.world_x, pipe.y_top_end) for pipe in target] == \
+        [(pipe.index, pipe.world_x, pipe.y_top_end) for pipe in source]
+    assert list(target)[:2] == kept
+    assert target.spawned == 3
+
+
+def test_receive_snapshot_updates_track_and_birds():
+    sender, receiver = SnapshotSender(keyframe_interval=100), SnapshotReceiver()
+    source = make_track([100, 200, 300], offset=40)
+    target = make_track([])
+    birds = (Bird(50, 100), Bird(50, 100))
+    state = state_of(source, scores={"red": 2, "blue": 1}, alive={"red": True, "blue": False})
+    snapshot, reply = receive_snapshot(receiver, sender.make(state), target, birds, Pipe, 'p2')
+    assert snapshot == state and target.offset == 40
+    assert [(bird.score, bird.is_alive) for bird in birds] == [(2, True), (1, False)]
+    assert reply == {"type": "snapshot_ack", "player_id": 'p2', "seq": 1}
+
+    # delta sobre uma base que o receptor não tem: pede keyframe
+    sender.ack('p2', 1)
+    sender.make(state)
+    sender.ack('p2', 2)
+    snapshot, reply = receive_snapshot(SnapshotReceiver(), sender.make(state), target, birds, Pipe, 'p2')
+    assert snapshot is None and reply["need_keyframe"]
@@ -0,0 +1,49 @@
+from state_sender import StateSender, keyframe_interval, KEYFRAME_MAX_TICKS, KEYFRAME_MIN_TICKS, REPEAT_TICKS
+
+
+def sends(sender, ticks, jumps=(), alive=True, score=0, game_state='playing'):
+    return [tick for tick in ticks if sender.should_send(tick, tick in jumps, alive, score, game_state)]
+
+
+def test_keyframe_interval_follows_loss():
+    assert keyframe_interval(None) == KEYFRAME_MAX_TICKS
+    assert keyframe_interval(0.0) == KEYFRAME_MAX_TICKS
+    assert keyframe_interval(0.1) == (KEYFRAME_MAX_TICKS + KEYFRAME_MIN_TICKS) // 2
+    assert keyframe_interval(0.9) == KEYFRAME_MIN_TICKS
+
+
+def test_events_and_keyframes():
+    sender = StateSender()
+    sent = sends(sender, range(200), jumps={30, 31, 100})
+    # primeiro estado na hora, pulos na hora e keyframes 60 ticks depois do último envio
+    assert sent == [0, 30, 31, 91, 100, 160]
+    assert (sender.events, sender.keyframes) == (4, 2)
+
+
+def test_state_changes_are_events():
+    sender = StateSender()
+    assert sender.should_send(0, False, True, 0, 'playing')
+    assert not sender.should_send(1, False, True, 0, 'playing')
+    assert sender.should_send(2, False, True, 1, 'playing')
+    assert sender.should_send(3, False, False, 1, 'playing')
+    assert sender.should_send(4, False, False, 1, 'game_over')
+
+
+def test_events_are_repeated_with_loss():
+    sender = StateSender()
+    sender.adapt(0.05)
+    assert sender.repeat
+    sent = sends(sender, range(60), jumps={10})
+    assert sent[:3] == [0, 0 + REPEAT_TICKS, 10] and 10 + REPEAT_TICKS in sent
+    assert sender.repeats >= 2
+    sender.adapt(0.0)
+    assert (sender.repeat, sender.interval) == (False, KEYFRAME_MAX_TICKS)
+
+
+def test_reset_sends_right_away():
+    sender = StateSender()
+    assert sender.should_send(500, False, True, 0, 'playing')
+    sender.reset()
+    # tick voltou para 0 na partida nova
+    assert sender.should_send(0, False, True, 0, 'playing')
+    assert not sender.should_send(1, False, True, 0, 'playing')
@@ -0,0 +1,47 @@
+import pytest
+
+from timestep import FixedTimestep, lerp
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ticks_follow_real_time():
+    clock = FakeClock()
+    timestep = FixedTimestep(tick_rate=60, clock=clock)
+    assert timestep.advance() == 0
+    ticks = 0
+    # 40 FPS durante 1 s: os mesmos 60 ticks
+    for _ in range(40):
+        clock.now += 1 / 40
+        ticks += timestep.advance()
+    assert ticks in (59, 60)
+    assert 0 <= timestep.alpha <= 1
+
+
+def test_catch_up_is_capped():
+    clock = FakeClock()
+    timestep = FixedTimestep(tick_rate=60, max_catchup_ticks=5, clock=clock)
+    timestep.advance()
+    clock.now += 1.0
+    assert timestep.advance() == 5
+    assert timestep.dropped_ticks == 55
+    assert timestep.accumulator == 0.0
+
+
+def test_reset_forgets_the_last_frame():
+    clock = FakeClock()
+    timestep = FixedTimestep(clock=clock)
+    timestep.advance()
+    clock.now += 10
+    timestep.reset()
+    assert timestep.advance() == 0
+
+
+def test_lerp():
+    assert lerp(10, 20, 0.25) == pytest.approx(12.5)
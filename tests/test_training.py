@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import training
+from pipe_schedule import PipeSchedule, splitmix64
+from simulation import PIPE_MIN_Y, PIPE_MAX_Y
+from training import VecEnv, ShardedEnv, NoisyAutopilot, autopilot
+
+
+def test_vec_env_matches_world():
+    # training.verify compara cada partida com uma simulation.World tick a tick
+    assert training.verify(40, 3000, seed=5)
+
+
+def test_pipe_heights_match_schedule():
+    seeds = [0, 1, 12345, 2 ** 31 - 1]
+    keys = training.splitmix64(np.array(seeds, dtype=np.uint64))
+    assert keys.tolist() == [splitmix64(seed) for seed in seeds]
+    for index in (0, 1, 99):
+        heights = training.pipe_heights(keys, np.full(len(seeds), index))
+        assert heights.tolist() == [PipeSchedule(seed, PIPE_MIN_Y, PIPE_MAX_Y).height(index) for seed in seeds]
+
+
+def test_reset_checks_seed_count():
+    with pytest.raises(ValueError):
+        VecEnv(3).reset([1, 2])
+
+
+def test_autoreset_and_max_ticks():
+    env = VecEnv(4, autoreset=True, max_ticks=50)
+    env.reset([10, 11, 12, 13])
+    done_ticks = []
+    for tick in range(120):
+        _, _, done = env.step(autopilot(env.observe()))
+        if done.any():
+            done_ticks.append(tick)
+    # as partidas são cortadas em 50 ticks e recomeçam com o seed + count
+    assert done_ticks == [49, 99]
+    assert env.seeds.tolist() == [18, 19, 20, 21]
+    assert env.episodes.tolist() == [2, 2, 2, 2]
+
+
+def test_finished_games_stay_still():
+    env = VecEnv(2)
+    env.reset([1, 2])
+    # sem pular, os dois caem e morrem
+    for _ in range(200):
+        _, reward, done = env.step(np.zeros(2, dtype=bool))
+    assert not env.alive.any()
+    y = env.y.copy()
+    _, reward, done = env.step(np.ones(2, dtype=bool))
+    assert env.y.tolist() == y.tolist()
+    assert not done.any() and not reward.any()
+
+
+def test_sharded_env_matches_single_process():
+    seeds = np.arange(100, 110)
+    single = VecEnv(10)
+    expected = single.reset(seeds)
+    with ShardedEnv(10, workers=3) as sharded:
+        assert np.array_equal(sharded.reset(seeds), expected)
+        for _ in range(300):
+            actions = autopilot(expected)
+            expected, reward, done = single.step(actions)
+            obs, sharded_reward, sharded_done = sharded.step(actions)
+            assert np.array_equal(obs, expected)
+            assert np.array_equal(sharded_reward, reward) and np.array_equal(sharded_done, done)
+
+
+def test_noisy_autopilot_spawns_independent_streams():
+    obs = VecEnv(200).reset(np.arange(200))
+    first, second = NoisyAutopilot(0.5, seed=7).spawn(2)
+    assert not np.array_equal(first(obs), second(obs))
+    # o mesmo seed deriva os mesmos fluxos
+    again, _ = NoisyAutopilot(0.5, seed=7).spawn(2)
+    assert np.array_equal(NoisyAutopilot(0.5, seed=7).spawn(2)[0](obs), again(obs))
+
+
+def test_sharded_workers_do_not_repeat_mistakes():
+    # as mesmas partidas (seed 0) nos dois processos: com o mesmo sorteio, os erros
+    # e as pontuações sairiam iguais nos dois
+    with ShardedEnv(8, workers=2) as sharded:
+        sharded.reset(np.zeros(8, dtype=np.int64))
+        _, scores = sharded.run(NoisyAutopilot(0.01, seed=3), 3000)
+    assert len(scores) == 8
+    assert not np.array_equal(np.sort(scores[:4]), np.sort(scores[4:]))
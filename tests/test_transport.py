@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+
+from transport import LoopbackNetwork, VirtualClock, Message, create
+
+
+def pump_until_idle(network, clock, step=0.001):
+    while network.in_flight():
+        clock.advance(step)
+        network.pump()
+
+
+def test_delivery_waits_for_latency():
+    clock = VirtualClock()
+    network = LoopbackNetwork(latency=0.05, clock=clock)
+    sender, receiver = network.transport('a'), network.transport('b')
+    receiver.subscribe('game/#')
+    sender.connect()
+    receiver.connect()
+    sender.publish('game/x', 'oi')
+    assert receiver.receive() == []
+    clock.advance(0.049)
+    assert receiver.receive() == []
+    clock.advance(0.002)
+    assert receiver.receive() == [Message('game/x', b'oi')]
+
+
+def test_jitter_keeps_per_link_order():
+    clock = VirtualClock()
+    network = LoopbackNetwork(latency=0.05, jitter=0.04, seed=3, clock=clock)
+    sender, receiver = network.transport('a'), network.transport('b')
+    receiver.subscribe('t')
+    receiver.connect()
+    for index in range(200):
+        sender.publish('t', str(index))
+        clock.advance(0.001)
+    pump_until_idle(network, clock)
+    assert [int(message.payload) for message in receiver.receive()] == list(range(200))
+
+
+def test_unordered_jitter_reorders():
+    clock = VirtualClock()
+    network = LoopbackNetwork(latency=0.05, jitter=0.04, seed=3, clock=clock, ordered=False)
+    sender, receiver = network.transport('a'), network.transport('b')
+    receiver.subscribe('t')
+    receiver.connect()
+    for index in range(200):
+        sender.publish('t', str(index))
+        clock.advance(0.001)
+    pump_until_idle(network, clock)
+    received = [int(message.payload) for message in receiver.receive()]
+    assert sorted(received) == list(range(200)) and received != list(range(200))
+
+
+def test_loss_is_seeded():
+    def run(seed):
+        network = LoopbackNetwork(loss=0.3, seed=seed)
+        sender, receiver = network.transport('a'), network.transport('b')
+        receiver.subscribe('t')
+        receiver.connect()
+        for index in range(1000):
+            sender.publish('t', str(index))
+        return [message.payload for message in receiver.receive()], network.dropped
+
+    received, dropped = run(5)
+    assert 230 < dropped < 370
+    assert len(received) + dropped == 1000
+    assert run(5) == (received, dropped)
+
+
+def test_per_receiver_conditions():
+    network = LoopbackNetwork()
+    sender = network.transport('a')
+    lossy, clean = network.transport('b', loss=1.0), network.transport('c')
+    for link in (lossy, clean):
+        link.subscribe('t')
+        link.connect()
+    sender.publish('t', 'x')
+    assert lossy.receive() == [] and len(clean.receive()) == 1
+
+
+def test_retained_messages():
+    network = LoopbackNetwork(loss=1.0)
+    network.transport('a').publish('match/control', 'seed', retain=True)
+    late = network.transport('b')
+    late.subscribe('match/+')
+    late.connect()
+    # a retida chega mesmo numa rede que perde tudo
+    assert late.receive() == [Message('match/control', b'seed')]
+    network.transport('a').publish('match/control', b'', retain=True)
+    later = network.transport('c')
+    later.subscribe('match/+')
+    later.connect()
+    assert later.receive() == []
+
+
+def test_exact_and_wildcard_subscriptions():
+    network = LoopbackNetwork()
+    sender = network.transport('a')
+    both, exact, other = network.transport('b'), network.transport('c'), network.transport('d')
+    both.subscribe('game/1/state')
+    both.subscribe('game/+/state')
+    exact.subscribe('game/1/state')
+    other.subscribe('game/2/state')
+    for link in (both, exact, other):
+        link.connect()
+    sender.publish('game/1/state', 'x')
+    network.pump()
+    # duas assinaturas que casam entregam uma vez só
+    assert both.receive() == [Message('game/1/state', b'x')]
+    assert exact.receive() == [Message('game/1/state', b'x')]
+    assert other.receive() == []
+    exact.close()
+    sender.publish('game/1/state', 'y')
+    network.pump()
+    assert both.receive() == [Message('game/1/state', b'y')]
+    assert network._exact['game/1/state'] == [both]
+
+
+def test_callback_and_close():
+    network = LoopbackNetwork()
+    received = []
+    link = network.transport('b')
+    link.on_message = received.append
+    link.subscribe('t')
+    link.connect()
+    network.transport('a').publish('t', 'um')
+    link.poll()
+    link.close()
+    network.transport('a').publish('t', 'dois')
+    link.poll()
+    assert received == [Message('t', b'um')]
+
+
+def test_asyncio_adapter():
+    from transport import AsyncioTransport
+
+    async def main():
+        network = LoopbackNetwork()
+        link = AsyncioTransport(network.transport('b'))
+        link.subscribe('t')
+        await link.connect()
+        network.transport('a').publish('t', 'oi')
+        batch = await link.receive(timeout=1)
+        await link.close()
+        return batch
+
+    assert asyncio.run(main()) == [Message('t', b'oi')]
+
+
+def test_create_loopback():
+    link = create('x', 'localhost', kind='loopback')
+    assert link.client_id == 'x'
+
+
+def test_explicit_broker_wins_over_environment(monkeypatch):
+    pytest.importorskip('paho.mqtt.client')
+    monkeypatch.setenv('FLAPPY_BROKER', 'broker-do-ambiente')
+    link = create('x', 'broker-pedido', kind='mqtt')
+    assert link.host == 'broker-pedido'
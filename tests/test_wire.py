@@ -0,0 +1,148 @@
+import struct
+
+import pytest
+
+import wire
+
+STATE = {"player_id": "player-4321", "color": "blue", "y": 250.5, "score": 7, "alive": True,
+         "game_state": "playing", "tick": 1234}
+
+
+def test_state_round_trip():
+    payload = wire.encode_state(STATE)
+    assert len(payload) == wire.STATE_V3.size
+    assert dict(wire.decode(payload)) == dict(STATE, seq=0, sent=0, velocity=None)
+
+
+def test_state_reads_like_a_dict():
+    decoded = wire.decode(wire.encode_state(STATE))
+    assert decoded["color"] == decoded.get("color") == "blue"
+    assert "y" in decoded and "type" not in decoded
+    assert decoded.get("type") is None and decoded.get("type", 5) == 5
+    assert dict(decoded, y=1.0)["y"] == 1.0
+    assert sorted(decoded) == sorted(dict(STATE, seq=0, sent=0, velocity=None))
+    with pytest.raises(KeyError):
+        decoded["seed"]
+
+
+def test_state_velocity():
+    # float32 no fio: -7.5 e 0.25 são exatos
+    assert wire.decode(wire.encode_state(dict(STATE, velocity=-7.5)))["velocity"] == -7.5
+    assert wire.decode(wire.encode_state(dict(STATE, velocity=0.25)))["velocity"] == 0.25
+
+
+def test_version_2_state_still_decoded():
+    flags = wire.FLAG_ALIVE | wire.FLAG_BLUE | (wire.GAME_STATE_CODES["playing"] << wire.GAME_STATE_SHIFT)
+    payload = wire.STATE_V2.pack(wire.MAGIC, 2, wire.MSG_STATE, 1234, 4321, 250.5, 7, flags, 9, 1000)
+    assert wire.decode(payload) == dict(STATE, seq=9, sent=1000)
+
+
+def test_state_sequence_and_timestamp():
+    decoded = wire.decode(wire.encode_state(dict(STATE, seq=0x1FFFF, sent=0x1_0000_0005)))
+    assert (decoded["seq"], decoded["sent"]) == (0xFFFF, 5)
+
+
+def test_version_1_state_still_decoded():
+    payload = wire.STATE_V1.pack(wire.MAGIC, 1, wire.MSG_STATE, 1234, 4321, 250.5, 7,
+                                 wire.FLAG_ALIVE | wire.FLAG_BLUE | (wire.GAME_STATE_CODES["playing"] << wire.GAME_STATE_SHIFT))
+    assert wire.decode(payload) == STATE
+
+
+def test_state_flags():
+    decoded = wire.decode(wire.encode_state(dict(STATE, color="red", alive=False, game_state="game_over")))
+    assert (decoded["color"], decoded["alive"], decoded["game_state"]) == ("red", False, "game_over")
+
+
+def test_score_saturates():
+    assert wire.decode(wire.encode_state(dict(STATE, score=70000)))["score"] == 0xFFFF
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_json_still_accepted():
+    codec = wire.WireCodec()
+    assert codec.decode(b'{"player_id": "player-1", "seed": 5}') == {"player_id": "player-1", "seed": 5}
+    assert codec.binary
+    # estado em JSON: cliente antigo no tópico, o envio cai para JSON
+    codec.decode(b'{"player_id": "player-1", "color": "red", "y": 1}')
+    assert not codec.binary
+    assert codec.encode_state(STATE).startswith('{')
+
+
+def test_json_fallback_is_per_sender():
+    clock = Clock()
+    codec = wire.WireCodec(clock=clock)
+    codec.decode(b'{"player_id": "player-1", "color": "red", "y": 1}')
+    codec.decode(b'{"player_id": "player-2", "color": "blue", "y": 1}')
+    # player-1 atualizou: ainda falta o player-2
+    codec.decode(wire.encode_state(dict(STATE, player_id="player-1")))
+    assert not codec.binary
+    # player-2 sumiu: volta para binário
+    clock.now = wire.LEGACY_TIMEOUT + 1
+    assert codec.binary
+    assert codec.encode_state(STATE)[0] == wire.MAGIC
+
+
+def test_binary_can_be_turned_off():
+    codec = wire.WireCodec(binary=False)
+    codec.decode(wire.encode_state(STATE))
+    assert not codec.binary
+
+
+def test_invalid_messages():
+    with pytest.raises(wire.WireError):
+        wire.decode(bytes([wire.MAGIC, wire.VERSION]))
+    with pytest.raises(wire.WireError):
+        wire.decode(wire.encode_state(STATE)[:-1])
+    payload = bytearray(wire.encode_state(STATE))
+    payload[1] = 99
+    with pytest.raises(wire.WireError):
+        wire.decode(bytes(payload))
+
+
+def test_unknown_game_state_code_is_rejected():
+    payload = bytearray(wire.encode_state(STATE))
+    flags_offset = struct.calcsize('<BBBIIfH')
+    payload[flags_offset] |= wire.GAME_STATE_MASK
+    with pytest.raises(wire.WireError):
+        wire.decode(bytes(payload))
+
+
+def test_unknown_frame_game_state_code_is_rejected():
+    payload = bytearray(wire.encode_frame({"tick": 1, "seed": None, "game_state": "playing", "birds": [None, None]}))
+    payload[struct.calcsize('<BBBII')] = len(wire.GAME_STATES)
+    with pytest.raises(wire.WireError):
+        wire.decode(bytes(payload))
+
+
+def test_frame_round_trip():
+    frame = {"tick": 600, "seed": 31337, "game_state": "playing",
+             "birds": [{"color": "red", "y": 100.0, "score": 2, "alive": True, "velocity": 1.5},
+                       {"color": "blue", "y": 400.0, "score": 1, "alive": False, "velocity": None}]}
+    decoded = wire.decode(wire.encode_frame(frame))
+    assert decoded["type"] == "frame"
+    assert (decoded["tick"], decoded["seed"], decoded["game_state"]) == (600, 31337, "playing")
+    for sent, received in zip(frame["birds"], decoded["birds"]):
+        assert {key: received[key] for key in sent} == sent
+        assert received["tick"] == 600
+
+
+def test_frame_without_seed_or_birds():
+    decoded = wire.decode(wire.encode_frame({"tick": 1, "seed": None, "game_state": "start_screen",
+                                             "birds": [None, None]}))
+    assert decoded["seed"] is None
+    assert [bird["alive"] for bird in decoded["birds"]] == [False, False]
+
+
+def test_version_1_frame_still_decoded():
+    payload = wire.FRAME_V1.pack(wire.MAGIC, 1, wire.MSG_FRAME, 60, 5, wire.GAME_STATE_CODES["playing"],
+                                 100.0, 1, wire.FLAG_ALIVE, 200.0, 0, 0)
+    decoded = wire.decode(payload)
+    assert [(bird["y"], bird["alive"], bird["velocity"]) for bird in decoded["birds"]] == [
+        (100.0, True, None), (200.0, False, None)]
@@ -0,0 +1,54 @@
+import time
+
+# Passo fixo da simulação, desacoplado da taxa de quadros.
+# GRAVITY, PIPE_SPEED e o timer de spawn são valores "por tick"; se a física andasse
+# uma vez por frame, uma máquina a 40 FPS simularia o jogo mais devagar e sairia de
+# sincronia com o outro jogador. Aqui o tempo real vai para um acumulador e cada
+# frame roda quantos ticks de 1/TICK_RATE couberem nele.
+
+TICK_RATE = 60
+MAX_CATCHUP_TICKS = 5
+
+
+class FixedTimestep:
+    def __init__(self, tick_rate=TICK_RATE, max_catchup_ticks=MAX_CATCHUP_TICKS, clock=time.perf_counter):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        # depois de uma travada longa, roda no máximo isso de ticks num frame
+        # e descarta o resto (evita a "espiral da morte")
+        self.max_catchup_ticks = max_catchup_ticks
+        self.clock = clock
+        self.accumulator = 0.0
+        self.dropped_ticks = 0
+        self._last = None
+
+    def reset(self):
+        self.accumulator = 0.0
+        self._last = None
+
+    def advance(self):
+        # Devolve quantos ticks simular neste frame.
+        now = self.clock()
+        if self._last is None:
+            self._last = now
+            return 0
+        self.accumulator += now - self._last
+        self._last = now
+
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.max_catchup_ticks:
+            self.dropped_ticks += ticks - self.max_catchup_ticks
+            ticks = self.max_catchup_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.dt
+        return ticks
+
+    @property
+    def alpha(self):
+        # fração do próximo tick já decorrida, para interpolar a renderização
+        return min(self.accumulator / self.dt, 1.0)
+
+
+def lerp(a, b, alpha):
+    return a + (b - a) * alpha
@@ -0,0 +1,76 @@
+import zlib
+
+# Tópicos MQTT.
+# O tópico único flappybird2player/game só comporta uma partida por broker. Com
+# FLAPPY_MATCH cada partida ganha seus próprios tópicos, flappybird/<partida>/<canal>,
+# e o servidor (server.py) hospeda muitas partidas no mesmo broker.
+#
+# O canal de entrada do servidor tem mais um nível, a fatia da partida
+# (flappybird/<partida>/input/<fatia>, crc32 do id em INPUT_SHARDS fatias fixas):
+# cada processo do servidor assina só as fatias que são dele e recebe só o tráfego
+# das suas partidas, em vez de receber tudo e jogar fora o que é dos outros.
+
+LEGACY_TOPIC = "flappybird2player/game"
+# quadros agregados para espectadores, publicados pelo relay.py (partida do tópico único)
+LEGACY_SPECTATE_TOPIC = "flappybird2player/spectate"
+ROOT = "flappybird"
+
+# canais de uma partida
+GAME = "game"          # modo ponto a ponto (state/lockstep): tudo num canal só
+INPUT = "input"        # clientes -> servidor: entrar, iniciar, pulos
+STATE = "state"        # servidor -> clientes: estado dos pássaros
+CONTROL = "control"    # servidor -> clientes: seed, game over, respostas
+SPECTATE = "spectate"  # relay -> espectadores: quadros agregados (ver relay.py)
+BATTLE = "battle"      # modo batalha (battle.py): estados de todos os pássaros e rodadas
+
+INPUT_SHARDS = 64      # fatias do canal de entrada (limite de processos úteis no servidor)
+
+
+def match_topic(match_id, channel):
+    return f"{ROOT}/{match_id}/{channel}"
+
+
+def shard(match_id):
+    return zlib.crc32(match_id.encode()) % INPUT_SHARDS
+
+
+def input_topic(match_id):
+    # canal de entrada de uma partida, na fatia dela
+    return f"{ROOT}/{match_id}/{INPUT}/{shard(match_id)}"
+
+
+def shard_inputs(shard_index):
+    # assinatura com curinga: o canal de entrada de todas as partidas de uma fatia
+    return f"{ROOT}/+/{INPUT}/{shard_index}"
+
+
+def spectate_topic(match_id=None):
+    return match_topic(match_id, SPECTATE) if match_id else LEGACY_SPECTATE_TOPIC
+
+
+def all_matches(channel):
+    # assinatura com curinga: o mesmo canal de todas as partidas
+    return f"{ROOT}/+/{channel}"
+
+
+def parse(topic):
+    # 'flappybird/<partida>/<canal>' (ou '.../input/<fatia>') -> (partida, canal);
+    # None para outros tópicos
+    parts = topic.split('/')
+    if parts[0] != ROOT or not (len(parts) == 3 or (len(parts) == 4 and parts[2] == INPUT)):
+        return None
+    return parts[1], parts[2]
+
+
+def matches(pattern, topic):
+    # Regra de assinatura do MQTT: '+' casa um nível, '#' (no fim) casa o resto.
+    pattern_parts = pattern.split('/')
+    topic_parts = topic.split('/')
+    for position, part in enumerate(pattern_parts):
+        if part == '#':
+            return True
+        if position >= len(topic_parts):
+            return False
+        if part != '+' and part != topic_parts[position]:
+            return False
+    return len(pattern_parts) == len(topic_parts)
@@ -0,0 +1,388 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from pipe_schedule import GOLDEN_GAMMA
+from simulation import (World, Bird, WIDTH, HEIGHT, BIRD_X, BIRD_WIDTH, BIRD_HEIGHT, PIPE_WIDTH, PIPE_GAP,
+                        GRAVITY, JUMP_STRENGTH, PIPE_SPEED, SPAWN_INTERVAL, PIPE_MIN_Y, PIPE_MAX_Y,
+                        COLLISION_MARGIN, should_jump)
+
+# Ambiente de treino em lote para bots: milhares de partidas independentes (um
+# pássaro cada) avançando juntas em arrays NumPy, com as constantes e as regras de
+# colisão do jogo. Com o mesmo seed e os mesmos pulos, cada partida é idêntica, bit
+# a bit, a uma simulation.World de um pássaro (--verify confere).
+#
+#   env = VecEnv(4096)
+#   obs = env.reset(seeds)                 # um seed por partida
+#   obs, reward, done = env.step(actions)  # actions: pula ou não, por partida
+#
+# Os canos não ficam numa pista: o cano N nasce no tick (N + 1) * SPAWN_INTERVAL e
+# anda PIPE_SPEED por tick, então a posição de cada um sai de uma conta com o tick da
+# partida, e a altura, do mesmo splitmix64 da PipeSchedule. O espaçamento entre canos
+# (SPAWN_INTERVAL * PIPE_SPEED = 360 px) é bem maior que a largura do cano mais a do
+# pássaro, então só o próximo cano pode encostar no pássaro em cada tick.
+#
+# ShardedEnv divide as partidas entre processos (um por núcleo) com a mesma interface;
+# run() roda uma política dentro dos processos, sem ida e volta por tick.
+#
+# Uso: python training.py --games 16384 --ticks 3000      (vazão com o piloto automático)
+#      python training.py --verify 50                     (confere contra simulation.World)
+
+# colunas da observação
+OBS_Y = 0
+OBS_VELOCITY = 1
+OBS_PIPE_X = 2         # x na tela do próximo cano (WIDTH sem cano à frente)
+OBS_GAP_TOP = 3        # fim do cano de cima
+OBS_GAP_BOTTOM = 4     # começo do cano de baixo
+OBS_SIZE = 5
+
+PIPE_REWARD = 1.0
+DEATH_REWARD = -1.0
+
+PIPE_SPACING = SPAWN_INTERVAL * PIPE_SPEED
+PIPE_SPAN = PIPE_MAX_Y - PIPE_MIN_Y + 1
+# abertura usada pelo piloto automático quando não há cano à frente (o meio da tela)
+DEFAULT_GAP_TOP = HEIGHT // 2 - PIPE_GAP // 2
+
+
+def splitmix64(x):
+    # pipe_schedule.splitmix64 sobre um array uint64 (a multiplicação dá a volta em 64 bits)
+    x = x + np.uint64(GOLDEN_GAMMA)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def pipe_heights(keys, indices):
+    # PipeSchedule(seed)[index] para cada partida, com keys = splitmix64(seed)
+    return (PIPE_MIN_Y + splitmix64(keys + indices.astype(np.uint64)) % np.uint64(PIPE_SPAN)).astype(np.int64)
+
+
+class VecEnv:
+    def __init__(self, count, autoreset=False, max_ticks=None, seed_stride=None):
+        self.count = count
+        # autoreset: partida terminada recomeça no mesmo step com o seed + seed_stride
+        # (padrão: count, então nenhuma posição repete o seed de outra)
+        self.autoreset = autoreset
+        self.seed_stride = seed_stride or count
+        # partidas que chegam a max_ticks terminam (done) mesmo com o pássaro vivo
+        self.max_ticks = max_ticks
+        # caixa de colisão e limites do simulation.Bird (as margens do get_rect)
+        bird = Bird(BIRD_X, HEIGHT // 2)
+        self.hit_x = int(BIRD_X + bird._hit_dx)
+        self.hit_dy = bird._hit_dy
+        self.hit_width = bird.hit_width
+        self.hit_height = bird.hit_height
+        self.half_height = bird.height // 2
+        self.initial_y = bird.initial_y
+        # faixa x da colisão do cano (sem as COLLISION_MARGIN), relativa ao x do cano
+        self.pipe_hit_left = COLLISION_MARGIN
+        self.pipe_hit_width = PIPE_WIDTH - 2 * COLLISION_MARGIN
+        self.y = np.zeros(count)
+        self.velocity = np.zeros(count)
+        self.alive = np.zeros(count, dtype=bool)
+        self.score = np.zeros(count, dtype=np.int64)
+        self.ticks = np.zeros(count, dtype=np.int64)
+        self.seeds = np.zeros(count, dtype=np.int64)
+        self.keys = np.zeros(count, dtype=np.uint64)
+        # partidas terminadas por posição e a pontuação da última delas
+        self.episodes = np.zeros(count, dtype=np.int64)
+        self.last_score = np.zeros(count, dtype=np.int64)
+        # altura do próximo cano, refeita só quando o próximo cano muda (a cada 120 ticks)
+        self._pipe_index = np.full(count, -1, dtype=np.int64)
+        self._pipe_height = np.zeros(count, dtype=np.int64)
+
+    def reset(self, seeds):
+        seeds = np.asarray(seeds, dtype=np.int64)
+        if seeds.shape != (self.count,):
+            raise ValueError(f"esperava {self.count} seeds, recebi {seeds.shape}")
+        self._reset(np.ones(self.count, dtype=bool), seeds)
+        self.episodes[:] = 0
+        self.last_score[:] = 0
+        return self.observe()
+
+    def _reset(self, games, seeds):
+        self.y[games] = self.initial_y
+        self.velocity[games] = 0
+        self.alive[games] = True
+        self.score[games] = 0
+        self.ticks[games] = 0
+        self.seeds[games] = seeds[games]
+        # PipeSchedule usa seed & MASK64: o int64 visto como uint64 é o mesmo número
+        self.keys[games] = splitmix64(self.seeds[games].astype(np.uint64))
+        self._pipe_index[games] = -1
+
+    def _next_pipe(self):
+        # Próximo cano de cada partida no tick atual: o primeiro que ainda não passou
+        # totalmente do pássaro (mesma regra do simulation.should_jump).
+        # O cano k está em x = WIDTH + PIPE_SPACING * (k + 1) - PIPE_SPEED * (tick + 1).
+        ticks = self.ticks
+        index = np.maximum(
+            (PIPE_SPEED * (ticks + 1) + BIRD_X - BIRD_WIDTH // 2 - PIPE_WIDTH - WIDTH) // PIPE_SPACING, 0)
+        spawned = ticks >= SPAWN_INTERVAL * (index + 1)
+        pipe_x = WIDTH + PIPE_SPACING * (index + 1) - PIPE_SPEED * (ticks + 1)
+        changed = index != self._pipe_index
+        if changed.any():
+            self._pipe_index[changed] = index[changed]
+            self._pipe_height[changed] = pipe_heights(self.keys[changed], index[changed])
+        return spawned, pipe_x, self._pipe_height
+
+    def observe(self):
+        spawned, pipe_x, height = self._next_pipe()
+        return self._observation(spawned, pipe_x, height)
+
+    def _observation(self, spawned, pipe_x, height):
+        obs = np.empty((self.count, OBS_SIZE))
+        obs[:, OBS_Y] = self.y
+        obs[:, OBS_VELOCITY] = self.velocity
+        obs[:, OBS_PIPE_X] = np.where(spawned, pipe_x, WIDTH)
+        top = np.where(spawned, height, DEFAULT_GAP_TOP)
+        obs[:, OBS_GAP_TOP] = top
+        obs[:, OBS_GAP_BOTTOM] = top + PIPE_GAP
+        return obs
+
+    def step(self, actions):
+        # Um tick em todas as partidas vivas, na ordem do World.step: pulo, física,
+        # limites da tela, canos andando, colisão e pontuação. Partidas terminadas
+        # (sem autoreset) ficam paradas até o próximo reset.
+        actions = np.asarray(actions, dtype=bool)
+        alive = self.alive
+        y = self.y
+        velocity = self.velocity
+        playing = alive.copy()
+
+        np.copyto(velocity, JUMP_STRENGTH, where=actions & alive)
+        np.add(velocity, GRAVITY, out=velocity, where=alive)
+        np.add(y, velocity, out=y, where=alive)
+        out = (y - self.half_height < 0) | (y + self.half_height > HEIGHT)
+        np.add(self.ticks, 1, out=self.ticks, where=playing)
+
+        spawned, pipe_x, height = self._next_pipe()
+        checked = playing & ~out
+        if self.hit_width and self.hit_height and self.pipe_hit_width:
+            # simulation.check_collision (rects_collide) contra o próximo cano
+            left = pipe_x + self.pipe_hit_left
+            near = spawned & (self.hit_x < left + self.pipe_hit_width) & (left < self.hit_x + self.hit_width)
+            top = np.trunc(y + self.hit_dy)
+            bottom = top + self.hit_height
+            bottom_y = height + PIPE_GAP
+            hit = near & (((height != 0) & (top < height) & (0 < bottom)) |
+                          ((HEIGHT - bottom_y != 0) & (top < HEIGHT) & (bottom_y < bottom)))
+            survived = checked & ~hit
+        else:
+            survived = checked
+
+        # pontuação: um pássaro vivo passou todos os canos com x + largura < BIRD_X
+        passed = np.maximum(
+            (PIPE_SPEED * (self.ticks + 1) + BIRD_X - PIPE_WIDTH - WIDTH - 1) // PIPE_SPACING, 0)
+        gained = np.where(survived, passed - self.score, 0)
+        self.score += gained
+        died = playing & ~survived
+        alive[died] = False
+
+        reward = gained * PIPE_REWARD + died * DEATH_REWARD
+        done = died
+        if self.max_ticks is not None:
+            done = done | (playing & (self.ticks >= self.max_ticks))
+            alive[done] = False
+
+        if self.autoreset and done.any():
+            self.last_score[done] = self.score[done]
+            self.episodes[done] += 1
+            self._reset(done, self.seeds + self.seed_stride)
+            spawned = spawned & ~done
+        return self._observation(spawned, pipe_x, height), reward, done
+
+    def run(self, policy, ticks):
+        # Roda 'policy(obs) -> actions' por 'ticks' steps. Devolve os ticks de jogo
+        # simulados e as pontuações das partidas terminadas.
+        obs = self.observe()
+        game_ticks = 0
+        scores = []
+        for _ in range(ticks):
+            game_ticks += int(np.count_nonzero(self.alive))
+            obs, _, done = self.step(policy(obs))
+            if done.any():
+                scores.append(self.last_score[done] if self.autoreset else self.score[done])
+        return game_ticks, np.concatenate(scores) if scores else np.zeros(0, dtype=np.int64)
+
+
+def autopilot(obs, rng=None, mistake_rate=0.0):
+    # simulation.should_jump sobre as observações: pula se está caindo abaixo do
+    # meio da abertura do próximo cano. mistake_rate: chance de errar o pulo.
+    center = obs[:, OBS_GAP_TOP] + PIPE_GAP // 2
+    jumps = (obs[:, OBS_VELOCITY] >= 0) & (obs[:, OBS_Y] > center + BIRD_HEIGHT // 2)
+    if mistake_rate:
+        jumps ^= (rng or np.random.default_rng()).random(len(obs)) < mistake_rate
+    return jumps
+
+
+class NoisyAutopilot:
+    # política com erros, que pode ir para os processos do ShardedEnv (pickle)
+    def __init__(self, mistake_rate, seed=None):
+        self.mistake_rate = mistake_rate
+        # seed pode ser um SeedSequence já derivado (ver spawn)
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+
+    def __call__(self, obs):
+        return autopilot(obs, self.rng, self.mistake_rate)
+
+    def spawn(self, count):
+        # Uma cópia por processo, cada uma com o seu fluxo de números: a mesma
+        # política em pickle nos processos erraria nos mesmos ticks em todos eles.
+        return [NoisyAutopilot(self.mistake_rate, child) for child in self.seed_sequence.spawn(count)]
+
+
+# --- processos ---
+
+def _worker(conn, count, autoreset, max_ticks, seed_stride):
+    env = VecEnv(count, autoreset, max_ticks, seed_stride)
+    while True:
+        command, argument = conn.recv()
+        if command == 'reset':
+            conn.send(env.reset(argument))
+        elif command == 'step':
+            conn.send(env.step(argument))
+        elif command == 'run':
+            policy, ticks = argument
+            conn.send(env.run(policy, ticks))
+        elif command == 'close':
+            conn.close()
+            return
+
+
+class ShardedEnv:
+    # VecEnv dividido entre processos; reset/step juntam os resultados na ordem das partidas.
+    def __init__(self, count, workers=None, autoreset=False, max_ticks=None):
+        workers = max(1, min(workers or os.cpu_count() or 1, count))
+        self.count = count
+        self.sizes = [len(part) for part in np.array_split(np.arange(count), workers)]
+        self.bounds = np.cumsum(self.sizes)[:-1]
+        self.connections = []
+        self.processes = []
+        for size in self.sizes:
+            parent, child = multiprocessing.Pipe()
+            # o autoreset soma o total de partidas ao seed, como num VecEnv só
+            process = multiprocessing.Process(target=_worker, args=(child, size, autoreset, max_ticks, count),
+                                              daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def _call(self, command, arguments):
+        for connection, argument in zip(self.connections, arguments):
+            connection.send((command, argument))
+        return [connection.recv() for connection in self.connections]
+
+    def reset(self, seeds):
+        seeds = np.asarray(seeds, dtype=np.int64)
+        return np.concatenate(self._call('reset', np.split(seeds, self.bounds)))
+
+    def step(self, actions):
+        results = self._call('step', np.split(np.asarray(actions, dtype=bool), self.bounds))
+        obs, reward, done = zip(*results)
+        return np.concatenate(obs), np.concatenate(reward), np.concatenate(done)
+
+    def run(self, policy, ticks):
+        # políticas com sorteio (spawn) mandam uma cópia com seed próprio a cada processo
+        workers = len(self.connections)
+        policies = policy.spawn(workers) if hasattr(policy, 'spawn') else [policy] * workers
+        results = self._call('run', [(worker_policy, ticks) for worker_policy in policies])
+        return sum(game_ticks for game_ticks, _ in results), np.concatenate([scores for _, scores in results])
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(('close', None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- linha de comando ---
+
+def verify(games, ticks, seed=0):
+    # Compara VecEnv com uma simulation.World de um pássaro por partida, tick a tick,
+    # com o piloto automático errando de propósito (as partidas terminam cedo ou tarde).
+    rng = random.Random(seed)
+    seeds = [rng.randrange(1 << 31) for _ in range(games)]
+    env = VecEnv(games)
+    obs = env.reset(seeds)
+    worlds = [World(birds=[Bird(BIRD_X, HEIGHT // 2)], seed=seed_value) for seed_value in seeds]
+    for tick in range(ticks):
+        actions = np.zeros(games, dtype=bool)
+        for index, world in enumerate(worlds):
+            if world.game_over:
+                continue
+            bird = world.birds[0]
+            jump = should_jump(bird, world.track)
+            if bool(autopilot(obs[index:index + 1])[0]) != jump:
+                print(f"partida {index} (seed {seeds[index]}): observação difere no tick {world.tick}")
+                return False
+            actions[index] = jump != (rng.random() < 0.01)
+        obs, _, done = env.step(actions)
+        for index, world in enumerate(worlds):
+            if world.game_over:
+                continue
+            events = world.step([0] if actions[index] else [])
+            bird = world.birds[0]
+            same = (bird.y == env.y[index] and bird.velocity == env.velocity[index] and
+                    bird.score == env.score[index] and bird.is_alive == env.alive[index] and
+                    world.game_over == done[index])
+            if not same:
+                print(f"partida {index} (seed {seeds[index]}) diverge no tick {tick}: World "
+                      f"{(bird.y, bird.velocity, bird.score, bird.is_alive)} != VecEnv "
+                      f"{(env.y[index], env.velocity[index], env.score[index], env.alive[index])} {events}")
+                return False
+        if all(world.game_over for world in worlds):
+            break
+    scores = [world.birds[0].score for world in worlds]
+    print(f"{games} partidas idênticas por {tick + 1} ticks (pontos: média {np.mean(scores):.1f}, máx {max(scores)})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ambiente de treino em lote do Flappy Bird")
+    parser.add_argument("--games", type=int, default=16384, help="partidas simultâneas")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processos (1 = sem processos)")
+    parser.add_argument("--ticks", type=int, default=3000, help="steps por partida")
+    parser.add_argument("--mistakes", type=float, default=0.002, help="chance por tick de o piloto errar")
+    parser.add_argument("--verify", type=int, metavar="PARTIDAS", help="confere contra simulation.World e sai")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify(args.verify, 20000, args.seed) else 1)
+
+    seeds = np.arange(args.games, dtype=np.int64) + args.seed
+    policy = NoisyAutopilot(args.mistakes, args.seed)
+    if args.workers > 1:
+        env = ShardedEnv(args.games, args.workers, autoreset=True)
+    else:
+        env = VecEnv(args.games, autoreset=True)
+    env.reset(seeds)
+    started = time.perf_counter()
+    game_ticks, scores = env.run(policy, args.ticks)
+    elapsed = time.perf_counter() - started
+    if args.workers > 1:
+        env.close()
+    print(f"{args.games} partidas x {args.ticks} steps em {elapsed:.2f} s com {args.workers} processos: "
+          f"{game_ticks / elapsed:,.0f} ticks de jogo/s")
+    if len(scores):
+        print(f"{len(scores)} partidas terminadas, pontos: média {scores.mean():.1f}, máx {scores.max()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque, namedtuple
+
+from topics import matches
+
+# Camada de transporte: o jogo e o servidor publicam, assinam e recebem mensagens
+# por esta interface, sem saber se embaixo há um broker MQTT de verdade.
+#
+#   PahoTransport      MQTT via paho (o padrão do jogo)
+#   LoopbackTransport  rede dentro do processo (LoopbackNetwork), com latência,
+#                      jitter e perda artificiais e sorteios reprodutíveis (seed);
+#                      com um VirtualClock, os testes rodam no mesmo ritmo em
+#                      qualquer máquina, sem rede
+#   AsyncioTransport   adapta qualquer um dos dois para código asyncio
+#
+# Recebimento: com on_message definido, cada mensagem é entregue ao callback
+# (na thread de rede, no paho); sem ele, as mensagens se acumulam e receive()
+# devolve o lote. poll() precisa ser chamado de vez em quando (uma vez por frame
+# ou tick): no loopback é ele que entrega as mensagens que já "chegaram".
+
+Message = namedtuple('Message', 'topic payload')
+
+DEFAULT_PORT = 1883
+
+
+class Transport:
+    def __init__(self, client_id=None):
+        self.client_id = client_id
+        # on_message(message); on_connect(ok, reason)
+        self.on_message = None
+        self.on_connect = None
+        self._subscriptions = []
+        self._received_queue = deque()
+
+    def connect(self):
+        raise NotImplementedError
+
+    def subscribe(self, topic):
+        if topic not in self._subscriptions:
+            self._subscriptions.append(topic)
+
+    def publish(self, topic, payload, retain=False):
+        raise NotImplementedError
+
+    def poll(self):
+        pass
+
+    def receive(self, max_messages=None):
+        # Lote de mensagens recebidas desde a última chamada (sem on_message).
+        self.poll()
+        queue = self._received_queue
+        count = len(queue) if max_messages is None else min(max_messages, len(queue))
+        return [queue.popleft() for _ in range(count)]
+
+    def close(self):
+        pass
+
+    def _received(self, message):
+        if self.on_message is not None:
+            self.on_message(message)
+        else:
+            self._received_queue.append(message)
+
+
+class PahoTransport(Transport):
+    def __init__(self, host, port=DEFAULT_PORT, client_id=None, keepalive=60):
+        super().__init__(client_id)
+        # import aqui: o loopback funciona sem o paho instalado
+        import paho.mqtt.client as mqtt
+        self.host, self.port, self.keepalive = host, port, keepalive
+        self.client = mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv311)
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        self.connected = False
+
+    def connect(self):
+        self.client.connect(self.host, self.port, self.keepalive)
+        self.client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, reasonCode, properties=None):
+        self.connected = reasonCode == 0
+        if self.connected:
+            # refaz as assinaturas a cada (re)conexão
+            for topic in self._subscriptions:
+                client.subscribe(topic)
+        if self.on_connect:
+            self.on_connect(self.connected, reasonCode)
+
+    def _on_message(self, client, userdata, msg):
+        self._received(Message(msg.topic, msg.payload))
+
+    def subscribe(self, topic):
+        super().subscribe(topic)
+        if self.connected:
+            self.client.subscribe(topic)
+
+    def publish(self, topic, payload, retain=False):
+        self.client.publish(topic, payload, retain=retain)
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class VirtualClock:
+    # Relógio manual para o loopback: o tempo só anda com advance().
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class LoopbackNetwork:
+    # "Broker" dentro do processo. Cada cópia de mensagem sorteia se é perdida e
+    # quando chega (latência +- jitter); com ordered=True a ordem entre um
+    # remetente e um receptor é mantida, como numa conexão TCP com o broker.
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, seed=0, clock=time.monotonic, ordered=True):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.ordered = ordered
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # assinaturas: tópicos exatos num dict (uma busca por publicação, mesmo com
+        # milhares de clientes) e padrões com curinga numa lista, testados um a um
+        self._exact = {}           # tópico -> [transporte]
+        self._wildcards = []       # (padrão, transporte)
+        self._retained = {}        # tópico -> payload
+        self._in_flight = []       # heap (chegada, ordem, transporte, mensagem)
+        self._order = itertools.count()
+        self._last_arrival = {}    # (remetente, receptor) -> chegada da última mensagem
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def transport(self, client_id=None, latency=None, jitter=None, loss=None):
+        # latency/jitter/loss: condições da rede até este cliente (padrão: as da rede)
+        return LoopbackTransport(self, client_id, latency, jitter, loss)
+
+    def _send(self, sender, receiver, message, now, lossless=False):
+        loss = self.loss if receiver.loss is None else receiver.loss
+        if not lossless and loss and self.rng.random() < loss:
+            self.dropped += 1
+            return
+        latency = self.latency if receiver.latency is None else receiver.latency
+        jitter = self.jitter if receiver.jitter is None else receiver.jitter
+        arrival = now + max(0.0, latency + (self.rng.uniform(-jitter, jitter) if jitter else 0.0))
+        if self.ordered:
+            link = (id(sender), id(receiver))
+            arrival = max(arrival, self._last_arrival.get(link, arrival))
+            self._last_arrival[link] = arrival
+        heapq.heappush(self._in_flight, (arrival, next(self._order), receiver, message))
+
+    def subscribe(self, transport, pattern):
+        with self._lock:
+            if '+' in pattern or '#' in pattern:
+                if (pattern, transport) not in self._wildcards:
+                    self._wildcards.append((pattern, transport))
+            else:
+                subscribers = self._exact.setdefault(pattern, [])
+                if transport not in subscribers:
+                    subscribers.append(transport)
+            # como no MQTT, quem assina recebe as mensagens retidas
+            now = self.clock()
+            for topic, payload in self._retained.items():
+                if matches(pattern, topic):
+                    self._send(None, transport, Message(topic, payload), now, lossless=True)
+
+    def unsubscribe(self, transport):
+        with self._lock:
+            self._wildcards = [(p, t) for p, t in self._wildcards if t is not transport]
+            for topic in [topic for topic, subscribers in self._exact.items() if transport in subscribers]:
+                self._exact[topic] = [t for t in self._exact[topic] if t is not transport]
+                if not self._exact[topic]:
+                    del self._exact[topic]
+
+    def publish(self, sender, topic, payload, retain=False):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        message = Message(topic, payload)
+        with self._lock:
+            self.sent += 1
+            if retain:
+                # payload vazio apaga a mensagem retida
+                if payload:
+                    self._retained[topic] = payload
+                else:
+                    self._retained.pop(topic, None)
+            # cada transporte recebe a mensagem uma vez, mesmo com duas assinaturas que casam
+            targets = {id(t): t for t in self._exact.get(topic, ())}
+            for pattern, transport in self._wildcards:
+                if matches(pattern, topic):
+                    targets[id(transport)] = transport
+            now = self.clock()
+            for receiver in targets.values():
+                self._send(sender, receiver, message, now)
+
+    def pump(self):
+        # Entrega as mensagens cuja chegada já passou; devolve quantas.
+        now = self.clock()
+        due = []
+        with self._lock:
+            while self._in_flight and self._in_flight[0][0] <= now:
+                _, _, receiver, message = heapq.heappop(self._in_flight)
+                due.append((receiver, message))
+            self.delivered += len(due)
+        # fora do lock: o callback pode publicar de novo
+        for receiver, message in due:
+            receiver._received(message)
+        return len(due)
+
+    def next_arrival(self):
+        # quando chega a próxima mensagem (None = nada em trânsito), para avançar um VirtualClock
+        with self._lock:
+            return self._in_flight[0][0] if self._in_flight else None
+
+    def in_flight(self):
+        return len(self._in_flight)
+
+
+class LoopbackTransport(Transport):
+    def __init__(self, network, client_id=None, latency=None, jitter=None, loss=None):
+        super().__init__(client_id)
+        self.network = network
+        self.latency, self.jitter, self.loss = latency, jitter, loss
+        self.connected = False
+
+    def connect(self):
+        self.connected = True
+        for topic in self._subscriptions:
+            self.network.subscribe(self, topic)
+        if self.on_connect:
+            self.on_connect(True, 0)
+
+    def subscribe(self, topic):
+        super().subscribe(topic)
+        if self.connected:
+            self.network.subscribe(self, topic)
+
+    def publish(self, topic, payload, retain=False):
+        self.network.publish(self, topic, payload, retain)
+
+    def poll(self):
+        self.network.pump()
+
+    def close(self):
+        self.connected = False
+        self.network.unsubscribe(self)
+
+    def _received(self, message):
+        if self.connected:
+            super()._received(message)
+
+
+class AsyncioTransport:
+    # Adaptador asyncio: mensagens viram um asyncio.Queue, lidas com await
+    # receive() (em lote) ou async for. Funciona com qualquer transporte acima;
+    # os que precisam de poll() (loopback) são bombeados por uma tarefa própria.
+    def __init__(self, inner, poll_interval=0.001):
+        self.inner = inner
+        self.poll_interval = poll_interval
+        self._queue = None
+        self._loop = None
+        self._pump_task = None
+
+    async def connect(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self.inner.on_message = self._enqueue
+        self.inner.connect()
+        if not isinstance(self.inner, PahoTransport):
+            self._pump_task = asyncio.create_task(self._pump())
+
+    def _enqueue(self, message):
+        # pode vir da thread do paho
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+
+    async def _pump(self):
+        while True:
+            self.inner.poll()
+            await asyncio.sleep(self.poll_interval)
+
+    def subscribe(self, topic):
+        self.inner.subscribe(topic)
+
+    def publish(self, topic, payload, retain=False):
+        self.inner.publish(topic, payload, retain)
+
+    async def receive(self, max_messages=None, timeout=None):
+        # espera a primeira mensagem e leva junto as que já estiverem na fila
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        batch = [first]
+        while not self._queue.empty() and (max_messages is None or len(batch) < max_messages):
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+    async def close(self):
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+        self.inner.close()
+
+
+# rede loopback compartilhada pelos transportes criados com FLAPPY_TRANSPORT=loopback
+_default_network = None
+
+
+def default_network():
+    global _default_network
+    if _default_network is None:
+        _default_network = LoopbackNetwork(
+            latency=float(os.environ.get("FLAPPY_LOOPBACK_LATENCY", "0")) / 1000,
+            jitter=float(os.environ.get("FLAPPY_LOOPBACK_JITTER", "0")) / 1000,
+            loss=float(os.environ.get("FLAPPY_LOOPBACK_LOSS", "0")),
+            seed=int(os.environ.get("FLAPPY_LOOPBACK_SEED", "0")))
+    return _default_network
+
+
+def create(client_id, host, port=DEFAULT_PORT, kind=None):
+    # FLAPPY_TRANSPORT=mqtt (padrão) ou loopback (sem rede; latência em ms, perda de 0 a 1
+    # por FLAPPY_LOOPBACK_LATENCY/_JITTER/_LOSS). O host é o que quem chama passou: o
+    # FLAPPY_BROKER entra só como padrão do --broker (ou do broker do Flappy.py).
+    kind = kind or os.environ.get("FLAPPY_TRANSPORT", "mqtt")
+    if kind == "loopback":
+        return default_network().transport(client_id)
+    if kind != "mqtt":
+        raise ValueError(f"transporte desconhecido: {kind}")
+    return PahoTransport(host, port, client_id)
@@ -0,0 +1,328 @@
+import json
+import math
+import struct
+import threading
+import time
+
+# Formato binário das mensagens de estado dos jogadores.
+# Em vez do dict JSON (~110 bytes e um json.loads por mensagem), o estado vai num
+# layout fixo empacotado com struct (28 bytes). O primeiro byte é um marcador que
+# nunca aparece no início de um JSON ('{'), então o receptor distingue os dois
+# formatos e continua aceitando clientes antigos que só falam JSON.
+
+MAGIC = 0xFB
+# versão 2: o estado ganhou número de sequência e carimbo de envio (ver netstats.py);
+# mensagens da versão 1 continuam sendo aceitas
+# versão 3: estados e quadros levam a velocidade do pássaro, para o receptor
+# projetar o y entre mensagens (ver jitter_buffer.py e state_sender.py)
+VERSION = 3
+
+MSG_STATE = 1
+MSG_INPUT = 2
+MSG_FRAME = 3
+
+# cabeçalho: marcador, versão, tipo da mensagem
+HEADER = struct.Struct('<BBB')
+# estado: tick, número do jogador, y, pontuação, flags
+STATE_V1 = struct.Struct('<BBBIIfHB')
+# estado v2: + sequência (16 bits) e carimbo de envio (ms, 32 bits)
+STATE_V2 = struct.Struct('<BBBIIfHBHI')
+# estado v3: + velocidade (NaN = desconhecida, ex.: pássaro morto)
+STATE_V3 = struct.Struct('<BBBIIfHBHIf')
+# entrada (modo lockstep): tick, número do jogador, índice do pássaro que pulou
+INPUT_V1 = struct.Struct('<BBBIIB')
+# quadro agregado para espectadores (relay.py): tick, seed, estado do jogo e,
+# para cada pássaro (vermelho, azul), y, pontuação e flags
+FRAME_V1 = struct.Struct('<BBBIIB' + 'fHB' * 2)
+# quadro v3: + velocidade de cada pássaro
+FRAME_V3 = struct.Struct('<BBBIIB' + 'fHBf' * 2)
+
+NO_SEED = 0xFFFFFFFF
+
+# bits do byte de flags
+FLAG_ALIVE = 0x01
+FLAG_BLUE = 0x02
+# bits 2-3: estado do jogo
+GAME_STATE_SHIFT = 2
+GAME_STATE_MASK = 0x0C
+
+GAME_STATES = ('start_screen', 'playing', 'game_over')
+GAME_STATE_CODES = {name: code for code, name in enumerate(GAME_STATES)}
+
+
+class WireError(ValueError):
+    pass
+
+
+def player_number(player_id):
+    # 'player-12345' -> 12345 (os client_id do jogo são sempre nesse formato)
+    return int(player_id.rsplit('-', 1)[-1])
+
+
+def is_binary(payload):
+    return bool(payload) and payload[0] == MAGIC
+
+
+def _pack_velocity(velocity):
+    return math.nan if velocity is None else velocity
+
+
+def _unpack_velocity(velocity):
+    return None if math.isnan(velocity) else velocity
+
+
+def encode_state(state):
+    flags = 0
+    if state.get("alive"):
+        flags |= FLAG_ALIVE
+    if state.get("color") == 'blue':
+        flags |= FLAG_BLUE
+    flags |= GAME_STATE_CODES.get(state.get("game_state"), 0) << GAME_STATE_SHIFT
+    return STATE_V3.pack(
+        MAGIC, VERSION, MSG_STATE,
+        state.get("tick", 0) & 0xFFFFFFFF,
+        player_number(state["player_id"]),
+        state["y"],
+        min(state.get("score", 0), 0xFFFF),
+        flags,
+        state.get("seq", 0) & 0xFFFF,
+        state.get("sent", 0) & 0xFFFFFFFF,
+        _pack_velocity(state.get("velocity"))
+    )
+
+
+def encode_input(player_id, tick, bird_index):
+    return INPUT_V1.pack(MAGIC, VERSION, MSG_INPUT, tick & 0xFFFFFFFF, player_number(player_id), bird_index)
+
+
+def encode_frame(frame):
+    # frame: {"tick", "seed" (ou None), "game_state", "birds": [dict por cor, ou None]}
+    fields = [MAGIC, VERSION, MSG_FRAME,
+              frame.get("tick", 0) & 0xFFFFFFFF,
+              NO_SEED if frame.get("seed") is None else frame["seed"] & 0xFFFFFFFF,
+              GAME_STATE_CODES.get(frame.get("game_state"), 0)]
+    for bird in frame["birds"]:
+        if bird is None:
+            # pássaro sem estado ainda: y 0 e morto
+            fields += (0.0, 0, 0, math.nan)
+        else:
+            fields += (bird["y"], min(bird.get("score", 0), 0xFFFF), FLAG_ALIVE if bird.get("alive") else 0,
+                       _pack_velocity(bird.get("velocity")))
+    return FRAME_V3.pack(*fields)
+
+
+def _decode_state_v1(payload):
+    _, _, _, tick, number, y, score, flags = STATE_V1.unpack(payload)
+    return _state_dict(tick, number, y, score, flags)
+
+
+def _decode_state_v2(payload):
+    _, _, _, tick, number, y, score, flags, seq, sent = STATE_V2.unpack(payload)
+    state = _state_dict(tick, number, y, score, flags)
+    state["seq"] = seq
+    state["sent"] = sent
+    return state
+
+
+def _decode_state(payload):
+    values = STATE_V3.unpack(payload)
+    if values[7] & GAME_STATE_MASK == GAME_STATE_MASK:
+        raise WireError(f"estado do jogo inválido: {GAME_STATE_MASK >> GAME_STATE_SHIFT}")
+    return _new_state(StateMessage, values)
+
+
+def _state_dict(tick, number, y, score, flags):
+    # devolve o mesmo dict da mensagem JSON, para o resto do código não mudar
+    game_state = (flags & GAME_STATE_MASK) >> GAME_STATE_SHIFT
+    if game_state >= len(GAME_STATES):
+        raise WireError(f"estado do jogo inválido: {game_state}")
+    return {
+        "player_id": f'player-{number}',
+        "color": 'blue' if flags & FLAG_BLUE else 'red',
+        "y": y,
+        "score": score,
+        "alive": bool(flags & FLAG_ALIVE),
+        "game_state": GAME_STATES[game_state],
+        "tick": tick
+    }
+
+
+_field = tuple.__getitem__
+_new_state = tuple.__new__
+
+# campo -> leitura a partir da tupla de STATE_V3.unpack
+_STATE_FIELDS = {
+    "player_id": lambda values: f'player-{_field(values, 4)}',
+    "color": lambda values: 'blue' if _field(values, 7) & FLAG_BLUE else 'red',
+    "y": lambda values: _field(values, 5),
+    "score": lambda values: _field(values, 6),
+    "alive": lambda values: bool(_field(values, 7) & FLAG_ALIVE),
+    "game_state": lambda values: GAME_STATES[(_field(values, 7) & GAME_STATE_MASK) >> GAME_STATE_SHIFT],
+    "tick": lambda values: _field(values, 3),
+    "seq": lambda values: _field(values, 8),
+    "sent": lambda values: _field(values, 9),
+    "velocity": lambda values: _unpack_velocity(_field(values, 10)),
+}
+_STATE_KEYS = tuple(_STATE_FIELDS)
+
+
+class StateMessage(tuple):
+    # Estado v3 decodificado sem montar um dict: guarda a tupla do struct.unpack e
+    # só converte o campo que for lido. Lê-se como o dict da mensagem JSON
+    # (get, [], in, keys, dict(...)), mas é só leitura.
+    __slots__ = ()
+
+    def get(self, key, default=None):
+        field = _STATE_FIELDS.get(key)
+        return default if field is None else field(self)
+
+    def __getitem__(self, key):
+        return _STATE_FIELDS[key](self)
+
+    def __contains__(self, key):
+        return key in _STATE_FIELDS
+
+    def __iter__(self):
+        return iter(_STATE_KEYS)
+
+    def __len__(self):
+        return len(_STATE_KEYS)
+
+    def keys(self):
+        return _STATE_KEYS
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+def _decode_input(payload):
+    _, _, _, tick, number, bird_index = INPUT_V1.unpack(payload)
+    return {"type": "input", "player_id": f'player-{number}', "tick": tick, "bird": bird_index}
+
+
+def _decode_frame_v1(payload):
+    values = FRAME_V1.unpack(payload)
+    return _frame_dict(values[3:6], [values[6:9] + (math.nan,), values[9:12] + (math.nan,)])
+
+
+def _decode_frame(payload):
+    values = FRAME_V3.unpack(payload)
+    return _frame_dict(values[3:6], [values[6:10], values[10:14]])
+
+
+def _frame_dict(header, bird_fields):
+    tick, seed, game_state = header
+    if game_state >= len(GAME_STATES):
+        raise WireError(f"estado do jogo inválido: {game_state}")
+    birds = []
+    for color, (y, score, flags, velocity) in zip(('red', 'blue'), bird_fields):
+        birds.append({"color": color, "y": y, "score": score, "alive": bool(flags & FLAG_ALIVE), "tick": tick,
+                      "velocity": _unpack_velocity(velocity)})
+    return {
+        "type": "frame",
+        "tick": tick,
+        "seed": None if seed == NO_SEED else seed,
+        "game_state": GAME_STATES[game_state],
+        "birds": birds
+    }
+
+
+# (versão, tipo da mensagem) -> (layout, decodificador)
+_DECODERS = {
+    (1, MSG_STATE): (STATE_V1, _decode_state_v1),
+    (1, MSG_INPUT): (INPUT_V1, _decode_input),
+    (1, MSG_FRAME): (FRAME_V1, _decode_frame_v1),
+    (2, MSG_STATE): (STATE_V2, _decode_state_v2),
+    (2, MSG_INPUT): (INPUT_V1, _decode_input),
+    (2, MSG_FRAME): (FRAME_V1, _decode_frame_v1),
+    (3, MSG_STATE): (STATE_V3, _decode_state),
+    (3, MSG_INPUT): (INPUT_V1, _decode_input),
+    (3, MSG_FRAME): (FRAME_V3, _decode_frame),
+}
+SUPPORTED_VERSIONS = {version for version, _ in _DECODERS}
+
+
+def decode_binary(payload):
+    if len(payload) < HEADER.size:
+        raise WireError("mensagem binária truncada")
+    _, version, msg_type = HEADER.unpack_from(payload)
+    if version not in SUPPORTED_VERSIONS:
+        raise WireError(f"versão de mensagem não suportada: {version}")
+    decoder = _DECODERS.get((version, msg_type))
+    if decoder is None:
+        raise WireError(f"tipo de mensagem desconhecido: {msg_type}")
+    layout, decode_message = decoder
+    if len(payload) != layout.size:
+        raise WireError(f"tamanho inválido para mensagem do tipo {msg_type}: {len(payload)} bytes")
+    return decode_message(payload)
+
+
+_STATE_SIZE = STATE_V3.size
+_unpack_state = STATE_V3.unpack
+
+
+def decode(payload):
+    # aceita binário (clientes novos) e JSON (seed, game_over e clientes antigos)
+    if payload and payload[0] == MAGIC:
+        # caminho rápido para o caso comum, o estado da versão atual
+        if len(payload) == _STATE_SIZE and payload[1] == VERSION and payload[2] == MSG_STATE:
+            values = _unpack_state(payload)
+            if values[7] & GAME_STATE_MASK == GAME_STATE_MASK:
+                raise WireError(f"estado do jogo inválido: {GAME_STATE_MASK >> GAME_STATE_SHIFT}")
+            return _new_state(StateMessage, values)
+        return decode_binary(payload)
+    return json.loads(payload.decode() if isinstance(payload, (bytes, bytearray)) else payload)
+
+
+# sem estado em JSON de um remetente por esse tempo, ele saiu (ou atualizou)
+LEGACY_TIMEOUT = 5.0
+
+
+class WireCodec:
+    # Escolhe o formato de envio do estado.
+    # O tópico é compartilhado, então o formato tem que servir a todos que estão nele:
+    # binário (a não ser que binary=False), enquanto nenhum remetente mandar estado em
+    # JSON (um cliente antigo, que não entenderia o binário). Cada remetente em JSON
+    # é lembrado por id; quando ele passa a mandar binário ou some por
+    # LEGACY_TIMEOUT, o envio volta para binário.
+    # decode roda na thread de rede e binary é lido na thread do jogo, daí o lock.
+    def __init__(self, binary=True, clock=time.monotonic):
+        self.prefer_binary = binary
+        self.clock = clock
+        self.legacy_senders = {}
+        self.lock = threading.Lock()
+
+    @property
+    def binary(self):
+        if not self.prefer_binary:
+            return False
+        if not self.legacy_senders:
+            return True
+        now = self.clock()
+        with self.lock:
+            for sender in [sender for sender, seen in self.legacy_senders.items() if now - seen > LEGACY_TIMEOUT]:
+                del self.legacy_senders[sender]
+            return not self.legacy_senders
+
+    def encode_state(self, state):
+        if self.binary:
+            return encode_state(state)
+        return json.dumps(state)
+
+    def encode_input(self, player_id, tick, bird_index):
+        if self.binary:
+            return encode_input(player_id, tick, bird_index)
+        return json.dumps({"type": "input", "player_id": player_id, "tick": tick, "bird": bird_index})
+
+    def decode(self, payload):
+        data = decode(payload)
+        if "color" in data and "y" in data:
+            sender = data.get("player_id")
+            if is_binary(payload):
+                if sender in self.legacy_senders:
+                    with self.lock:
+                        self.legacy_senders.pop(sender, None)
+            else:
+                with self.lock:
+                    self.legacy_senders[sender] = self.clock()
+        return data